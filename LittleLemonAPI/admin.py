@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import MenuItem, Category, Order
+from .models import MenuItem, Category, Order, StripeEvent
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
@@ -40,4 +40,12 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'status', 'total', 'date')
     search_fields = ['user__username', 'status']
     list_filter = ['status', 'date']
-    ordering = ['-total']
\ No newline at end of file
+    ordering = ['-total']
+
+# Stripe events admin configuration
+@admin.register(StripeEvent)
+class StripeEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'type', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    search_fields = ['event_id']
+    list_filter = ['status', 'type']
+    ordering = ['-created_at']
@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .roles import _REQUEST_ATTR
+
+# Claims que añade MyTokenObtainPairSerializer y que necesita el modo sin BD
+PRINCIPAL_CLAIMS = ('is_active', 'is_staff', 'is_superuser', 'roles')
+
+
+class TokenPrincipal(SimpleLazyObject):
+    """
+    Usuario construido a partir de los claims del access token.
+
+    id, username, flags y roles salen del token sin tocar la BD. Cualquier otro
+    atributo (email, groups, comparaciones, asignarlo a una FK...) carga el
+    User real una sola vez.
+    """
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        # simplejwt guarda el id como string en el claim
+        user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+        super().__init__(lambda: User.objects.get(**{api_settings.USER_ID_FIELD: user_id}))
+        # Se escribe en __dict__ para no disparar la carga del User (LazyObject.__setattr__)
+        self.__dict__.update({
+            'id': user_id,
+            'pk': user_id,
+            'username': token.get('username', ''),
+            'is_active': token['is_active'],
+            'is_staff': token['is_staff'],
+            'is_superuser': token['is_superuser'],
+            _REQUEST_ATTR: frozenset(token['roles']),
+        })
+
+    def __bool__(self):
+        # IsAuthenticated hace `request.user and ...`; sin esto LazyObject cargaría el User
+        return True
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication sin consulta a la BD por request.
+
+    Los tokens emitidos antes de añadir los claims de rol siguen funcionando
+    por la vía normal (carga del User). Un cambio de roles se aplica en el
+    siguiente refresh, es decir, como mucho en ACCESS_TOKEN_LIFETIME.
+    """
+
+    def get_user(self, validated_token):
+        claims = (api_settings.USER_ID_CLAIM,) + PRINCIPAL_CLAIMS
+        # CHECK_REVOKE_TOKEN compara con el hash del password: necesita el User
+        if api_settings.CHECK_REVOKE_TOKEN or any(c not in validated_token for c in claims):
+            return super().get_user(validated_token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not validated_token['is_active']:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return TokenPrincipal(validated_token)
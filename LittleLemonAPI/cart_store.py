@@ -0,0 +1,290 @@
+"""
+Almacenamiento del carrito, intercambiable con el setting CART_STORE.
+
+- DatabaseCartStore (por defecto): una fila de Cart por línea, como siempre.
+- CacheCartStore: el carrito vive en el cache de Django como un dict
+  compacto por usuario ({menuitem_id: [quantity, unit_price]}) y solo se
+  escribe en la tabla Cart al crear la orden o al iniciar el checkout
+  (persist). Los carritos abandonados caducan con CART_CACHE_TIMEOUT en vez
+  de acumularse en la BD. Con varios workers el cache tiene que ser
+  compartido (Redis, Memcached, FileBasedCache...), no LocMemCache. Cada
+  leer-modificar-escribir del carrito de un usuario toma un lock en el
+  mismo cache (cache.add), así dos requests simultáneas no pierden líneas.
+
+Ambos devuelven instancias de Cart (sin guardar en el caso del cache) para
+que CartSerializer y la respuesta de /api/cart/ no cambien. En el store de
+cache el id de cada línea es el id del MenuItem.
+"""
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .models import Cart, MenuItem
+
+ADD = 'add'
+SET = 'set'
+REMOVE = 'remove'
+
+# Lo que entra en las columnas de Cart (más es un DataError en PostgreSQL):
+# quantity es PositiveSmallIntegerField y price un DecimalField(6, 2)
+MAX_QUANTITY = 32767
+MAX_LINE_PRICE = Decimal('9999.99')
+
+# Segundos: el lock caduca solo si el proceso que lo tiene muere sin soltarlo
+CART_LOCK_TIMEOUT = 5
+CART_LOCK_POLL_INTERVAL = 0.01
+
+
+class QuantityTooLarge(ValueError):
+    """La línea quedaría con más unidades o un precio mayor de lo que guarda la tabla Cart."""
+
+    def __init__(self, menuitem_id):
+        super().__init__(
+            f'Quantity for menuitem_id {menuitem_id} is too large: a cart line holds up to '
+            f'{MAX_QUANTITY} units and {MAX_LINE_PRICE} in total.'
+        )
+        self.menuitem_id = menuitem_id
+
+
+def _check_line(menuitem, quantity):
+    """Devuelve quantity si la línea cabe en la tabla Cart, si no QuantityTooLarge."""
+    if quantity > MAX_QUANTITY or menuitem.price * quantity > MAX_LINE_PRICE:
+        raise QuantityTooLarge(menuitem.pk)
+    return quantity
+
+
+def _final_quantities(quantities, operations, menuitems):
+    """Aplica las operaciones del batch en orden sobre {menuitem_id: quantity}."""
+    for operation in operations:
+        menuitem_id = operation['menuitem_id']
+        if operation['action'] == REMOVE:
+            quantities[menuitem_id] = 0
+        elif operation['action'] == ADD:
+            quantities[menuitem_id] = quantities.get(menuitem_id, 0) + operation['quantity']
+        else:
+            quantities[menuitem_id] = operation['quantity']
+    # Solo importa cómo quedan las líneas, no los pasos intermedios
+    for menuitem_id, quantity in quantities.items():
+        if quantity and menuitem_id in menuitems:
+            _check_line(menuitems[menuitem_id], quantity)
+    return quantities
+
+
+class DatabaseCartStore:
+    def lines(self, user):
+        return Cart.objects.filter(user_id=user.pk).select_related('user', 'menuitem__category').order_by('id')
+
+    def get(self, user, line_id):
+        """Lanza Cart.DoesNotExist si la línea no es del usuario."""
+        return self.lines(user).get(pk=line_id)
+
+    def add(self, user, menuitem, quantity):
+        _check_line(menuitem, quantity)
+        # Si ya existe la línea se suma la cantidad
+        cart_item, created = Cart.objects.get_or_create(
+            user=user,
+            menuitem=menuitem,
+            defaults={
+                'quantity': quantity,
+                'unit_price': menuitem.price,
+                'price': menuitem.price * quantity,
+            }
+        )
+        if not created:
+            cart_item.quantity = _check_line(menuitem, cart_item.quantity + quantity)
+            cart_item.unit_price = menuitem.price
+            cart_item.price = cart_item.quantity * menuitem.price
+            cart_item.save()
+        return cart_item
+
+    def set_quantity(self, user, line, quantity):
+        line.quantity = _check_line(line.menuitem, quantity)
+        line.price = line.unit_price * quantity
+        line.save()
+        return line
+
+    def remove(self, user, line):
+        line.delete()
+
+    def clear(self, user):
+        Cart.objects.filter(user_id=user.pk).delete()
+
+    def apply(self, user, operations, menuitems):
+        """Batch: operaciones ya validadas, menuitems = {id: MenuItem} con price."""
+        with transaction.atomic():
+            quantities = _final_quantities(dict(
+                Cart.objects.select_for_update()
+                .filter(user_id=user.pk, menuitem_id__in=menuitems)
+                .values_list('menuitem_id', 'quantity')
+            ), operations, menuitems)
+            removed = [menuitem_id for menuitem_id, quantity in quantities.items() if not quantity]
+            if removed:
+                Cart.objects.filter(user_id=user.pk, menuitem_id__in=removed).delete()
+            # Upsert sobre unique_together (menuitem, user); bulk_create no llama a Cart.save()
+            Cart.objects.bulk_create(
+                [
+                    Cart(
+                        user_id=user.pk,
+                        menuitem_id=menuitem_id,
+                        quantity=quantity,
+                        unit_price=menuitems[menuitem_id].price,
+                        price=menuitems[menuitem_id].price * quantity,
+                    )
+                    for menuitem_id, quantity in quantities.items() if quantity
+                ],
+                update_conflicts=True,
+                unique_fields=['menuitem', 'user'],
+                update_fields=['quantity', 'unit_price', 'price'],
+            )
+
+    def persist(self, user):
+        """Las líneas ya están en la tabla Cart."""
+
+    def discard(self, user):
+        """Nada que limpiar: create_from_cart ya borró las filas."""
+
+
+class CacheCartStore:
+    def __init__(self):
+        self.cache = caches[settings.CART_CACHE_ALIAS]
+        self.timeout = settings.CART_CACHE_TIMEOUT
+
+    def _key(self, user):
+        return f'cart:{user.pk}'
+
+    def _load(self, user):
+        return self.cache.get(self._key(user), {})
+
+    @contextmanager
+    def _locked(self, user):
+        """Serializa las modificaciones del carrito de un usuario entre workers."""
+        key, token = f'{self._key(user)}:lock', uuid.uuid4().hex
+        while not self.cache.add(key, token, CART_LOCK_TIMEOUT):
+            time.sleep(CART_LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            # Si caducó mientras tanto, el lock ya es de otro
+            if self.cache.get(key) == token:
+                self.cache.delete(key)
+
+    def _save(self, user, data):
+        if data:
+            self.cache.set(self._key(user), data, self.timeout)
+        else:
+            self.cache.delete(self._key(user))
+
+    def _build(self, user, data, menuitems):
+        lines = []
+        for menuitem_id, (quantity, unit_price) in data.items():
+            menuitem = menuitems.get(menuitem_id)
+            if menuitem is None:
+                # El item se borró del menú (en la BD la línea se borra en cascada)
+                continue
+            unit_price = Decimal(unit_price)
+            line = Cart(id=menuitem_id, quantity=quantity, unit_price=unit_price, price=unit_price * quantity)
+            line.user = user
+            line.menuitem = menuitem
+            lines.append(line)
+        return lines
+
+    def lines(self, user):
+        data = self._load(user)
+        menuitems = MenuItem.objects.select_related('category').in_bulk(data)
+        return self._build(user, data, menuitems)
+
+    def get(self, user, line_id):
+        data = self._load(user)
+        try:
+            entry = data[int(line_id)]
+        except (KeyError, TypeError, ValueError):
+            raise Cart.DoesNotExist
+        menuitems = MenuItem.objects.select_related('category').in_bulk([int(line_id)])
+        lines = self._build(user, {int(line_id): entry}, menuitems)
+        if not lines:
+            raise Cart.DoesNotExist
+        return lines[0]
+
+    def add(self, user, menuitem, quantity):
+        with self._locked(user):
+            data = self._load(user)
+            current = data.get(menuitem.pk, [0, None])[0]
+            # Como Cart.save(): cada escritura toma el precio actual del menú
+            data[menuitem.pk] = [_check_line(menuitem, current + quantity), str(menuitem.price)]
+            self._save(user, data)
+        return self._build(user, {menuitem.pk: data[menuitem.pk]}, {menuitem.pk: menuitem})[0]
+
+    def set_quantity(self, user, line, quantity):
+        _check_line(line.menuitem, quantity)
+        with self._locked(user):
+            data = self._load(user)
+            data[line.menuitem.pk] = [quantity, str(line.menuitem.price)]
+            self._save(user, data)
+        return self._build(user, {line.menuitem.pk: data[line.menuitem.pk]}, {line.menuitem.pk: line.menuitem})[0]
+
+    def remove(self, user, line):
+        with self._locked(user):
+            data = self._load(user)
+            data.pop(line.menuitem.pk, None)
+            self._save(user, data)
+
+    def clear(self, user):
+        self.cache.delete(self._key(user))
+
+    def apply(self, user, operations, menuitems):
+        with self._locked(user):
+            data = self._load(user)
+            quantities = _final_quantities(
+                {menuitem_id: entry[0] for menuitem_id, entry in data.items()}, operations, menuitems
+            )
+            for menuitem_id, quantity in quantities.items():
+                if not quantity:
+                    data.pop(menuitem_id, None)
+                elif menuitem_id in menuitems:
+                    data[menuitem_id] = [quantity, str(menuitems[menuitem_id].price)]
+                else:
+                    data[menuitem_id][0] = quantity
+            self._save(user, data)
+
+    def persist(self, user):
+        """Escribe el carrito del cache en la tabla Cart (reemplaza lo que hubiera)."""
+        data = self._load(user)
+        with transaction.atomic():
+            Cart.objects.filter(user_id=user.pk).exclude(menuitem_id__in=data).delete()
+            existing = set(MenuItem.objects.filter(pk__in=data).values_list('pk', flat=True))
+            Cart.objects.bulk_create(
+                [
+                    Cart(
+                        user_id=user.pk,
+                        menuitem_id=menuitem_id,
+                        quantity=quantity,
+                        unit_price=Decimal(unit_price),
+                        price=Decimal(unit_price) * quantity,
+                    )
+                    for menuitem_id, (quantity, unit_price) in data.items() if menuitem_id in existing
+                ],
+                update_conflicts=True,
+                unique_fields=['menuitem', 'user'],
+                update_fields=['quantity', 'unit_price', 'price'],
+            )
+
+    def discard(self, user):
+        """Vacía el carrito del cache cuando se confirma la orden."""
+        key = self._key(user)
+        transaction.on_commit(lambda: self.cache.delete(key))
+
+
+@lru_cache(maxsize=None)
+def _load_store(path):
+    return import_string(path)()
+
+
+def get_cart_store():
+    return _load_store(settings.CART_STORE)
@@ -0,0 +1,144 @@
+"""
+Cache de Checkout Sessions de Stripe para /api/checkout/session/<id>/.
+
+El frontend consulta la sesión repetidamente tras la redirección de Stripe.
+Las sesiones en estado final (complete/expired) ya no cambian y se guardan
+CHECKOUT_SESSION_TTL_FINAL segundos; las abiertas solo
+CHECKOUT_SESSION_TTL_OPEN. El webhook guarda la sesión que trae el evento en
+cuanto se completa.
+
+Las consultas simultáneas de la misma sesión comparten una sola llamada a
+Stripe aunque estén en workers distintos (gunicorn sync: un hilo por
+proceso): la primera toma un lock en el cache (`cache.add`) y consulta
+Stripe; las demás releen el cache cada LOCK_POLL_INTERVAL segundos hasta que
+aparece la sesión. Si el lock se libera sin sesión (Stripe falló) o pasa
+LOCK_TIMEOUT, cada una consulta Stripe por su cuenta. Con un cache por
+proceso (LocMemCache) solo se comparte dentro del worker.
+"""
+import asyncio
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .stripe_client import get_async_client, get_client
+
+FINAL_STATUSES = {'complete', 'expired'}
+
+# Segundos: lo más que puede tardar la llamada a Stripe que hace el que tiene el lock
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _cache():
+    return caches[settings.CHECKOUT_SESSION_CACHE_ALIAS]
+
+
+def _key(session_id):
+    return f'checkout_session:{session_id}'
+
+
+def _lock_key(session_id):
+    return f'{_key(session_id)}:lock'
+
+
+def _is_final(session):
+    return session.get('status') in FINAL_STATUSES
+
+
+def _ttl(session):
+    return settings.CHECKOUT_SESSION_TTL_FINAL if _is_final(session) else settings.CHECKOUT_SESSION_TTL_OPEN
+
+
+def store(session):
+    """Guarda la sesión (dict). Una respuesta de Stripe que llega tarde no pisa un estado final."""
+    if not _is_final(session):
+        cached = _cache().get(_key(session['id']))
+        if cached is not None and _is_final(cached):
+            return cached
+    _cache().set(_key(session['id']), session, timeout=_ttl(session))
+    return session
+
+
+async def astore(session):
+    if not _is_final(session):
+        cached = await _cache().aget(_key(session['id']))
+        if cached is not None and _is_final(cached):
+            return cached
+    await _cache().aset(_key(session['id']), session, timeout=_ttl(session))
+    return session
+
+
+def _fetch(session_id):
+    session = get_client().v1.checkout.sessions.retrieve(session_id)
+    return store(session.to_dict())
+
+
+def retrieve(session_id):
+    """Sesión como dict, del cache o de Stripe. Propaga stripe.error.StripeError (no se cachea)."""
+    cache = _cache()
+    cached = cache.get(_key(session_id))
+    if cached is not None:
+        return cached
+
+    if cache.add(_lock_key(session_id), 1, timeout=LOCK_TIMEOUT):
+        try:
+            return _fetch(session_id)
+        finally:
+            cache.delete(_lock_key(session_id))
+
+    # Otro worker ya está consultando Stripe: se espera a que guarde la sesión
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        cached = cache.get(_key(session_id))
+        if cached is not None:
+            return cached
+        if cache.get(_lock_key(session_id)) is None:
+            break
+    return _fetch(session_id)
+
+
+# Las tareas pertenecen a un event loop: un dict de llamadas en curso por loop
+_async_flights = weakref.WeakKeyDictionary()
+
+
+async def _afetch(session_id):
+    session = await get_async_client().v1.checkout.sessions.retrieve_async(session_id)
+    return await astore(session.to_dict())
+
+
+async def _aretrieve_shared(session_id):
+    # El mismo lock que retrieve(): coalesce también con los demás workers
+    cache = _cache()
+    if await cache.aadd(_lock_key(session_id), 1, timeout=LOCK_TIMEOUT):
+        try:
+            return await _afetch(session_id)
+        finally:
+            await cache.adelete(_lock_key(session_id))
+
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+        cached = await cache.aget(_key(session_id))
+        if cached is not None:
+            return cached
+        if await cache.aget(_lock_key(session_id)) is None:
+            break
+    return await _afetch(session_id)
+
+
+async def aretrieve(session_id):
+    cached = await _cache().aget(_key(session_id))
+    if cached is not None:
+        return cached
+
+    # Dentro del loop, las tareas que piden la misma sesión esperan la misma llamada
+    flights = _async_flights.setdefault(asyncio.get_running_loop(), {})
+    task = flights.get(session_id)
+    if task is None:
+        task = flights[session_id] = asyncio.ensure_future(_aretrieve_shared(session_id))
+        task.add_done_callback(lambda _: flights.pop(session_id, None))
+    # shield: si un cliente se desconecta no se cancela la llamada de los demás
+    return await asyncio.shield(task)
@@ -0,0 +1,103 @@
+"""
+Asignación de órdenes al equipo de reparto.
+
+dispatch_pending() reparte las órdenes en 'preparing' sin repartidor entre
+los usuarios activos del grupo "Delivery crew": cada orden va al que menos
+órdenes abiertas (pending/preparing/delivering) tiene en ese momento. La
+carga sale de un solo GROUP BY sobre el índice (delivery_crew, status).
+
+Bloqueos: primero las filas de los repartidores (las pasadas y las
+asignaciones manuales se serializan y las cargas leídas no quedan viejas) y
+después las órdenes, con skip_locked, así que dos pasadas nunca toman la
+misma orden. El UPDATE de la pasada además exige delivery_crew IS NULL.
+Cada asignación queda registrada como OrderEvent (stream SSE).
+"""
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from . import order_events
+from .models import Order
+from .roles import DELIVERY_CREW
+
+OPEN_STATUSES = (Order.STATUS_PENDING, Order.STATUS_PREPARING, Order.STATUS_DELIVERING)
+# Lo que se lee de cada orden bloqueada (para los OrderEvent)
+ORDER_FIELDS = ('pk', 'user_id', 'delivery_crew_id', 'status')
+
+
+def _lock_crew(crew_ids=None):
+    queryset = User.objects.filter(groups__name=DELIVERY_CREW)
+    if crew_ids is None:
+        queryset = queryset.filter(is_active=True)
+    else:
+        queryset = queryset.filter(pk__in=crew_ids)
+    return list(queryset.select_for_update(of=('self',)).order_by('pk').values_list('pk', flat=True))
+
+
+def crew_loads(crew_ids):
+    """Órdenes abiertas por repartidor: {crew_id: n}, con 0 para los que no tienen ninguna."""
+    loads = dict.fromkeys(crew_ids, 0)
+    rows = (
+        Order.objects.filter(delivery_crew__in=crew_ids, status__in=OPEN_STATUSES)
+        .order_by()
+        .values('delivery_crew')
+        .annotate(n=Count('id'))
+        .values_list('delivery_crew', 'n')
+    )
+    loads.update(rows)
+    return loads
+
+
+def _apply(assignments, orders, only_unassigned=False):
+    """Un UPDATE por repartidor. orders: filas ORDER_FIELDS bloqueadas. Devuelve el número de órdenes actualizadas."""
+    by_crew = defaultdict(list)
+    for order_id, crew_id in assignments.items():
+        by_crew[crew_id].append(order_id)
+    updated = 0
+    for crew_id, order_ids in by_crew.items():
+        queryset = Order.objects.filter(pk__in=order_ids)
+        if only_unassigned:
+            queryset = queryset.filter(delivery_crew__isnull=True)
+        updated += queryset.update(delivery_crew_id=crew_id)
+    order_events.orders_assigned(orders, assignments)
+    return updated
+
+
+@transaction.atomic
+def dispatch_pending(batch_size=100):
+    """Asigna hasta batch_size órdenes 'preparing' sin repartidor, las más antiguas primero. Devuelve {order_id: crew_id}."""
+    crew_ids = _lock_crew()
+    if not crew_ids:
+        return {}
+    orders = list(
+        Order.objects.filter(status=Order.STATUS_PREPARING, delivery_crew__isnull=True)
+        .select_for_update(skip_locked=True)
+        .order_by('date', 'id')
+        .values_list(*ORDER_FIELDS)[:batch_size]
+    )
+    if not orders:
+        return {}
+
+    heap = [(load, crew_id) for crew_id, load in crew_loads(crew_ids).items()]
+    heapq.heapify(heap)
+    assignments = {}
+    for order_id, *_ in orders:
+        load, crew_id = heap[0]
+        assignments[order_id] = crew_id
+        heapq.heapreplace(heap, (load + 1, crew_id))
+
+    _apply(assignments, orders, only_unassigned=True)
+    return assignments
+
+
+@transaction.atomic
+def bulk_assign(assignments):
+    """Asignación manual {order_id: crew_id}; reemplaza el repartidor que tuviera la orden."""
+    _lock_crew(set(assignments.values()))
+    orders = list(
+        Order.objects.filter(pk__in=assignments).select_for_update().order_by('pk').values_list(*ORDER_FIELDS)
+    )
+    return _apply(assignments, orders)
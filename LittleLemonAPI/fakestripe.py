@@ -0,0 +1,126 @@
+"""
+Servidor HTTP que imita los endpoints de Checkout Sessions de Stripe, con
+latencia configurable. Para pruebas de carga (STRIPE_API_BASE=server.url):
+no hace falta red ni una cuenta de Stripe.
+
+    with FakeStripeServer(latency=0.5) as server:
+        ...  # STRIPE_API_BASE = server.url
+
+Endpoints: POST /v1/checkout/sessions, GET /v1/checkout/sessions/<id>.
+complete(session_id) marca una sesión como pagada.
+"""
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+_LINE_ITEM_RE = re.compile(r'line_items\[(\d+)\]\[(price_data\]\[unit_amount|quantity)\]')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive: el cliente reutiliza conexiones del pool
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Request-Id', f'req_fake_{next(self.server.counter)}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self, what):
+        self._send(404, {'error': {
+            'type': 'invalid_request_error',
+            'code': 'resource_missing',
+            'message': f"No such {what}",
+        }})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        form = dict(parse_qsl(self.rfile.read(length).decode()))
+        self.server.owner.wait()
+        if self.path.rstrip('/') != '/v1/checkout/sessions':
+            return self._not_found(self.path)
+
+        lines = {}
+        for key, value in form.items():
+            match = _LINE_ITEM_RE.fullmatch(key)
+            if match:
+                lines.setdefault(match.group(1), {})[match.group(2)] = int(value)
+        amount = sum(line.get('price_data][unit_amount', 0) * line.get('quantity', 1) for line in lines.values())
+        session = self.server.owner.create_session(form.get('customer_email'), amount)
+        self._send(200, session)
+
+    def do_GET(self):
+        self.server.owner.wait()
+        match = re.fullmatch(r'/v1/checkout/sessions/([^/?]+)/?', self.path.split('?')[0])
+        session = self.server.owner.sessions.get(match.group(1)) if match else None
+        if session is None:
+            return self._not_found(f"checkout.session: '{match.group(1) if match else self.path}'")
+        self._send(200, session)
+
+
+class FakeStripeServer:
+    def __init__(self, latency=0.0, host='127.0.0.1', port=0):
+        self.latency = latency
+        self.sessions = {}
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._server.counter = itertools.count(1)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def wait(self):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def create_session(self, email, amount):
+        session_id = f'cs_test_fake{next(self._ids):08d}'
+        session = {
+            'id': session_id,
+            'object': 'checkout.session',
+            'amount_total': amount,
+            'currency': 'usd',
+            'customer_email': email,
+            'mode': 'payment',
+            'payment_status': 'unpaid',
+            'status': 'open',
+            'url': f'{self.url}/pay/{session_id}',
+        }
+        self.sessions[session_id] = session
+        return session
+
+    def complete(self, session_id):
+        self.sessions[session_id].update(payment_status='paid', status='complete')
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
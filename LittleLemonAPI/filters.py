@@ -1,7 +1,7 @@
 # filters.py
 
 import django_filters
-from .models import MenuItem
+from .models import MenuItem, Order
 
 class MenuItemFilter(django_filters.FilterSet):
     # Filtramos por category__slug usando un filtro de tipo Char
@@ -10,3 +10,13 @@ class MenuItemFilter(django_filters.FilterSet):
     class Meta:
         model = MenuItem
         fields = ['category']
+
+
+class OrderFilter(django_filters.FilterSet):
+    # Rango de fechas inclusivo: ?date_from=2025-01-01&date_to=2025-01-31
+    date_from = django_filters.DateFilter(field_name='date', lookup_expr='gte')
+    date_to = django_filters.DateFilter(field_name='date', lookup_expr='lte')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'delivery_crew', 'user', 'date_from', 'date_to']
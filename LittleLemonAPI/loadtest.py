@@ -0,0 +1,235 @@
+"""
+Utilidades de las pruebas de carga (`manage.py loadtest` y `loadtest_checkout`).
+
+La aplicación se levanta con gunicorn en un subproceso, con una configuración
+propia (SETTINGS_TEMPLATE): BD SQLite y estado compartido en un directorio
+temporal, STRIPE_API_BASE apuntando a un FakeStripeServer, sin throttling y
+con la cabecera Server-Timing de metrics.py, de la que se leen las queries
+de cada request.
+"""
+import hashlib
+import hmac
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+import httpx
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+WEBHOOK_SECRET = 'whsec_loadtest'
+
+SETTINGS_TEMPLATE = '''\
+from datetime import timedelta
+
+from littlelemon.settings import *  # noqa
+
+DATABASES = {{"default": {{"ENGINE": "django.db.backends.sqlite3", "NAME": {db!r}, "OPTIONS": {{"timeout": 30}}}}}}
+SHARED_STATE_DIR = {state!r}
+SHARED_STATE_DB = {state_db!r}
+MENU_SNAPSHOT_PATH = {snapshot!r}
+STRIPE_API_BASE = {stripe!r}
+STRIPE_WEBHOOK_SECRET = {webhook_secret!r}
+PERFORMANCE_METRICS = True
+SERVER_TIMING = True
+# Se mide la concurrencia del worker, no los límites de la API
+REST_FRAMEWORK = {{**REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}}
+# Los tokens se emiten una vez al sembrar y tienen que durar toda la prueba
+SIMPLE_JWT = {{**SIMPLE_JWT, "ACCESS_TOKEN_LIFETIME": timedelta(hours=12)}}
+'''
+
+
+_SERVER_TIMING_QUERIES_RE = re.compile(r'\bdb;[^,]*desc="(\d+) queries"')
+
+
+def server_timing_queries(header):
+    """Queries de la request según su cabecera Server-Timing (None si no la trae)."""
+    match = _SERVER_TIMING_QUERIES_RE.search(header or '')
+    return int(match.group(1)) if match else None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def environment(tmp, stripe_url):
+    """Escribe la configuración de carga en tmp y devuelve el entorno para los subprocesos."""
+    (tmp / 'loadtest_settings.py').write_text(SETTINGS_TEMPLATE.format(
+        db=str(tmp / 'db.sqlite3'),
+        state=str(tmp / 'state'),
+        state_db=str(tmp / 'state' / 'shared_state.sqlite3'),
+        snapshot=str(tmp / 'state' / 'menu_snapshot.json'),
+        stripe=stripe_url,
+        webhook_secret=WEBHOOK_SECRET,
+    ))
+    env = dict(os.environ)
+    env['DJANGO_SETTINGS_MODULE'] = 'loadtest_settings'
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(tmp), str(settings.BASE_DIR), env.get('PYTHONPATH')]))
+    return env
+
+
+def manage(env, *args):
+    """Ejecuta manage.py con la configuración de carga y devuelve su salida estándar."""
+    result = subprocess.run(
+        [sys.executable, str(settings.BASE_DIR / 'manage.py'), *args],
+        env=env, check=True, capture_output=True, text=True,
+    )
+    return result.stdout
+
+
+def run_script(env, script):
+    """Ejecuta código en `manage.py shell` y devuelve la última línea que imprime."""
+    return manage(env, 'shell', '--command', script).strip().splitlines()[-1]
+
+
+@contextmanager
+def gunicorn(args, env):
+    """Levanta gunicorn con args (aplicación, workers, ...) y devuelve su URL base."""
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', *args, '--bind', f'127.0.0.1:{port}',
+         '--timeout', '300', '--backlog', '2048'],
+        env=env,
+        cwd=settings.BASE_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f'http://127.0.0.1:{port}'
+        wait_ready(base_url, process)
+        yield base_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def wait_ready(base_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError("The server exited during startup (is gunicorn installed?)")
+        try:
+            httpx.get(f'{base_url}/healthz/', timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise CommandError("The server didn't start in time")
+
+
+def webhook_signature(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """Cabecera Stripe-Signature para payload (bytes), como la calcula Stripe."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f'{timestamp}.'.encode() + payload, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def seed(customers, crew, menu_items, orders, crew_orders, random_seed=0):
+    """
+    Datos de la prueba, sobre el menú que crea post_migrate: más platos,
+    clientes con email, repartidores con órdenes 'delivering' asignadas y un
+    histórico de órdenes. Las cargas masivas no disparan signals, así que al
+    final se reconstruyen el índice de búsqueda y los rollups.
+
+    Devuelve {"customers": [token], "crew": [{"token", "orders": [id]}], "menu_items": [id]}.
+    """
+    from django.contrib.auth.models import Group, User
+    from django.db import transaction
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from . import rollups, search
+    from .models import Category, MenuItem, Order, OrderItem
+    from .roles import CUSTOMER, DELIVERY_CREW
+
+    rng = random.Random(random_seed)
+    with transaction.atomic():
+        categories = list(Category.objects.order_by('id'))
+        MenuItem.objects.bulk_create(
+            MenuItem(
+                title=f'Load test dish {i}',
+                description=f'House special number {i} with seasonal ingredients.',
+                price=Decimal(rng.randrange(500, 3000)) / 100,
+                featured=i % 7 == 0,
+                category=categories[i % len(categories)],
+            )
+            for i in range(max(menu_items - MenuItem.objects.count(), 0))
+        )
+        menu = list(MenuItem.objects.order_by('id').values_list('id', 'price'))
+
+        customer_users = User.objects.bulk_create(
+            User(username=f'loadtest-customer-{i}', email=f'loadtest-customer-{i}@example.com')
+            for i in range(customers)
+        )
+        Group.objects.get_or_create(name=CUSTOMER)[0].user_set.add(*customer_users)
+        crew_users = User.objects.bulk_create(User(username=f'loadtest-crew-{i}') for i in range(crew))
+        Group.objects.get_or_create(name=DELIVERY_CREW)[0].user_set.add(*crew_users)
+
+        statuses = [Order.STATUS_DELIVERED] * 17 + [Order.STATUS_CANCELLED, Order.STATUS_PENDING]
+        new_orders = [
+            Order(
+                user=rng.choice(customer_users),
+                delivery_crew=rng.choice(crew_users) if crew_users else None,
+                status=rng.choice(statuses),
+                total=0,
+            )
+            for _ in range(orders)
+        ] + [
+            Order(user=rng.choice(customer_users), delivery_crew=member, status=Order.STATUS_DELIVERING, total=0)
+            for member in crew_users
+            for _ in range(crew_orders)
+        ]
+        # Lotes: SQLite limita las variables por sentencia y así no hay una sola lista enorme
+        Order.objects.bulk_create(new_orders, batch_size=1000)
+        items = []
+        for order in new_orders:
+            for menuitem_id, price in rng.sample(menu, k=min(len(menu), rng.randint(1, 4))):
+                quantity = rng.randint(1, 3)
+                items.append(OrderItem(
+                    order=order, menuitem_id=menuitem_id, quantity=quantity, unit_price=price, price=price * quantity
+                ))
+        OrderItem.objects.bulk_create(items, batch_size=1000)
+        totals = {}
+        for item in items:
+            totals[item.order_id] = totals.get(item.order_id, 0) + item.price
+        # date es auto_now_add: el histórico se reparte en el último año
+        today = timezone.localdate()
+        for index, order in enumerate(new_orders):
+            order.total = totals.get(order.pk, 0)
+            if index < orders:
+                order.date = today - timedelta(days=rng.randrange(365))
+        Order.objects.bulk_update(new_orders, ['total', 'date'], batch_size=1000)
+
+    search.rebuild_index()
+    rollups.rebuild()
+
+    assigned = {}
+    for order in new_orders[orders:]:
+        assigned.setdefault(order.delivery_crew_id, []).append(order.pk)
+    return {
+        'customers': [str(AccessToken.for_user(user)) for user in customer_users],
+        'crew': [{'token': str(AccessToken.for_user(user)), 'orders': assigned.get(user.pk, [])} for user in crew_users],
+        'menu_items': [menuitem_id for menuitem_id, _ in menu],
+    }
+
+
+def seed_script(**options):
+    """Código para run_script que siembra con seed(**options) e imprime el resultado como JSON."""
+    return (
+        'import json\n'
+        'from LittleLemonAPI.loadtest import seed\n'
+        f'print(json.dumps(seed(**{options!r})))\n'
+    )
@@ -0,0 +1,92 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from LittleLemonAPI.models import Cart, Category, MenuItem, Order, OrderItem
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_create_from_cart(user):
+    """Implementación anterior (una sentencia por línea), solo como referencia."""
+    cart_qs = Cart.objects.filter(user=user)
+    if not cart_qs.exists():
+        return None
+    total = 0
+    order = Order.objects.create(user=user, total=0)
+    for cart_item in cart_qs:
+        OrderItem.objects.create(
+            order=order,
+            menuitem=cart_item.menuitem,
+            quantity=cart_item.quantity,
+            unit_price=cart_item.unit_price,
+            price=cart_item.price,
+        )
+        total += cart_item.price
+    order.total = total
+    order.save()
+    cart_qs.delete()
+    return order
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide sentencias SQL y latencia de la creación de órdenes desde el carrito "
+        "según el tamaño del carrito. Todo se hace en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1,5,15,30,60', help='Tamaños de carrito separados por coma')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por tamaño')
+        parser.add_argument('--legacy', action='store_true', help='Incluir la implementación anterior')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        implementations = [('set-based', Order.objects.create_from_cart)]
+        if options['legacy']:
+            implementations.append(('legacy', legacy_create_from_cart))
+
+        self.stdout.write(f"{'impl':<10} {'lines':>6} {'statements':>11} {'median ms':>10} {'max ms':>8}")
+        try:
+            with transaction.atomic():
+                user, menu = self._seed(max(sizes))
+                for name, create in implementations:
+                    for size in sizes:
+                        self._run(name, create, user, menu[:size], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, size):
+        user = User.objects.create_user('bench-order-user')
+        category = Category.objects.create(title='Bench category', slug='bench-category')
+        menu = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Bench item {i}', price=Decimal('9.99'), category=category) for i in range(size)
+        )
+        return user, menu
+
+    def _run(self, name, create, user, menu, repeat):
+        timings = []
+        statements = 0
+        for _ in range(repeat):
+            Cart.objects.bulk_create(
+                Cart(user=user, menuitem=item, quantity=2, unit_price=item.price, price=item.price * 2)
+                for item in menu
+            )
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                with transaction.atomic():
+                    create(user)
+                timings.append((time.perf_counter() - start) * 1000)
+            # Sin contar SAVEPOINT/RELEASE del atomic() del benchmark
+            statements = sum(1 for q in queries.captured_queries if 'SAVEPOINT' not in q['sql'])
+        self.stdout.write(
+            f"{name:<10} {len(menu):>6} {statements:>11} {statistics.median(timings):>10.2f} {max(timings):>8.2f}"
+        )
@@ -0,0 +1,80 @@
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from LittleLemonAPI.loadtest import seed
+from LittleLemonAPI.models import MenuItem, Order
+from LittleLemonAPI.parsers import ORJSONParser
+from LittleLemonAPI.renderers import ORJSONRenderer, orjson
+from LittleLemonAPI.serializers import MENU_ITEM_VALUES, ORDER_VALUES
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara JSONRenderer/JSONParser de DRF con ORJSONRenderer/ORJSONParser sobre "
+        "listados grandes de órdenes y del menú, y comprueba que los bytes sean idénticos. "
+        "Los datos se crean en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=2000, help='Platos a generar')
+        parser.add_argument('--orders', type=int, default=5000, help='Órdenes a generar (1-4 líneas cada una)')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por caso')
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed: ORJSONRenderer falls back to DRF's JSONRenderer")
+        try:
+            with transaction.atomic():
+                seed(customers=20, crew=5, menu_items=options['menu_items'], orders=options['orders'], crew_orders=0)
+                # Como las respuestas paginadas, pero con todo el listado en una
+                payloads = {
+                    'menu': {'count': MenuItem.objects.count(), 'next': None, 'previous': None,
+                             'results': MENU_ITEM_VALUES.represent(MENU_ITEM_VALUES.values(MenuItem.objects.order_by('id')))},
+                    'orders': {'count': Order.objects.count(), 'next': None, 'previous': None,
+                               'results': ORDER_VALUES.represent(ORDER_VALUES.values(Order.objects.order_by('-date', '-id')))},
+                }
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(f"{'payload':<8} {'step':<7} {'library':<8} {'MB':>6} {'median ms':>10} {'MB/s':>8} {'speedup':>8}")
+        for name, data in payloads.items():
+            body = JSONRenderer().render(data)
+            if ORJSONRenderer().render(data) != body:
+                raise CommandError(f"{name}: ORJSONRenderer output differs from JSONRenderer")
+            if ORJSONParser().parse(io.BytesIO(body)) != JSONParser().parse(io.BytesIO(body)):
+                raise CommandError(f"{name}: ORJSONParser result differs from JSONParser")
+            size = len(body) / 1_000_000
+            self._compare(name, 'render', size, options['repeat'], (
+                ('json', lambda: JSONRenderer().render(data)),
+                ('orjson', lambda: ORJSONRenderer().render(data)),
+            ))
+            self._compare(name, 'parse', size, options['repeat'], (
+                ('json', lambda: JSONParser().parse(io.BytesIO(body))),
+                ('orjson', lambda: ORJSONParser().parse(io.BytesIO(body))),
+            ))
+
+    def _compare(self, payload, step, size, repeat, runs):
+        baseline = None
+        for label, run in runs:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(
+                f"{payload:<8} {step:<7} {label:<8} {size:>6.2f} {median * 1000:>10.1f} {size / median:>8.0f} "
+                f"{baseline / median:>7.1f}x"
+            )
@@ -0,0 +1,110 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from LittleLemonAPI.models import Order
+from LittleLemonAPI.pagination import KeysetPagination
+from LittleLemonAPI.views import OrderViewSet
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la latencia de /api/orders/ con paginación por página y por cursor, "
+        "en la primera página y a gran profundidad. Los datos se crean en una "
+        "transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=100_000, help='Órdenes a generar')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por caso')
+
+    def handle(self, *args, **options):
+        total = options['orders']
+        self.stdout.write(f"{'paginator':<12} {'depth':>8} {'median ms':>10} {'max ms':>8}")
+        try:
+            with transaction.atomic():
+                admin = self._seed(total)
+                self._bench(admin, total, options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _seed(self, total):
+        admin = User.objects.create_superuser('bench-pagination-admin')
+        customer = User.objects.create_user('bench-pagination-customer')
+        Order.objects.bulk_create(
+            (Order(user=customer, total=10, status=Order.STATUS_CHOICES[i % 4][0]) for i in range(total)),
+            batch_size=5000,
+        )
+        # date es auto_now_add: se reparte después en bloques de 1000 órdenes por día
+        first_id = Order.objects.filter(user=customer).order_by('id').values_list('id', flat=True).first()
+        today = timezone.localdate()
+        for offset in range(0, total, 1000):
+            Order.objects.filter(id__gte=first_id + offset, id__lt=first_id + offset + 1000).update(
+                date=today - timedelta(days=offset // 1000)
+            )
+        return admin
+
+    def _view(self, request):
+        view = OrderViewSet(request=request, format_kwarg=None, action='list', kwargs={})
+        view.headers = {}
+        return view
+
+    def _request(self, admin, params):
+        request = Request(APIRequestFactory().get('/api/orders/', params, SERVER_NAME='localhost'))
+        request.user = admin
+        return request
+
+    def _time(self, label, depth, repeat, run):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write(f"{label:<12} {depth:>8} {statistics.median(timings):>10.2f} {max(timings):>8.2f}")
+
+    def _bench(self, admin, total, repeat):
+        page_size = PageNumberPagination.page_size
+        last_page = max(1, -(-total // page_size))
+
+        for page in (1, last_page):
+            request = self._request(admin, {'page': page})
+            view = self._view(request)
+
+            def run():
+                queryset = view.filter_queryset(view.get_queryset())
+                PageNumberPagination().paginate_queryset(queryset, request, view)
+
+            self._time('page-number', (page - 1) * page_size, repeat, run)
+
+        # Cursor de la última página: la posición de la fila anterior a ella
+        request = self._request(admin, {'cursor': ''})
+        view = self._view(request)
+        paginator = KeysetPagination()
+        paginator.ordering = paginator.get_ordering(request, None, view)
+        depth = (last_page - 1) * page_size
+        anchor = view.get_queryset().order_by(*paginator.ordering).values('date', 'id')[depth - 1] if depth else None
+        for cursor_depth, position in ((0, None), (depth, anchor)):
+            params = {'cursor': ''}
+            if position is not None:
+                params['cursor'] = paginator.make_cursor(paginator.get_position(position))
+            request = self._request(admin, params)
+            view = self._view(request)
+
+            def run():
+                queryset = view.filter_queryset(view.get_queryset())
+                KeysetPagination().paginate_queryset(queryset, request, view)
+
+            self._time('keyset', cursor_depth, repeat, run)
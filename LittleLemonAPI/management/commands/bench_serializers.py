@@ -0,0 +1,70 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from LittleLemonAPI.loadtest import seed
+from LittleLemonAPI.models import MenuItem, Order
+from LittleLemonAPI.serializers import MENU_ITEM_VALUES, ORDER_VALUES, MenuItemSerializer, OrderSerializer
+from LittleLemonAPI.views.orders import with_order_details
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara items/s de MenuItemSerializer y OrderSerializer (instancias) con los "
+        "ValuesSerializer (filas de .values()), incluyendo las queries, y comprueba que "
+        "la salida sea idéntica. Los datos se crean en una transacción que se revierte."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--menu-items', type=int, default=2000, help='Platos a generar')
+        parser.add_argument('--orders', type=int, default=2000, help='Órdenes a generar (1-4 líneas cada una)')
+        parser.add_argument('--repeat', type=int, default=5, help='Repeticiones por caso')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'payload':<10} {'serializer':<12} {'rows':>6} {'median ms':>10} {'items/s':>10} {'speedup':>8}"
+        )
+        try:
+            with transaction.atomic():
+                seed(customers=20, crew=5, menu_items=options['menu_items'], orders=options['orders'], crew_orders=0)
+                menu = MenuItem.objects.select_related('category').order_by('id')
+                self._compare(
+                    'menu', options['repeat'],
+                    lambda: MenuItemSerializer(menu.all(), many=True).data,
+                    lambda: MENU_ITEM_VALUES.represent(MENU_ITEM_VALUES.values(menu.all())),
+                )
+                orders = with_order_details(Order.objects.order_by('-date', '-id'))
+                self._compare(
+                    'orders', options['repeat'],
+                    lambda: OrderSerializer(orders.all(), many=True).data,
+                    lambda: ORDER_VALUES.represent(ORDER_VALUES.values(orders.all())),
+                )
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _compare(self, payload, repeat, drf, lean):
+        # Se compara el JSON: ReturnList/OrderedDict contra listas y dicts
+        if JSONRenderer().render(drf()) != JSONRenderer().render(lean()):
+            raise CommandError(f"{payload}: the values serializer output differs from the DRF serializer")
+        baseline = None
+        for label, run in (('drf', drf), ('values', lean)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                rows = len(run())
+                timings.append(time.perf_counter() - start)
+            median = statistics.median(timings)
+            baseline = baseline or median
+            self.stdout.write(
+                f"{payload:<10} {label:<12} {rows:>6} {median * 1000:>10.1f} {rows / median:>10.0f} "
+                f"{baseline / median:>7.1f}x"
+            )
+
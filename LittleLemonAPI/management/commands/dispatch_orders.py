@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from LittleLemonAPI.dispatch import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = "Asigna las órdenes en 'preparing' sin repartidor al miembro del equipo con menos órdenes abiertas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help='Seguir asignando hasta que se detenga el proceso')
+        parser.add_argument('--interval', type=float, default=5.0, help='Segundos de espera cuando no hay órdenes')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if not options['loop']:
+            assigned = dispatch_pending(batch_size)
+            self.stdout.write(f"Assigned {len(assigned)} order(s).")
+            return
+
+        self.stdout.write("Dispatching orders (Ctrl+C to stop)...")
+        try:
+            while True:
+                close_old_connections()
+                assigned = dispatch_pending(batch_size)
+                if assigned:
+                    self.stdout.write(f"Assigned {len(assigned)} order(s).")
+                if len(assigned) < batch_size:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,370 @@
+import asyncio
+import json
+import logging
+import random
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from itertools import count, cycle
+from pathlib import Path
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from LittleLemonAPI.fakestripe import FakeStripeServer
+from LittleLemonAPI.loadtest import (
+    environment,
+    gunicorn,
+    manage,
+    percentile,
+    run_script,
+    seed_script,
+    server_timing_queries,
+    webhook_signature,
+)
+from LittleLemonAPI.models import Order
+
+REPORT_VERSION = 1
+SERVERS = ('wsgi', 'asgi')
+# Estas opciones cambian lo que se mide: si difieren, la comparación avisa
+COMPARABLE_OPTIONS = (
+    'server', 'workers', 'threads', 'concurrency', 'crew_share', 'duration',
+    'stripe_latency', 'customers', 'crew', 'menu_items', 'orders', 'seed',
+)
+
+
+class Recorder:
+    """Latencias y queries por endpoint; lo que empieza antes de measure_from (calentamiento) se descarta."""
+
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.first_errors = {}
+
+    def add(self, endpoint, started, latency, status, queries, detail=''):
+        if started < self.measure_from:
+            return
+        if 200 <= status < 300:
+            self.latencies[endpoint].append(latency)
+            if queries is not None:
+                self.queries[endpoint].append(queries)
+        else:
+            self.errors[endpoint] += 1
+            # De la página de error de Django basta el título (excepción y URL)
+            title = re.search(r'<title>(.*?)</title>', detail, re.DOTALL)
+            detail = ' '.join((title.group(1) if title else detail).split())
+            self.first_errors.setdefault(endpoint, f'{status} {detail}'.strip()[:200])
+
+
+class VirtualUser:
+    def __init__(self, http, token, recorder, rng):
+        self.http = http
+        self.token = token
+        self.recorder = recorder
+        self.rng = rng
+
+    async def call(self, method, route, authenticated=True, headers=None, **kwargs):
+        """
+        Request a route con sus {parámetros} en kwargs (id=...). En el reporte
+        cuenta como "METHOD route", sin los ids. Devuelve el JSON si fue 2xx.
+        """
+        path_args = {name: kwargs.pop(name) for name in list(kwargs) if f'{{{name}}}' in route}
+        headers = dict(headers or {})
+        if authenticated:
+            headers['Authorization'] = f'Bearer {self.token}'
+        endpoint = f'{method} {route}'
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, route.format(**path_args), headers=headers, **kwargs)
+        except httpx.HTTPError as exc:
+            self.recorder.add(endpoint, started, 0, 0, None, repr(exc))
+            return None
+        latency = (time.perf_counter() - started) * 1000
+        ok = 200 <= response.status_code < 300
+        self.recorder.add(
+            endpoint, started, latency, response.status_code,
+            server_timing_queries(response.headers.get('Server-Timing')),
+            '' if ok else response.text,
+        )
+        if not ok or not response.content:
+            return None
+        return response.json()
+
+
+class Scenario:
+    """Lo que comparten los usuarios virtuales: datos sembrados y el Stripe falso."""
+
+    def __init__(self, data, stripe_server):
+        self.menu_items = data['menu_items']
+        self.menu_pages = max(1, -(-len(self.menu_items) // settings.REST_FRAMEWORK['PAGE_SIZE']))
+        self.stripe = stripe_server
+        self.event_ids = count(1)
+
+    async def customer(self, user):
+        """Ver el menú → agregar al carrito → sesión de checkout → crear orden → webhook → ver sus órdenes."""
+        await user.call('GET', '/api/menu-items/', params={'page': user.rng.randint(1, self.menu_pages)})
+        for menuitem_id in user.rng.sample(self.menu_items, 2):
+            await user.call('GET', '/api/menu-items/{id}/', id=menuitem_id)
+            await user.call('POST', '/api/cart/', json={'menuitem_id': menuitem_id, 'quantity': user.rng.randint(1, 3)})
+        await user.call('GET', '/api/cart/')
+        session = await user.call('POST', '/api/checkout/create-session/')
+        await user.call('POST', '/api/orders/create/')
+        if session is not None and 'id' in session:
+            await self._send_webhook(user, session['id'])
+        await user.call('GET', '/api/orders/')
+
+    async def _send_webhook(self, user, session_id):
+        # Lo que mandaría Stripe al pagar: checkout.session.completed firmado con el secreto del webhook
+        self.stripe.complete(session_id)
+        payload = json.dumps({
+            'id': f'evt_loadtest_{next(self.event_ids)}',
+            'object': 'event',
+            'type': 'checkout.session.completed',
+            'data': {'object': self.stripe.sessions[session_id]},
+        }).encode()
+        await user.call(
+            'POST', '/api/webhook/stripe/', authenticated=False, content=payload,
+            headers={'Content-Type': 'application/json', 'Stripe-Signature': webhook_signature(payload)},
+        )
+
+    async def crew(self, user):
+        """Ver las órdenes en reparto → cambiar el estado de una (delivering ↔ delivered)."""
+        await user.call('GET', '/api/orders/', params={'status': Order.STATUS_DELIVERING})
+        order_id, status = next(user.updates)
+        await user.call('PATCH', '/api/orders/{id}/', id=order_id, json={'status': status})
+
+
+def summarize(latencies, queries, errors, elapsed):
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2),
+        'p50': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99': round(percentile(latencies, 99), 2) if latencies else None,
+        'queries': round(statistics.mean(queries), 2) if queries else None,
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def _change(old, new):
+    if old is None or new is None:
+        return ''
+    if not old:
+        return '' if not new else '(new)'
+    return f'({(new - old) / old * 100:+.0f}%)'
+
+
+def _fmt(value, digits=1):
+    return '-' if value is None else f'{value:.{digits}f}'
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de la API con escenarios: clientes (menú → carrito → checkout → "
+        "orden → webhook de Stripe → sus órdenes) y repartidores (órdenes en reparto → "
+        "cambio de estado). Levanta gunicorn con una BD SQLite temporal y datos sembrados, "
+        "contra un Stripe falso. Reporta por endpoint p50/p95/p99, req/s y queries por "
+        "request; --output guarda el resultado en JSON y --compare lo compara con otro."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS, default='wsgi', help='gunicorn síncrono (gthread) o uvicorn')
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--threads', type=int, default=4, help='Hilos por worker (solo wsgi)')
+        parser.add_argument('--concurrency', type=int, default=10, help='Usuarios virtuales simultáneos')
+        parser.add_argument('--crew-share', type=float, default=0.2, help='Fracción de usuarios que son repartidores')
+        parser.add_argument('--duration', type=float, default=30, help='Segundos medidos')
+        parser.add_argument('--warmup', type=float, default=3, help='Segundos iniciales que no se miden')
+        parser.add_argument('--stripe-latency', type=float, default=0.1, help='Latencia del Stripe falso (s)')
+        parser.add_argument('--customers', type=int, default=500, help='Clientes sembrados')
+        parser.add_argument('--crew', type=int, default=10, help='Repartidores sembrados')
+        parser.add_argument('--menu-items', type=int, default=120, help='Platos en el menú')
+        parser.add_argument('--orders', type=int, default=20_000, help='Órdenes históricas sembradas')
+        parser.add_argument('--seed', type=int, default=1, help='Semilla de los datos y de los escenarios')
+        parser.add_argument('--output', help='Guardar el resultado en este archivo JSON')
+        parser.add_argument('--compare', help='JSON de una ejecución anterior con el que comparar')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Con --compare: fallar si el p95 de un endpoint empeora más de este porcentaje o sube sus queries',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1")
+        if not 0 <= options['crew_share'] <= 1:
+            raise CommandError("--crew-share must be between 0 and 1")
+        if options['max_regression'] is not None and not options['compare']:
+            raise CommandError("--max-regression needs --compare")
+        baseline = self._load_report(options['compare']) if options['compare'] else None
+        # Con DEBUG=True el logger raíz imprimiría cada evento de conexión del generador de carga
+        for name in ('httpx', 'httpcore', 'asyncio'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        crew_users = round(options['concurrency'] * options['crew_share'])
+        customer_users = options['concurrency'] - crew_users
+        with tempfile.TemporaryDirectory() as tmp, FakeStripeServer(latency=options['stripe_latency']) as stripe_server:
+            env = environment(Path(tmp), stripe_server.url)
+            self.stdout.write("Seeding data...")
+            manage(env, 'migrate', '--verbosity', '0')
+            data = json.loads(run_script(env, seed_script(
+                customers=max(options['customers'], customer_users),
+                crew=max(options['crew'], crew_users),
+                menu_items=options['menu_items'],
+                orders=options['orders'],
+                crew_orders=30,
+                random_seed=options['seed'],
+            )))
+            server_env = {**env, 'ASYNC_CHECKOUT': str(options['server'] == 'asgi')}
+            with gunicorn(self._server_args(options), server_env) as base_url:
+                self.stdout.write(
+                    f"Running {customer_users} customer(s) and {crew_users} crew member(s) "
+                    f"for {options['duration']:g}s against {options['server']}..."
+                )
+                scenario = Scenario(data, stripe_server)
+                recorder, elapsed = asyncio.run(
+                    self._run(base_url, scenario, data, customer_users, crew_users, options)
+                )
+
+        report = self._report(recorder, elapsed, options)
+        self._print(report, recorder)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f"Saved {options['output']}")
+        if baseline is not None:
+            self._compare(baseline, report, options['max_regression'])
+
+    def _server_args(self, options):
+        if options['server'] == 'asgi':
+            return ['littlelemon.asgi:application', '--workers', str(options['workers']), '-k', 'uvicorn.workers.UvicornWorker']
+        return [
+            'littlelemon.wsgi:application', '--workers', str(options['workers']),
+            '--threads', str(options['threads']), '-k', 'gthread',
+        ]
+
+    async def _run(self, base_url, scenario, data, customer_users, crew_users, options):
+        started = time.perf_counter()
+        recorder = Recorder(measure_from=started + options['warmup'])
+        deadline = recorder.measure_from + options['duration']
+        total = customer_users + crew_users
+        limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+
+        async def loop(journey, user):
+            while time.perf_counter() < deadline:
+                await journey(user)
+
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=300) as http:
+            # Cada usuario virtual tiene su propio cliente/repartidor y su propia secuencia aleatoria
+            journeys = []
+            for i in range(customer_users):
+                user = VirtualUser(http, data['customers'][i], recorder, random.Random(f"{options['seed']}-customer-{i}"))
+                journeys.append(loop(scenario.customer, user))
+            for i in range(crew_users):
+                member = data['crew'][i]
+                user = VirtualUser(http, member['token'], recorder, random.Random(f"{options['seed']}-crew-{i}"))
+                user.updates = cycle(
+                    [(pk, Order.STATUS_DELIVERED) for pk in member['orders']]
+                    + [(pk, Order.STATUS_DELIVERING) for pk in member['orders']]
+                )
+                journeys.append(loop(scenario.crew, user))
+            await asyncio.gather(*journeys)
+        return recorder, time.perf_counter() - recorder.measure_from
+
+    def _report(self, recorder, elapsed, options):
+        endpoints = sorted(set(recorder.latencies) | set(recorder.errors))
+        return {
+            'version': REPORT_VERSION,
+            'commit': _git_commit(),
+            'created_at': timezone.now().isoformat(),
+            'options': {name: options[name] for name in COMPARABLE_OPTIONS},
+            'elapsed': round(elapsed, 2),
+            'endpoints': {
+                endpoint: summarize(
+                    recorder.latencies[endpoint], recorder.queries[endpoint], recorder.errors[endpoint], elapsed
+                )
+                for endpoint in endpoints
+            },
+            'total': summarize(
+                [latency for values in recorder.latencies.values() for latency in values],
+                [queries for values in recorder.queries.values() for queries in values],
+                sum(recorder.errors.values()),
+                elapsed,
+            ),
+        }
+
+    def _print(self, report, recorder):
+        self.stdout.write(
+            f"\n{'endpoint':<38} {'requests':>8} {'errors':>6} {'req/s':>7} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7}"
+        )
+        rows = list(report['endpoints'].items()) + [('all', report['total'])]
+        for endpoint, row in rows:
+            self.stdout.write(
+                f"{endpoint:<38} {row['requests']:>8} {row['errors']:>6} {row['rps']:>7.1f} "
+                f"{_fmt(row['p50']):>8} {_fmt(row['p95']):>8} {_fmt(row['p99']):>8} {_fmt(row['queries']):>7}"
+            )
+        for endpoint, detail in recorder.first_errors.items():
+            self.stdout.write(self.style.WARNING(f"{endpoint}: first error: {detail}"))
+
+    def _load_report(self, path):
+        try:
+            report = json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        if report.get('version') != REPORT_VERSION:
+            raise CommandError(f"{path} isn't a loadtest report (version {REPORT_VERSION})")
+        return report
+
+    def _compare(self, baseline, report, max_regression):
+        self.stdout.write(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline['created_at']}):")
+        changed = [
+            name for name in COMPARABLE_OPTIONS
+            if baseline['options'].get(name) != report['options'].get(name)
+        ]
+        if changed:
+            self.stdout.write(self.style.WARNING(
+                "Options differ, the numbers aren't directly comparable: "
+                + ", ".join(f"{name} {baseline['options'].get(name)} → {report['options'].get(name)}" for name in changed)
+            ))
+        self.stdout.write(f"{'endpoint':<38} {'p50 ms':>20} {'p95 ms':>20} {'req/s':>20} {'queries':>14}")
+
+        regressions = []
+        rows = [(endpoint, baseline['endpoints'].get(endpoint), report['endpoints'].get(endpoint))
+                for endpoint in sorted(set(baseline['endpoints']) | set(report['endpoints']))]
+        rows.append(('all', baseline['total'], report['total']))
+        for endpoint, old, new in rows:
+            if old is None or new is None:
+                self.stdout.write(f"{endpoint:<38} only in the {'new run' if old is None else 'baseline'}")
+                continue
+            cells = []
+            for key in ('p50', 'p95', 'rps'):
+                cells.append(f"{_fmt(old[key])} → {_fmt(new[key])} {_change(old[key], new[key])}")
+            cells.append(f"{_fmt(old['queries'])} → {_fmt(new['queries'])}")
+            self.stdout.write(f"{endpoint:<38} {cells[0]:>20} {cells[1]:>20} {cells[2]:>20} {cells[3]:>14}")
+
+            if max_regression is None or endpoint == 'all':
+                continue
+            if old['p95'] and new['p95'] and (new['p95'] - old['p95']) / old['p95'] * 100 > max_regression:
+                regressions.append(f"{endpoint} p95 {_change(old['p95'], new['p95'])}")
+            # Las queries por request no dependen de la máquina: cualquier aumento es una regresión
+            if old['queries'] is not None and new['queries'] is not None and new['queries'] > old['queries'] + 0.5:
+                regressions.append(f"{endpoint} queries {old['queries']} → {new['queries']}")
+
+        if regressions:
+            raise CommandError("Regressions: " + "; ".join(regressions))
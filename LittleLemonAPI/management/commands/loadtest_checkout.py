@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+from LittleLemonAPI.fakestripe import FakeStripeServer
+from LittleLemonAPI.loadtest import environment, gunicorn, manage, percentile, run_script
+
+SEED_SCRIPT = '''\
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.tokens import RefreshToken
+from LittleLemonAPI.models import Cart, MenuItem
+user, _ = User.objects.get_or_create(username="loadtest", defaults={"email": "loadtest@example.com"})
+for item in MenuItem.objects.order_by("id")[:3]:
+    Cart(user=user, menuitem=item, quantity=2).save()
+print(RefreshToken.for_user(user).access_token)
+'''
+
+MODES = {
+    'wsgi': ['littlelemon.wsgi:application', '--workers', '1', '--threads', '1'],
+    'asgi': ['littlelemon.asgi:application', '--workers', '1', '-k', 'uvicorn.workers.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga de POST /api/checkout/create-session/ con un solo worker de "
+        "gunicorn, síncrono (WSGI) y async (ASGI + uvicorn), contra un Stripe falso con "
+        "latencia fija. Usa una BD SQLite temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default='wsgi,asgi', help='Modos a probar: wsgi, asgi')
+        parser.add_argument('--concurrency', default='1,10,50,100', help='Clientes concurrentes por nivel')
+        parser.add_argument('--duration', type=float, default=10, help='Segundos por nivel')
+        parser.add_argument('--latency', type=float, default=0.5, help='Latencia simulada de Stripe (s)')
+
+    def handle(self, *args, **options):
+        modes = options['modes'].split(',')
+        if set(modes) - MODES.keys():
+            raise CommandError(f"Unknown mode; choose from {', '.join(MODES)}")
+        levels = [int(level) for level in options['concurrency'].split(',')]
+        # Con DEBUG=True el logger raíz imprimiría cada evento de conexión del generador de carga
+        for name in ('httpx', 'httpcore'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+
+        with tempfile.TemporaryDirectory() as tmp, FakeStripeServer(latency=options['latency']) as stripe_server:
+            env = environment(Path(tmp), stripe_server.url)
+            manage(env, 'migrate', '--verbosity', '0')
+            token = run_script(env, SEED_SCRIPT)
+            self.stdout.write(f"Fake Stripe latency: {options['latency']}s\n")
+            self.stdout.write(f"{'mode':<6} {'clients':>8} {'ok':>6} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+            for mode in modes:
+                with gunicorn(MODES[mode], {**env, 'ASYNC_CHECKOUT': str(mode == 'asgi')}) as base_url:
+                    for level in levels:
+                        result = asyncio.run(self._load(base_url, token, level, options['duration']))
+                        self.stdout.write(
+                            f"{mode:<6} {level:>8} {result['ok']:>6} {result['errors']:>7} "
+                            f"{result['rps']:>8.1f} {result['p50']:>8.0f} {result['p95']:>8.0f}"
+                        )
+
+    async def _load(self, base_url, token, clients, duration):
+        latencies, errors = [], 0
+        headers = {'Authorization': f'Bearer {token}'}
+        limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+        deadline = time.monotonic() + duration
+
+        async def client(http):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await http.post(f'{base_url}/api/checkout/create-session/', headers=headers)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        async with httpx.AsyncClient(limits=limits, timeout=300) as http:
+            await asyncio.gather(*(client(http) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+        return {
+            'ok': len(latencies),
+            'errors': errors,
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) if latencies else 0,
+            'p95': percentile(latencies, 95) if latencies else 0,
+        }
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from LittleLemonAPI.stripe_events import process_pending
+
+
+class Command(BaseCommand):
+    help = "Procesa los eventos de Stripe registrados por el webhook (por lotes, con reintentos)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Seguir procesando hasta que se detenga el proceso')
+        parser.add_argument('--interval', type=float, default=2.0, help='Segundos de espera cuando no hay eventos')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if not options['loop']:
+            processed = process_pending(batch_size)
+            self.stdout.write(f"Processed {processed} event(s).")
+            return
+
+        self.stdout.write("Processing Stripe events (Ctrl+C to stop)...")
+        try:
+            while True:
+                close_old_connections()
+                processed = process_pending(batch_size)
+                if processed:
+                    self.stdout.write(f"Processed {processed} event(s).")
+                if processed < batch_size:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from LittleLemonAPI.models import OrderEvent
+
+
+class Command(BaseCommand):
+    help = "Borra los OrderEvent más antiguos que ORDER_EVENTS_RETENTION_DAYS (o --days)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, default=None)
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.ORDER_EVENTS_RETENTION_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = OrderEvent.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(f"Deleted {deleted} order event(s).")
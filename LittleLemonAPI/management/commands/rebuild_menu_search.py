@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import menu_cache
+from LittleLemonAPI.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice full-text del menú (FTS5 en SQLite). Necesario tras "
+        "cargas masivas que no disparan signals (bulk_create, queryset.update)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        count = rebuild_index(using=options['database'])
+        # Los listados con ?search= cacheados pueden haber cambiado
+        menu_cache.bump_generation()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} menu items"))
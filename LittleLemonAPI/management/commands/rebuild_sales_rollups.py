@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula los rollups de ventas (por día, menuitem y categoría) desde "
+        "Order/OrderItem. Para el backfill inicial o tras cambios masivos."
+    )
+
+    def handle(self, *args, **options):
+        created = rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            "Rebuilt sales rollups: "
+            + ", ".join(f"{count} {name} rows" for name, count in created.items())
+        ))
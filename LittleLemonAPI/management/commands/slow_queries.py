@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from LittleLemonAPI import slow_queries
+
+
+class Command(BaseCommand):
+    help = "Muestra los fingerprints de queries lentas con más tiempo total (ver LittleLemonAPI/slow_queries.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None, help="Fingerprints a mostrar (SLOW_QUERY_TOP_N).")
+        parser.add_argument('--explain', action='store_true', help="Incluye el plan guardado de cada query.")
+        parser.add_argument('--reset', action='store_true', help="Vacía el log.")
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            slow_queries.reset()
+            self.stdout.write("Slow query log cleared.")
+            return
+
+        entries = slow_queries.top(options['limit'])
+        if not entries:
+            self.stdout.write("No slow queries recorded.")
+            return
+        for rank, entry in enumerate(entries, 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank} [{entry['fingerprint']}] {entry['calls']} call(s), "
+                f"total {entry['total_time'] * 1000:.1f} ms, mean {entry['mean_time'] * 1000:.1f} ms, "
+                f"max {entry['max_time'] * 1000:.1f} ms"
+            ))
+            self.stdout.write(f"  views: {', '.join(entry['views'])}")
+            self.stdout.write(f"  {entry['query']}")
+            if options['explain']:
+                plan = entry['plan'] or '(not sampled yet)'
+                self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
@@ -0,0 +1,132 @@
+"""
+Cache de resultados de los listados de /api/menu-items/.
+
+La clave es la query normalizada (parámetros ordenados, página incluida;
+en minúsculas solo los que el servidor compara sin distinguir
+mayúsculas). Cada worker guarda un LRU limitado por tamaño; la
+invalidación es por generación: las signals de MenuItem/Category
+reemplazan un fichero en SHARED_STATE_DIR y todos los workers ven el
+cambio con un stat().
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+
+def _generation_path():
+    return os.path.join(settings.SHARED_STATE_DIR, 'menu_generation')
+
+
+def current_generation():
+    try:
+        st = os.stat(_generation_path())
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def _write_generation():
+    path = _generation_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Fichero nuevo en cada bump: cambia el inode aunque el mtime coincida
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w'):
+        pass
+    os.replace(tmp_path, path)
+
+
+def bump_generation():
+    """Invalida todos los listados cacheados cuando se confirma la transacción."""
+    transaction.on_commit(_write_generation)
+
+
+# category es iexact y la búsqueda full-text/icontains no distingue mayúsculas;
+# el resto (ordering, cursor en base64, page=last, ...) se usa tal cual
+CASE_INSENSITIVE_PARAMS = ('category', 'search')
+
+
+def make_key(request):
+    params = sorted(
+        (name, value.lower() if name in CASE_INSENSITIVE_PARAMS else value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    # Sin ?page= es la página 1
+    if not any(name == 'page' for name, _ in params):
+        params.append(('page', '1'))
+        params.sort()
+    # next/previous son URLs absolutas: el host forma parte de la clave
+    return (request.build_absolute_uri(request.path), tuple(params))
+
+
+class ResultCache:
+    """LRU por proceso con límite de memoria y contadores de aciertos/fallos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _check_generation(self, generation):
+        if generation != self._generation:
+            self._entries.clear()
+            self.size = 0
+            self._generation = generation
+
+    def get(self, key, generation):
+        with self._lock:
+            self._check_generation(generation)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, data, generation):
+        """generation es la leída antes de consultar la BD: si cambió entretanto, no se guarda."""
+        max_bytes = settings.MENU_CACHE_MAX_BYTES
+        # Aproximación del coste en memoria: tamaño del JSON que se enviaría
+        size = len(json.dumps(data, cls=JSONEncoder, ensure_ascii=False))
+        if size > max_bytes:
+            return
+        with self._lock:
+            if generation != current_generation():
+                return
+            self._check_generation(generation)
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self._entries[key] = (data, size)
+            self.size += size
+            while self.size > max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': settings.MENU_CACHE_MAX_BYTES,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'pid': os.getpid(),
+            }
+
+
+results = ResultCache()
@@ -0,0 +1,126 @@
+"""
+Snapshot del menú completo agrupado por categoría, pre-renderizado a JSON.
+
+Se reconstruye al cambiar MenuItem/Category (ver signals.py) y se escribe de
+forma atómica en MENU_SNAPSHOT_PATH. Cada worker de gunicorn lo mapea en
+memoria (mmap) y lo sirve tal cual: sin ORM ni serializers por request.
+
+Los cambios que no pasan por las signals (bulk_create, QuerySet.update, un
+restore de la BD, un fichero de un deploy anterior) no lo reconstruyen: en
+su primera lectura y después cada MENU_SNAPSHOT_CHECK_INTERVAL segundos,
+cada proceso genera el snapshot desde la BD y compara su hash con el
+guardado junto al fichero; si no coinciden lo reescribe.
+"""
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import fcntl
+except ImportError:  # Windows (solo desarrollo)
+    fcntl = None
+
+from .models import Category, MenuItem
+from .serializers import CategorySerializer, MENU_ITEM_VALUES
+
+
+def build_snapshot():
+    """Devuelve el menú completo como bytes JSON (2 queries)."""
+    categories = {
+        category.id: {**CategorySerializer(category).data, 'items': []}
+        for category in Category.objects.order_by('id')
+    }
+    data = MENU_ITEM_VALUES.represent(MENU_ITEM_VALUES.values(MenuItem.objects.order_by('id')))
+    for item in data:
+        categories[item['category']]['items'].append(item)
+
+    payload = {'count': len(data), 'categories': list(categories.values())}
+    return json.dumps(payload, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def content_stamp(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def stored_stamp():
+    try:
+        with open(f'{settings.MENU_SNAPSHOT_PATH}.stamp') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _replace(path, content):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot():
+    path = settings.MENU_SNAPSHOT_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f'{path}.lock', 'a') as lock:
+        # El lock serializa las reconstrucciones entre procesos: quien escribe último leyó último
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        content = build_snapshot()
+        _replace(path, content)
+        _replace(f'{path}.stamp', content_stamp(content).encode())
+
+
+def schedule_rebuild():
+    """Reconstruye el snapshot cuando se confirma la transacción actual."""
+    transaction.on_commit(write_snapshot)
+
+
+class SnapshotReader:
+    """Mantiene un mmap del fichero y lo vuelve a abrir cuando otro proceso lo reemplaza."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._mmap = None
+        self._etag = None
+        self._checked_at = None
+
+    def _check(self):
+        """Reescribe el fichero si ya no es lo que generaría la BD (2 queries cada intervalo)."""
+        now = time.monotonic()
+        with self._lock:
+            if self._checked_at is not None and now - self._checked_at < settings.MENU_SNAPSHOT_CHECK_INTERVAL:
+                return
+            self._checked_at = now
+        if stored_stamp() != content_stamp(build_snapshot()):
+            write_snapshot()
+
+    def read(self):
+        """Devuelve (contenido, etag)."""
+        self._check()
+        path = settings.MENU_SNAPSHOT_PATH
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            write_snapshot()
+            st = os.stat(path)
+
+        with self._lock:
+            if (st.st_ino, st.st_mtime_ns, st.st_size) != self._key:
+                with open(path, 'rb') as f:
+                    # fstat del fichero abierto: la clave corresponde al contenido mapeado
+                    st = os.fstat(f.fileno())
+                    # El mmap anterior se libera cuando nadie lo referencia
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._key = (st.st_ino, st.st_mtime_ns, st.st_size)
+                self._etag = '"%x-%x"' % (st.st_mtime_ns, st.st_size)
+            return self._mmap[:], self._etag
+
+
+reader = SnapshotReader()
@@ -0,0 +1,285 @@
+"""
+Instrumentación por request: cabecera Server-Timing e histogramas para /metrics.
+
+PerformanceMiddleware mide cada request y la atribuye a la vista resuelta
+(`MenuItemViewSet.list`, `CreateOrderView.post`, `stripe_webhook`, ...):
+
+- db: queries y tiempo en la BD, con un execute wrapper que se instala en
+  cada conexión (signal connection_created) y suma en los timings de la
+  request actual (un ContextVar, así que también cuenta las queries de las
+  vistas async que corren en sync_to_async). El mismo wrapper pasa las
+  queries que superan SLOW_QUERY_THRESHOLD_MS a slow_queries.py.
+- view: código de la vista y serializers, sin la BD.
+- render: el renderer de DRF (process_template_response → post-render).
+- total: hasta que la respuesta sale del middleware (en las respuestas
+  streaming, hasta el primer byte).
+
+Cada worker acumula las observaciones en memoria y cada
+METRICS_FLUSH_INTERVAL segundos las suma en el SQLite de shared_state, así
+que /metrics devuelve los histogramas de todos los workers del host.
+"""
+import atexit
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import shared_state, slow_queries
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# nombre → (help, buckets)
+HISTOGRAMS = {
+    'littlelemon_request_duration_seconds': ('Request latency until the response leaves the middleware.', DURATION_BUCKETS),
+    'littlelemon_request_db_seconds': ('Time spent in database queries per request.', DURATION_BUCKETS),
+    'littlelemon_request_view_seconds': ('Time in view code and serializers, without database time.', DURATION_BUCKETS),
+    'littlelemon_request_render_seconds': ('Time rendering the response body.', DURATION_BUCKETS),
+    'littlelemon_request_db_queries': ('Database queries per request.', QUERY_BUCKETS),
+}
+RESPONSES_TOTAL = 'littlelemon_responses_total'
+
+TABLE = 'metrics'
+DDL = (
+    'CREATE TABLE IF NOT EXISTS metrics ('
+    'name TEXT NOT NULL, labels TEXT NOT NULL, le TEXT NOT NULL, value REAL NOT NULL, '
+    'PRIMARY KEY (name, labels, le)) WITHOUT ROWID'
+)
+# Valores de la columna le que no son límites de bucket
+SUM = 'sum'
+COUNTER = ''
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self, request):
+        self.request = request
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.render_started = None
+        self.render = 0.0
+
+    def rendered(self, response):
+        if self.render_started is not None:
+            self.render = time.perf_counter() - self.render_started
+        return response
+
+    def view(self, total):
+        return max(total - self.db - self.render, 0)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper permanente: suma la query a la request en curso, si la
+    hay, y registra las lentas (también fuera de una request: comandos, workers).
+    """
+    if slow_queries.active():
+        # El EXPLAIN de slow_queries no cuenta como query de la request
+        return execute(sql, params, many, context)
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        result = execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        if timings is not None:
+            timings.queries += 1
+            timings.db += elapsed
+    if settings.SLOW_QUERY_LOG and elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        view = view_name(timings.request) if timings is not None else None
+        slow_queries.record(sql, params, many, elapsed, context['connection'], view)
+    return result
+
+
+def install(connection):
+    # Al principio de la lista: execute_wrapper() hace pop() del último al salir,
+    # y una conexión abierta dentro de ese bloque no debe llevarse este wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    func = match.func
+    cls = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if cls is None:
+        return getattr(func, '__name__', match.view_name or 'unknown')
+    method = request.method.lower()
+    # ViewSets: la acción (list, retrieve, ...) en vez del método HTTP
+    actions = getattr(func, 'actions', None) or {}
+    return f'{cls.__name__}.{actions.get(method, method)}'
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bucket(value, buckets):
+    for bound in buckets:
+        if value <= bound:
+            return repr(float(bound))
+    return '+Inf'
+
+
+class _Aggregator:
+    """Observaciones del worker pendientes de sumar en shared_state."""
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def add(self, key, value):
+        self.pending[key] = self.pending.get(key, 0) + value
+
+    def observe(self, view, method, status, timings, total):
+        labels = f'view="{_label(view)}",method="{_label(method)}"'
+        observations = (
+            ('littlelemon_request_duration_seconds', total),
+            ('littlelemon_request_db_seconds', timings.db),
+            ('littlelemon_request_view_seconds', timings.view(total)),
+            ('littlelemon_request_render_seconds', timings.render),
+            ('littlelemon_request_db_queries', timings.queries),
+        )
+        with self.lock:
+            for name, value in observations:
+                self.add((name, labels, _bucket(value, HISTOGRAMS[name][1])), 1)
+                self.add((name, labels, SUM), value)
+            self.add((RESPONSES_TOTAL, f'{labels},status="{status}"', COUNTER), 1)
+
+    def due(self):
+        return time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            shared_state.ensure_table(TABLE, DDL)
+            with shared_state.transaction() as conn:
+                conn.executemany(
+                    'INSERT INTO metrics (name, labels, le, value) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(name, labels, le) DO UPDATE SET value = value + excluded.value',
+                    [(*key, value) for key, value in pending.items()],
+                )
+        except Exception:
+            # Se reintenta en el próximo flush en vez de perder lo acumulado
+            with self.lock:
+                for key, value in pending.items():
+                    self.add(key, value)
+            raise
+
+
+_aggregator = _Aggregator()
+
+
+def flush():
+    _aggregator.flush()
+
+
+def _flush_quietly():
+    try:
+        _aggregator.flush()
+    except Exception:
+        logger.exception("Couldn't flush request metrics")
+
+
+atexit.register(_flush_quietly)
+
+
+def render_metrics():
+    """Los histogramas de todos los workers en formato de texto de Prometheus."""
+    flush()
+    shared_state.ensure_table(TABLE, DDL)
+    rows = shared_state.connection().execute('SELECT name, labels, le, value FROM metrics').fetchall()
+    values = {}
+    for name, labels, le, value in rows:
+        values.setdefault(name, {}).setdefault(labels, {})[le] = value
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels, series in sorted(values.get(name, {}).items()):
+            cumulative = 0
+            for bound in [repr(float(bound)) for bound in buckets] + ['+Inf']:
+                cumulative += series.get(bound, 0)
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative:g}')
+            lines.append(f'{name}_sum{{{labels}}} {series.get(SUM, 0):.6f}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative:g}')
+    lines += [f'# HELP {RESPONSES_TOTAL} Responses by view, method and status code.', f'# TYPE {RESPONSES_TOTAL} counter']
+    for labels, series in sorted(values.get(RESPONSES_TOTAL, {}).items()):
+        lines.append(f'{RESPONSES_TOTAL}{{{labels}}} {series.get(COUNTER, 0):g}')
+    return '\n'.join(lines) + '\n'
+
+
+class PerformanceMiddleware:
+    """Va primero en MIDDLEWARE para que total incluya al resto de middlewares."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFORMANCE_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timings)
+        if _aggregator.due():
+            _flush_quietly()
+        return response
+
+    async def __acall__(self, request):
+        timings, token = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._finish(request, response, timings)
+        if _aggregator.due():
+            # El SQLite compartido puede esperar un lock: fuera del event loop
+            await sync_to_async(_flush_quietly, thread_sensitive=False)()
+        return response
+
+    def process_template_response(self, request, response):
+        # Justo antes de response.render(); add_post_render_callback marca el final
+        timings = _current.get()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(timings.rendered)
+        return response
+
+    def _start(self, request):
+        timings = RequestTimings(request)
+        return timings, _current.set(timings)
+
+    def _finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries", '
+                f'view;dur={timings.view(total) * 1000:.1f}, render;dur={timings.render * 1000:.1f}, '
+                f'total;dur={total * 1000:.1f}'
+            )
+        _aggregator.observe(view_name(request), request.method, response.status_code, timings, total)
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+FTS_TABLE = 'LittleLemonAPI_menuitem_fts'
+MENUITEM_TABLE = 'LittleLemonAPI_menuitem'
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'ALTER TABLE "{MENUITEM_TABLE}" ADD COLUMN "search_vector" tsvector GENERATED ALWAYS AS ('
+            "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+            ') STORED'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX "LittleLemonAPI_menuitem_search_gin" ON "{MENUITEM_TABLE}" USING GIN ("search_vector")'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5(title, description, tokenize = \'porter unicode61\')'
+        )
+        schema_editor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) '
+            f'SELECT id, title, COALESCE(description, \'\') FROM "{MENUITEM_TABLE}"'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'ALTER TABLE "{MENUITEM_TABLE}" DROP COLUMN "search_vector"')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE "{FTS_TABLE}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0004_stripeevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('LittleLemonAPI', '0009_order_access_indexes'),
+    ]
+
+    operations = [
+        # order_status_date_idx ya sirve las colas de trabajo con un seek por estado
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_open_status_idx',
+        ),
+    ]
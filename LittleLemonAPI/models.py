@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, ExpressionWrapper
+from django.utils import timezone
 from django.contrib.auth.models import User
 
 
@@ -44,6 +46,57 @@ class Cart(models.Model):
         return f"{self.user.username}'s cart - {self.menuitem.title} x{self.quantity}"
 
 
+class OrderManager(models.Manager):
+    def create_from_cart(self, user, **fields):
+        """
+        Crea la orden con el carrito del usuario en un número fijo de sentencias,
+        sea cual sea el tamaño del carrito: bloquea las líneas del carrito
+        (leyendo a la vez el precio actual del menú y el importe de cada línea
+        calculado en SQL), inserta la orden, inserta todas las líneas en bloque
+        y vacía el carrito.
+
+        Los rollups de ventas (ver rollups.py) se actualizan en la misma
+        transacción, también con un número fijo de sentencias.
+
+        Devuelve None si el carrito está vacío.
+        """
+        from . import rollups
+
+        line_price = ExpressionWrapper(
+            F('quantity') * F('menuitem__price'),
+            output_field=models.DecimalField(max_digits=6, decimal_places=2),
+        )
+        with transaction.atomic(savepoint=False):
+            lines = list(
+                Cart.objects.select_for_update(of=('self',))
+                .filter(user_id=user.pk)
+                .order_by('id')
+                .values_list('id', 'menuitem_id', 'quantity', 'menuitem__price', 'menuitem__category_id')
+                .annotate(line_price=line_price)
+            )
+            if not lines:
+                return None
+
+            order = self.create(user_id=user.pk, total=sum(line[5] for line in lines), **fields)
+            # bulk_create no llama a OrderItem.save(): los precios ya vienen calculados
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    menuitem_id=menuitem_id,
+                    quantity=quantity,
+                    unit_price=unit_price,
+                    price=price,
+                )
+                for _, menuitem_id, quantity, unit_price, _, price in lines
+            ])
+            Cart.objects.filter(pk__in=[line[0] for line in lines]).delete()
+            rollups.lines_added(order, [
+                (menuitem_id, category_id, quantity, price)
+                for _, menuitem_id, quantity, _, category_id, price in lines
+            ])
+        return order
+
+
 class Order(models.Model):
     STATUS_PENDING = 'pending'
     STATUS_PREPARING = 'preparing'
@@ -59,26 +112,51 @@ class Order(models.Model):
         (STATUS_CANCELLED, 'Cancelled'),
     ]
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders")
+    # Sin índice propio (tampoco status ni date): los cubren los compuestos de Meta.indexes
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="orders", db_index=False)
     delivery_crew = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
         related_name="deliveries",
-        limit_choices_to={'groups__name': 'Delivery crew'}
+        limit_choices_to={'groups__name': 'Delivery crew'},
+        db_index=False,
     )
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
         default=STATUS_PENDING,
-        db_index=True
     )
     total = models.DecimalField(max_digits=6, decimal_places=2)
-    date = models.DateField(auto_now_add=True, db_index=True)
+    date = models.DateField(auto_now_add=True)
+
+    objects = OrderManager()
 
     class Meta:
-        ordering = ['-date']
+        # id desempata: el orden es estable entre páginas y coincide con los índices
+        ordering = ['-date', '-id']
+        indexes = [
+            # Listado completo de managers (página y cursor)
+            models.Index(fields=['-date', '-id'], name='order_date_id_idx'),
+            # Órdenes de un cliente, ya ordenadas
+            models.Index(fields=['user', '-date', '-id'], name='order_user_date_idx'),
+            # Órdenes de un repartidor, carga por repartidor y órdenes por asignar (dispatch.py)
+            models.Index(fields=['delivery_crew', 'status'], name='order_crew_status_idx'),
+            # ?status=... de managers, colas de trabajo incluidas (pending/preparing/delivering):
+            # salta al estado pedido y ya sale ordenado. Sin un parcial aparte para las abiertas,
+            # que las indexaría dos veces en cada cambio de estado
+            models.Index(fields=['status', '-date', '-id'], name='order_status_date_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores leídos de la BD: las signals los comparan para mover los rollups
+        # y registrar los cambios (OrderEvent)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_delivery_crew_id = instance.__dict__.get('delivery_crew_id')
+        return instance
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username} - {self.status}"
@@ -102,4 +180,89 @@ class OrderItem(models.Model):
     def save(self, *args, **kwargs):
         self.unit_price = self.menuitem.price
         self.price = self.unit_price * self.quantity
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class StripeEvent(models.Model):
+    """Registro de eventos de webhook de Stripe; los procesa `manage.py process_stripe_events`."""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    type = models.CharField(max_length=100)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+        verbose_name = "Stripe Event"
+        verbose_name_plural = "Stripe Events"
+
+    def __str__(self):
+        return f"{self.type} {self.event_id} - {self.status}"
+
+
+class OrderEvent(models.Model):
+    """
+    Cambio de estado o de repartidor de una orden, para el stream SSE
+    (ver order_events.py). Guarda los ids sueltos, sin FK: el evento sigue
+    siendo válido aunque la orden se borre, y la fila se escribe sin joins.
+    """
+    order_id = models.BigIntegerField()
+    user_id = models.IntegerField()
+    delivery_crew_id = models.IntegerField(null=True)
+    previous_delivery_crew_id = models.IntegerField(null=True)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Order Event"
+        verbose_name_plural = "Order Events"
+
+    def __str__(self):
+        return f"Order #{self.order_id} - {self.status}"
+
+
+class SalesRollup(models.Model):
+    """Totales por día y estado; los mantiene rollups.py y los consulta /api/reports/."""
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+    class Meta:
+        unique_together = ('date', 'status')
+        verbose_name_plural = "Daily Sales"
+
+
+class MenuItemDailySales(SalesRollup):
+    menuitem = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('date', 'status', 'menuitem')
+        verbose_name_plural = "Menu Item Daily Sales"
+
+
+class CategoryDailySales(SalesRollup):
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        unique_together = ('date', 'status', 'category')
+        verbose_name_plural = "Category Daily Sales"
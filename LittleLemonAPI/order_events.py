@@ -0,0 +1,209 @@
+"""
+Registro de cambios de órdenes y su difusión por Server-Sent Events.
+
+Cada cambio de estado o de repartidor inserta una fila OrderEvent (signal
+post_save de Order y asignaciones por lote de dispatch.py). En cada worker
+ASGI un único poller lee las filas nuevas por id (una query por intervalo,
+sin importar cuántas conexiones haya abiertas) y las reparte a las colas de
+los suscriptores que pueden ver esa orden, con el mismo alcance que
+OrderViewSet.get_queryset.
+
+Un id puede hacerse visible después de otro mayor (transacciones que
+confirman en otro orden): los huecos se vuelven a consultar durante
+GAP_TIMEOUT segundos.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import time
+import weakref
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max, Q
+
+from .models import OrderEvent
+from .roles import is_delivery_crew, is_manager
+
+logger = logging.getLogger(__name__)
+
+SCOPE_ALL = 'all'
+SCOPE_CREW = 'crew'
+SCOPE_CUSTOMER = 'customer'
+
+BATCH_SIZE = 500
+QUEUE_SIZE = 1000
+GAP_TIMEOUT = 10
+MAX_GAPS = 1000
+
+
+def order_scope(user):
+    """Qué órdenes ve el usuario: (SCOPE_ALL, None), (SCOPE_CREW, id) o (SCOPE_CUSTOMER, id)."""
+    if user.is_superuser or is_manager(user):
+        return SCOPE_ALL, None
+    if is_delivery_crew(user):
+        return SCOPE_CREW, user.pk
+    return SCOPE_CUSTOMER, user.pk
+
+
+def scope_q(scope, user_id):
+    """Filtro de OrderEvent para un alcance. El repartidor también ve las órdenes que le quitan."""
+    if scope == SCOPE_ALL:
+        return Q()
+    if scope == SCOPE_CREW:
+        return Q(delivery_crew_id=user_id) | Q(previous_delivery_crew_id=user_id)
+    return Q(user_id=user_id)
+
+
+def in_scope(event, scope, user_id):
+    if scope == SCOPE_ALL:
+        return True
+    if scope == SCOPE_CREW:
+        return user_id in (event.delivery_crew_id, event.previous_delivery_crew_id)
+    return event.user_id == user_id
+
+
+def order_changed(order, previous_status, previous_crew_id):
+    """Registra el cambio si cambió el estado o el repartidor (llamado desde post_save)."""
+    if order.status == previous_status and order.delivery_crew_id == previous_crew_id:
+        return
+    OrderEvent.objects.create(
+        order_id=order.pk,
+        user_id=order.user_id,
+        delivery_crew_id=order.delivery_crew_id,
+        previous_delivery_crew_id=previous_crew_id,
+        status=order.status,
+    )
+
+
+def orders_assigned(orders, assignments):
+    """
+    Eventos de una asignación por lote (QuerySet.update no dispara signals).
+    orders: filas (pk, user_id, delivery_crew_id, status) leídas antes del UPDATE.
+    """
+    OrderEvent.objects.bulk_create([
+        OrderEvent(
+            order_id=pk,
+            user_id=user_id,
+            delivery_crew_id=assignments[pk],
+            previous_delivery_crew_id=crew_id,
+            status=status,
+        )
+        for pk, user_id, crew_id, status in orders
+        if assignments.get(pk, crew_id) != crew_id
+    ])
+
+
+def format_event(event):
+    data = json.dumps({
+        'order': event.order_id,
+        'status': event.status,
+        'delivery_crew_id': event.delivery_crew_id,
+        'previous_delivery_crew_id': event.previous_delivery_crew_id,
+        'created_at': event.created_at.isoformat(),
+    })
+    return f'id: {event.pk}\nevent: order\ndata: {data}\n\n'
+
+
+def replay(scope, user_id, after_id, limit=QUEUE_SIZE):
+    """Eventos visibles con id > after_id, para reconexiones con Last-Event-ID."""
+    return list(
+        OrderEvent.objects.filter(scope_q(scope, user_id), pk__gt=after_id).order_by('pk')[:limit]
+    )
+
+
+class Subscription:
+    def __init__(self, scope, user_id):
+        self.scope = scope
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.closed = False
+
+    def offer(self, event):
+        if self.closed or not in_scope(event, self.scope, self.user_id):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Cliente demasiado lento: se cierra el stream y al reconectar
+            # recupera lo pendiente con Last-Event-ID
+            self.closed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class OrderEventBroker:
+    """Un poller por event loop que reparte los OrderEvent nuevos entre los suscriptores."""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = None
+        self.gaps = {}
+        self._task = None
+
+    async def subscribe(self, scope, user_id):
+        if self.last_id is None:
+            # Antes de volver: lo que se inserte desde ahora le llega al suscriptor
+            self.last_id = await sync_to_async(self._latest_id)()
+        subscription = Subscription(scope, user_id)
+        self.subscribers.add(subscription)
+        if self._task is None or self._task.done():
+            # Contexto vacío: el poller no hereda el contexto (ni el hilo de BD) de la request
+            self._task = asyncio.get_running_loop().create_task(self._run(), context=contextvars.Context())
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def _latest_id(self):
+        close_old_connections()
+        return OrderEvent.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    def _fetch(self):
+        close_old_connections()
+        query = Q(pk__gt=self.last_id)
+        if self.gaps:
+            query |= Q(pk__in=list(self.gaps))
+        return list(OrderEvent.objects.filter(query).order_by('pk')[:BATCH_SIZE])
+
+    def _advance(self, events):
+        now = time.monotonic()
+        seen = {event.pk for event in events}
+        for pk in seen:
+            self.gaps.pop(pk, None)
+        newest = max(seen, default=self.last_id)
+        if newest > self.last_id:
+            if newest - self.last_id - len(seen) <= MAX_GAPS:
+                for pk in range(self.last_id + 1, newest):
+                    if pk not in seen:
+                        self.gaps[pk] = now
+            self.last_id = newest
+        self.gaps = {pk: since for pk, since in self.gaps.items() if now - since < GAP_TIMEOUT}
+
+    async def _run(self):
+        while self.subscribers:
+            try:
+                events = await sync_to_async(self._fetch)()
+            except Exception:
+                logger.exception("Order event poll failed")
+                events = []
+            self._advance(events)
+            for event in events:
+                for subscription in list(self.subscribers):
+                    subscription.offer(event)
+            if len(events) < BATCH_SIZE:
+                await asyncio.sleep(settings.ORDER_EVENTS_POLL_INTERVAL)
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = OrderEventBroker()
+    return broker
@@ -0,0 +1,44 @@
+"""
+JSONParser sobre orjson (FAST_JSON, ver settings.REST_FRAMEWORK).
+
+Los cuerpos en UTF-8 se parsean con orjson; si orjson los rechaza (JSON
+inválido, surrogates sueltos) se vuelve a parsear con el JSONParser de DRF,
+que da el mismo resultado o el mismo ParseError que antes. Los cuerpos con
+20 dígitos seguidos van directo a DRF: orjson convierte los enteros de más
+de 64 bits en float y json los mantiene exactos. Sin orjson instalado se
+comporta como el de DRF.
+"""
+import codecs
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer, orjson
+
+# Dígitos → '0', el resto → ' ': buscar 20 ceros seguidos es mucho más rápido que una regex
+_DIGITS = bytes(ord('0') if chr(byte) in '0123456789' else ord(' ') for byte in range(256))
+_LONG_NUMBER = b'0' * 20
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None or not _is_utf8((parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)):
+            return super().parse(stream, media_type, parser_context)
+        body = stream.read()
+        if _LONG_NUMBER in body.translate(_DIGITS):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+
+
+def _is_utf8(encoding):
+    try:
+        return codecs.lookup(encoding).name == 'utf-8'
+    except LookupError:
+        # El JSONParser de DRF responde el error
+        return False
@@ -0,0 +1,215 @@
+"""
+Perfilado bajo demanda de una request, para staff.
+
+Con la cabecera `X-Profile: 1` (o `?profile=1`) y un usuario que pase
+IsAdmin, ProfilingMiddleware ejecuta esa request bajo cProfile y guarda el
+resultado en el SQLite de shared_state (visible desde cualquier worker). Se
+conservan los últimos PROFILE_BUFFER_SIZE perfiles; los más viejos se
+borran al guardar uno nuevo. La respuesta lleva X-Profile-Id para buscarlo
+en /api/profiles/<id>/ o descargarlo como .prof (formato pstats: snakeviz,
+`python -m pstats`).
+
+Sin la marca el costo es mirar una cabecera y el query string: el usuario
+solo se autentica (con las clases de autenticación de DRF) si viene la
+marca, y si no pasa IsAdmin la request sigue sin perfilar.
+
+Se perfila una sola request a la vez por proceso: desde Python 3.12
+cProfile usa sys.monitoring, que es global al proceso (un segundo enable()
+da ValueError). Si ya hay un perfil en curso, la request se sirve sin
+perfilar y sin X-Profile-Id. Por lo mismo, el perfil incluye lo que corran
+a la vez otros hilos (worker gthread) u otras tareas del event loop (ASGI);
+es fiel con workers sync o con poco tráfico.
+"""
+import cProfile
+import logging
+import marshal
+import pstats
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from . import shared_state
+from .metrics import view_name
+from .permissions import IsAdmin
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'HTTP_X_PROFILE'
+QUERY_PARAM = 'profile'
+ID_HEADER = 'X-Profile-Id'
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+TABLE = 'profiles'
+DDL = (
+    'CREATE TABLE IF NOT EXISTS profiles ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, user_id INTEGER, '
+    'method TEXT NOT NULL, path TEXT NOT NULL, view TEXT NOT NULL, status INTEGER NOT NULL, '
+    'duration REAL NOT NULL, stats BLOB NOT NULL)'
+)
+FIELDS = ('id', 'created_at', 'user_id', 'method', 'path', 'view', 'status', 'duration')
+
+
+def requested(request):
+    if request.META.get(HEADER, '').lower() in ('1', 'true', 'yes'):
+        return True
+    # Antes de parsear el query string, que casi nunca lo trae
+    if QUERY_PARAM not in request.META.get('QUERY_STRING', ''):
+        return False
+    return request.GET.get(QUERY_PARAM, '').lower() in ('1', 'true', 'yes')
+
+
+def authorized_user(request):
+    """El usuario si pasa IsAdmin con la autenticación de la API (JWT), si no None."""
+    drf_request = Request(request, authenticators=[cls() for cls in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        user = drf_request.user
+    except APIException:
+        # Token inválido: la vista responderá el 401 de siempre
+        return None
+    return user if IsAdmin().has_permission(drf_request, None) else None
+
+
+def save(request, response, user, profile, duration):
+    profile.create_stats()
+    shared_state.ensure_table(TABLE, DDL)
+    with shared_state.transaction() as conn:
+        cursor = conn.execute(
+            'INSERT INTO profiles (created_at, user_id, method, path, view, status, duration, stats) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (time.time(), user.pk, request.method, request.get_full_path(), view_name(request),
+             response.status_code, duration, marshal.dumps(profile.stats)),
+        )
+        conn.execute(
+            'DELETE FROM profiles WHERE id <= ?', (cursor.lastrowid - settings.PROFILE_BUFFER_SIZE,)
+        )
+    return cursor.lastrowid
+
+
+def list_profiles():
+    shared_state.ensure_table(TABLE, DDL)
+    rows = shared_state.connection().execute(f'SELECT {", ".join(FIELDS)} FROM profiles ORDER BY id DESC')
+    return [dict(zip(FIELDS, row)) for row in rows]
+
+
+def get_profile(profile_id):
+    """(metadatos, stats en formato pstats) o None si ya salió del buffer."""
+    shared_state.ensure_table(TABLE, DDL)
+    row = shared_state.connection().execute(
+        f'SELECT {", ".join(FIELDS)}, stats FROM profiles WHERE id = ?', (profile_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return dict(zip(FIELDS, row)), marshal.loads(row[-1])
+
+
+class _StoredStats:
+    """Lo que pstats.Stats acepta en lugar de un cProfile.Profile."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def top_functions(stats, sort='cumulative', limit=30):
+    """Funciones más costosas: [{function, file, line, ncalls, primitive_calls, tottime, cumtime}]."""
+    profile_stats = pstats.Stats(_StoredStats(stats))
+    profile_stats.sort_stats(sort)
+    rows = []
+    for func in profile_stats.fcn_list[:limit]:
+        filename, line, name = func
+        primitive_calls, ncalls, tottime, cumtime, _ = profile_stats.stats[func]
+        rows.append({
+            'function': name,
+            'file': filename,
+            'line': line,
+            'ncalls': ncalls,
+            'primitive_calls': primitive_calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        })
+    return rows
+
+
+_profiling = threading.Lock()
+
+
+def _start_profile():
+    """Un cProfile.Profile ya activo, o None si el proceso ya está perfilando otra request."""
+    if not _profiling.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Otra herramienta (coverage, un profiler externo) ya usa sys.monitoring
+        _profiling.release()
+        return None
+    return profile
+
+
+def _stop_profile(profile):
+    profile.disable()
+    _profiling.release()
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user = authorized_user(request) if requested(request) else None
+        if user is None:
+            return self.get_response(request)
+
+        profile = _start_profile()
+        if profile is None:
+            logger.info("Another request is being profiled, serving %s unprofiled", request.path)
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stop_profile(profile)
+        self._store(request, response, user, profile, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        user = await sync_to_async(authorized_user)(request) if requested(request) else None
+        if user is None:
+            return await self.get_response(request)
+
+        profile = _start_profile()
+        if profile is None:
+            logger.info("Another request is being profiled, serving %s unprofiled", request.path)
+            return await self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stop_profile(profile)
+        await sync_to_async(self._store)(request, response, user, profile, time.perf_counter() - started)
+        return response
+
+    def _store(self, request, response, user, profile, duration):
+        try:
+            response[ID_HEADER] = str(save(request, response, user, profile, duration))
+        except Exception:
+            # Un perfil que no se pudo guardar no debe romper la respuesta
+            logger.exception("Couldn't store request profile")
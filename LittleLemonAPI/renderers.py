@@ -0,0 +1,49 @@
+"""
+JSONRenderer sobre orjson (FAST_JSON, ver settings.REST_FRAMEWORK).
+
+Produce los mismos bytes que el JSONRenderer de DRF: los Decimal de los
+serializers ya llegan como strings ("12.50") y orjson los copia tal cual;
+fechas, Decimal sueltos, UUID, lazy strings, etc. pasan por el mismo
+JSONEncoder.default de DRF (OPT_PASSTHROUGH_*), y \\u2028/\\u2029 se escapan
+igual. Lo que orjson no acepta (claves no string, enteros de más de 64
+bits) se renderiza con el JSONRenderer de DRF, y también cuando se pide
+indentación o la configuración de DRF no es la compacta en UTF-8.
+
+Diferencias conocidas, solo en floats: NaN/Infinity salen como null en vez
+de dar error, y los muy grandes o muy chicos cambian de notación (1e16 en
+vez de 1e+16, 0.00001 en vez de 1e-05).
+
+Sin orjson instalado se comporta exactamente como el de DRF.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Como en JSONRenderer.render: JSON que también es un subconjunto válido de JavaScript
+_LINE_SEPARATORS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
+
+class ORJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except orjson.JSONEncodeError:
+            # Mismo resultado (o el mismo error) que con json.dumps
+            return super().render(data, accepted_media_type, renderer_context)
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.core.cache import cache
+
+MANAGER = 'Manager'
+DELIVERY_CREW = 'Delivery crew'
+CUSTOMER = 'Customer'
+
+# Atributo donde se guarda el set de grupos en el objeto user (vive lo que dura la request)
+_REQUEST_ATTR = '_ll_roles'
+
+
+def _cache_key(user_id):
+    return f'roles:{user_id}'
+
+
+def get_user_roles(user):
+    """
+    Devuelve los nombres de grupo del usuario como frozenset.
+
+    Se resuelve una sola vez por request (se guarda en el propio objeto user)
+    y, si ROLE_CACHE_TIMEOUT > 0, también en el cache compartido.
+    """
+    if not user or not user.is_authenticated:
+        return frozenset()
+
+    roles = getattr(user, _REQUEST_ATTR, None)
+    if roles is not None:
+        return roles
+
+    timeout = getattr(settings, 'ROLE_CACHE_TIMEOUT', 0)
+    if timeout:
+        roles = cache.get(_cache_key(user.pk))
+    if roles is None:
+        roles = frozenset(user.groups.values_list('name', flat=True))
+        if timeout:
+            cache.set(_cache_key(user.pk), roles, timeout)
+
+    setattr(user, _REQUEST_ATTR, roles)
+    return roles
+
+
+def has_role(user, name):
+    return name in get_user_roles(user)
+
+
+def is_manager(user):
+    return has_role(user, MANAGER)
+
+
+def is_delivery_crew(user):
+    return has_role(user, DELIVERY_CREW)
+
+
+def is_customer(user):
+    return has_role(user, CUSTOMER)
+
+
+def invalidate_user_roles(*user_ids):
+    """Descarta los roles cacheados de los usuarios tras un cambio de grupos."""
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
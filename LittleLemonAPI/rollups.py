@@ -0,0 +1,142 @@
+"""
+Rollups de ventas por día y estado: totales generales (DailySales), por
+MenuItem y por Category.
+
+Se actualizan de forma incremental en la transacción que modifica la orden:
+- al crearla (signal post_save) se suma la orden y su total,
+- Order.objects.create_from_cart suma sus líneas (lines_added),
+- un cambio de estado resta de un estado y suma en el otro (signal post_save),
+- al borrarla se resta todo (signal pre_delete, con las líneas aún en la BD).
+
+Cada tabla se actualiza con dos sentencias (INSERT que ignora conflictos +
+UPDATE con F()), sin importar cuántas líneas tenga la orden. Los cambios que
+no pasan por save()/delete() (queryset.update, bulk_create, editar líneas en
+el admin) no se reflejan: `manage.py rebuild_sales_rollups` recalcula todo
+desde Order/OrderItem.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+
+from .models import CategoryDailySales, DailySales, MenuItemDailySales, Order, OrderItem
+
+
+def _increment(model, date, status, counters, key=None, sign=1):
+    """
+    Suma `counters` ({valor de key: (orders, quantity, revenue)}) a las filas
+    (date, status, key) de `model`, creándolas si no existen.
+    """
+    if not counters:
+        return
+    lookup = {'date': date, 'status': status}
+    model.objects.bulk_create(
+        [model(**lookup, **({key: value} if key else {})) for value in counters],
+        ignore_conflicts=True,
+    )
+    queryset = model.objects.filter(**lookup)
+    if key:
+        queryset = queryset.filter(**{f'{key}__in': list(counters)})
+
+    def delta(index, output_field):
+        if not key:
+            (values,) = counters.values()
+            return Value(sign * values[index], output_field=output_field)
+        return Case(
+            *[When(**{key: value}, then=Value(sign * values[index])) for value, values in counters.items()],
+            output_field=output_field,
+        )
+
+    queryset.update(
+        orders=F('orders') + delta(0, IntegerField()),
+        quantity=F('quantity') + delta(1, IntegerField()),
+        revenue=F('revenue') + delta(2, DecimalField(max_digits=12, decimal_places=2)),
+    )
+
+
+def _line_counters(lines):
+    """lines: (menuitem_id, category_id, quantity, price). Devuelve (cantidad total, por menuitem, por categoría)."""
+    by_menuitem = defaultdict(lambda: [0, 0, Decimal('0')])
+    by_category = defaultdict(lambda: [0, 0, Decimal('0')])
+    quantity = 0
+    for menuitem_id, category_id, line_quantity, price in lines:
+        quantity += line_quantity
+        for counters in (by_menuitem[menuitem_id], by_category[category_id]):
+            counters[1] += line_quantity
+            counters[2] += price
+    # Cada orden cuenta una vez por menuitem y por categoría
+    for counters in (*by_menuitem.values(), *by_category.values()):
+        counters[0] = 1
+    return quantity, dict(by_menuitem), dict(by_category)
+
+
+def _order_lines(order):
+    return OrderItem.objects.filter(order_id=order.pk).values_list(
+        'menuitem_id', 'menuitem__category_id', 'quantity', 'price'
+    )
+
+
+def _apply(order, status, lines, sign=1, with_order=True):
+    """Suma (sign=1) o resta (sign=-1) la orden y/o sus líneas en los rollups de `status`."""
+    quantity, by_menuitem, by_category = _line_counters(lines)
+    if with_order:
+        _increment(DailySales, order.date, status, {None: (1, quantity, order.total)}, sign=sign)
+    elif quantity:
+        _increment(DailySales, order.date, status, {None: (0, quantity, 0)}, sign=sign)
+    _increment(MenuItemDailySales, order.date, status, by_menuitem, key='menuitem_id', sign=sign)
+    _increment(CategoryDailySales, order.date, status, by_category, key='category_id', sign=sign)
+
+
+def order_created(order):
+    _apply(order, order.status, [])
+
+
+def lines_added(order, lines):
+    _apply(order, order.status, lines, with_order=False)
+
+
+def status_changed(order, old_status):
+    lines = list(_order_lines(order))
+    _apply(order, old_status, lines, sign=-1)
+    _apply(order, order.status, lines)
+
+
+def order_deleted(order):
+    status = getattr(order, '_loaded_status', None) or order.status
+    _apply(order, status, _order_lines(order), sign=-1)
+
+
+def rebuild():
+    """Recalcula todos los rollups desde Order/OrderItem. Devuelve las filas creadas por tabla."""
+    with transaction.atomic():
+        for model in (DailySales, MenuItemDailySales, CategoryDailySales):
+            model.objects.all().delete()
+
+        daily = {
+            (row['date'], row['status']): DailySales(**row)
+            for row in Order.objects.order_by().values('date', 'status').annotate(
+                orders=Count('id'), revenue=Sum('total')
+            )
+        }
+        quantities = OrderItem.objects.order_by().values(
+            date=F('order__date'), status=F('order__status')
+        ).annotate(quantity=Sum('quantity'))
+        for row in quantities:
+            daily[row['date'], row['status']].quantity = row['quantity']
+        DailySales.objects.bulk_create(daily.values(), batch_size=1000)
+
+        created = {'daily': len(daily)}
+        lines = OrderItem.objects.order_by().annotate(date=F('order__date'), status=F('order__status'))
+        for name, model, group_by in (
+            ('menuitem', MenuItemDailySales, lines.values('date', 'status', 'menuitem_id')),
+            ('category', CategoryDailySales, lines.values('date', 'status', category_id=F('menuitem__category_id'))),
+        ):
+            rows = group_by.annotate(
+                orders=Count('order_id', distinct=True),
+                quantity=Sum('quantity'),
+                revenue=Sum('price'),
+            )
+            objs = model.objects.bulk_create((model(**row) for row in rows), batch_size=1000)
+            created[name] = len(objs)
+        return created
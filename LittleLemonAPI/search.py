@@ -0,0 +1,127 @@
+"""
+Búsqueda full-text de MenuItem (title + description) ordenada por relevancia.
+
+- PostgreSQL: columna generada `search_vector` (tsvector, title con peso A y
+  description con peso B) con índice GIN; consulta con websearch_to_tsquery
+  y ts_rank.
+- SQLite: tabla virtual FTS5 `LittleLemonAPI_menuitem_fts` (tokenizer porter)
+  que se mantiene con las signals de MenuItem; consulta con MATCH y bm25.
+  Los cambios masivos (bulk_create, queryset.update) no disparan signals:
+  después hay que ejecutar `manage.py rebuild_menu_search`.
+- Otros backends: icontains de SearchFilter.
+
+Ambas estructuras las crea la migración 0005_menuitem_search.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import MenuItem
+
+FTS_TABLE = 'LittleLemonAPI_menuitem_fts'
+TS_CONFIG = 'english'
+# Peso de title frente a description en bm25 (SQLite); en PostgreSQL lo dan setweight A/B
+BM25_WEIGHTS = (10.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_query(terms):
+    """Convierte términos libres en una consulta FTS5 segura: "tok"* AND "tok"* ..."""
+    tokens = [token for term in terms for token in _TOKEN_RE.findall(term)]
+    # Entre comillas no hay operadores ni sintaxis de columna; * busca por prefijo
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_menu_items(*items, using='default'):
+    """Actualiza las filas FTS5 de los items dados (solo SQLite)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not items:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [(item.pk,) for item in items])
+        cursor.executemany(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) VALUES (%s, %s, %s)',
+            [(item.pk, item.title, item.description or '') for item in items],
+        )
+
+
+def unindex_menu_items(*pks, using='default'):
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not pks:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index(using='default'):
+    """Reconstruye el índice FTS5 desde la tabla de MenuItem. Devuelve las filas indexadas."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        # En PostgreSQL la columna generada se mantiene sola
+        return 0
+    table = MenuItem._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) '
+            f'SELECT id, title, COALESCE(description, \'\') FROM "{table}"'
+        )
+        return cursor.rowcount
+
+
+def search_menu_items(queryset, terms):
+    """
+    Filtra `queryset` por los términos y añade la anotación `search_rank`
+    (mayor es más relevante). Devuelve None si el backend no tiene búsqueda
+    full-text.
+    """
+    vendor = connections[queryset.db].vendor
+    table = MenuItem._meta.db_table
+    if vendor == 'postgresql':
+        query = ' '.join(terms)
+        tsquery = f"websearch_to_tsquery('{TS_CONFIG}', %s)"
+        return queryset.annotate(
+            search_match=RawSQL(f'"{table}"."search_vector" @@ {tsquery}', (query,), output_field=BooleanField()),
+            search_rank=RawSQL(f'ts_rank("{table}"."search_vector", {tsquery})', (query,), output_field=FloatField()),
+        ).filter(search_match=True)
+    if vendor == 'sqlite':
+        match = fts_query(terms)
+        if not match:
+            return queryset
+        weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+        # bm25() es negativo y menor cuanto más relevante: se invierte el signo
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', (match,)),
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT -bm25("{FTS_TABLE}", {weights}) FROM "{FTS_TABLE}" '
+                f'WHERE "{FTS_TABLE}" MATCH %s AND rowid = "{table}"."id"',
+                (match,),
+                output_field=FloatField(),
+            ),
+        )
+    return None
+
+
+class MenuItemSearchFilter(SearchFilter):
+    """
+    SearchFilter con índice full-text (?search=). Sin ?ordering= los
+    resultados se ordenan por relevancia; con ?ordering= manda ese orden.
+    En backends sin soporte se comporta como SearchFilter (icontains sobre
+    search_fields).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        results = search_menu_items(queryset, terms)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        if 'search_rank' in results.query.annotations and not request.query_params.get('ordering'):
+            results = results.order_by('-search_rank', 'id')
+        return results
@@ -1,6 +1,7 @@
 ﻿from .category_serializers import CategorySerializer
 from .menuitem_serializers import MenuItemSerializer
-from .cart_serializers import CartSerializer
-from .order_serializers import OrderSerializer, CreateOrderSerializer, OrderItemSerializer
-from .auth_serializers import UserSerializer, MyTokenObtainPairSerializer
-from .registerUser import RegisterSerializer
\ No newline at end of file
+from .cart_serializers import CartSerializer, CartBatchSerializer
+from .order_serializers import OrderSerializer, CreateOrderSerializer, OrderItemSerializer, BulkAssignSerializer
+from .auth_serializers import UserSerializer, MyTokenObtainPairSerializer, RoleTokenRefreshSerializer
+from .registerUser import RegisterSerializer
+from .values_serializers import ValuesSerializer, MENU_ITEM_VALUES, ORDER_VALUES
\ No newline at end of file
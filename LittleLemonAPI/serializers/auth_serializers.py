@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializador para mostrar datos básicos de usuario."""
@@ -10,12 +12,41 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'first_name', 'last_name']
 
 
+def add_role_claims(token, user):
+    """Claims que permiten autenticar sin consultar la BD (ver authentication.py)."""
+    token['username'] = user.username
+    token['email'] = user.email
+    token['is_active'] = user.is_active
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    token['roles'] = sorted(g.name for g in user.groups.all())
+    return token
+
+
+class RoleRefreshToken(RefreshToken):
+    """Refresh token que vuelve a leer los roles del usuario al emitir cada access token."""
+
+    @property
+    def access_token(self):
+        user = (
+            User.objects.prefetch_related('groups')
+            .filter(**{api_settings.USER_ID_FIELD: self.payload.get(api_settings.USER_ID_CLAIM)})
+            .first()
+        )
+        if user is not None:
+            add_role_claims(self, user)
+        return super().access_token
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Serializador personalizado para JWT que incluye info extra en el token."""
 
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
-        token['username'] = user.username
-        token['email'] = user.email
-        return token
\ No newline at end of file
+        return add_role_claims(token, user)
+
+
+class RoleTokenRefreshSerializer(TokenRefreshSerializer):
+    """Al refrescar, los cambios de grupo o flags llegan al nuevo access token."""
+    token_class = RoleRefreshToken
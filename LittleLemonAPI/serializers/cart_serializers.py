@@ -1,6 +1,7 @@
 ﻿from rest_framework import serializers
 from ..models import Cart
 from ..models import MenuItem
+from ..cart_store import ADD, MAX_QUANTITY, SET, REMOVE, QuantityTooLarge, get_cart_store
 from .menuitem_serializers import MenuItemSerializer
 
 class CartSerializer(serializers.ModelSerializer):
@@ -30,32 +31,60 @@ class CartSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = self.context['request'].user
-        menuitem = validated_data.pop('menuitem_id')
-        quantity = validated_data['quantity']
-        unit_price = menuitem.price
-        price = unit_price * quantity
-
-        # Verifica si ya existe el ítem para el usuario → actualiza cantidad
-        cart_item, created = Cart.objects.get_or_create(
-            user=user,
-            menuitem=menuitem,
-            defaults={
-                'quantity': quantity,
-                'unit_price': unit_price,
-                'price': price,
-            }
-        )
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.unit_price = unit_price
-            cart_item.price = cart_item.quantity * unit_price
-            cart_item.save()
-
-        return cart_item
+        # Si ya existe el ítem para el usuario, el store suma la cantidad
+        try:
+            return get_cart_store().add(user, validated_data['menuitem_id'], validated_data['quantity'])
+        except QuantityTooLarge as exc:
+            raise serializers.ValidationError({'quantity': str(exc)})
 
     def update(self, instance, validated_data):
         quantity = validated_data.get('quantity', instance.quantity)
-        instance.quantity = quantity
-        instance.price = instance.unit_price * quantity
-        instance.save()
-        return instance
\ No newline at end of file
+        try:
+            return get_cart_store().set_quantity(self.context['request'].user, instance, quantity)
+        except QuantityTooLarge as exc:
+            raise serializers.ValidationError({'quantity': str(exc)})
+
+
+class CartOperationSerializer(serializers.Serializer):
+    action = serializers.ChoiceField(choices=[ADD, SET, REMOVE])
+    menuitem_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_QUANTITY, required=False)
+
+    def validate(self, attrs):
+        if attrs['action'] != REMOVE and 'quantity' not in attrs:
+            raise serializers.ValidationError({'quantity': 'This field is required.'})
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Varias altas/cambios/bajas del carrito en un request:
+    {"operations": [{"action": "add"|"set"|"remove", "menuitem_id": 1, "quantity": 2}, ...]}
+
+    add suma a la cantidad actual (como POST /api/cart/), set la reemplaza y
+    remove borra la línea. Las operaciones se aplican en orden; si una falla
+    (id inexistente, una línea que no cabe en la tabla Cart) no se aplica ninguna.
+    """
+    MAX_OPERATIONS = 100
+
+    operations = serializers.ListField(
+        child=CartOperationSerializer(), allow_empty=False, max_length=MAX_OPERATIONS
+    )
+
+    def validate_operations(self, operations):
+        # Todos los ids del menú en una sola query
+        ids = {operation['menuitem_id'] for operation in operations}
+        self.menuitems = MenuItem.objects.only('id', 'price').in_bulk(ids)
+        missing = sorted(ids - self.menuitems.keys())
+        if missing:
+            raise serializers.ValidationError(f'Invalid menuitem_id: {", ".join(map(str, missing))}.')
+        return operations
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+        store = get_cart_store()
+        try:
+            store.apply(user, validated_data['operations'], self.menuitems)
+        except QuantityTooLarge as exc:
+            raise serializers.ValidationError({'operations': [str(exc)]})
+        return store.lines(user)
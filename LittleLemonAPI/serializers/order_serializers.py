@@ -1,5 +1,8 @@
-﻿from rest_framework import serializers
-from ..models import Order, OrderItem, Cart
+﻿from django.contrib.auth.models import User
+from rest_framework import serializers
+from ..models import Order, OrderItem
+from ..roles import DELIVERY_CREW
+from ..cart_store import get_cart_store
 from .menuitem_serializers import MenuItemSerializer
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -37,21 +40,51 @@ class CreateOrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = self.context['request'].user
-        cart_qs = Cart.objects.filter(user=user)
-        if not cart_qs.exists():
+        store = get_cart_store()
+        # Con el store de cache el carrito se escribe en la tabla Cart solo ahora
+        store.persist(user)
+        order = Order.objects.create_from_cart(user, **validated_data)
+        if order is None:
             raise serializers.ValidationError('Your cart is empty.')
-        total = 0
-        order = Order.objects.create(user=user, **validated_data)
-        for cart_item in cart_qs:
-            OrderItem.objects.create(
-                order=order,
-                menuitem=cart_item.menuitem,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.unit_price,
-                price=cart_item.price
-            )
-            total += cart_item.price
-        order.total = total
-        order.save()
-        cart_qs.delete()
+        store.discard(user)
         return order
+
+
+class DeliveryAssignmentSerializer(serializers.Serializer):
+    order = serializers.IntegerField()
+    delivery_crew = serializers.IntegerField()
+
+
+class BulkAssignSerializer(serializers.Serializer):
+    """
+    Asignación manual de repartidores a varias órdenes:
+    {"assignments": [{"order": 1, "delivery_crew": 5}, ...]}
+
+    Se valida todo en dos queries (órdenes existentes y miembros del grupo
+    "Delivery crew") y se aplica en una transacción.
+    """
+    MAX_ASSIGNMENTS = 500
+
+    assignments = serializers.ListField(
+        child=DeliveryAssignmentSerializer(), allow_empty=False, max_length=MAX_ASSIGNMENTS
+    )
+
+    def validate_assignments(self, assignments):
+        mapping = {}
+        for assignment in assignments:
+            if assignment['order'] in mapping:
+                raise serializers.ValidationError(f'Order {assignment["order"]} appears more than once.')
+            mapping[assignment['order']] = assignment['delivery_crew']
+
+        missing = sorted(mapping.keys() - set(Order.objects.filter(pk__in=mapping).values_list('pk', flat=True)))
+        if missing:
+            raise serializers.ValidationError(f'Invalid order: {", ".join(map(str, missing))}.')
+        crew_ids = set(mapping.values())
+        not_crew = sorted(crew_ids - set(
+            User.objects.filter(pk__in=crew_ids, groups__name=DELIVERY_CREW).values_list('pk', flat=True)
+        ))
+        if not_crew:
+            raise serializers.ValidationError(
+                f'Not in the Delivery crew group: {", ".join(map(str, not_crew))}.'
+            )
+        return mapping
@@ -0,0 +1,147 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.contrib.auth.models import User
+from rest_framework import serializers
+
+from .menuitem_serializers import MenuItemSerializer
+from .order_serializers import OrderSerializer
+
+# Campos cuyo to_representation devuelve el mismo valor que ya trae .values()
+PASSTHROUGH = (serializers.CharField, serializers.IntegerField, serializers.BooleanField, serializers.ChoiceField)
+
+
+class ValuesSerializer:
+    """
+    Lado de lectura de un ModelSerializer compilado sobre filas de .values().
+
+    Al primer uso se recorren los campos del serializer una sola vez y se
+    convierten en columnas de .values() y funciones por campo (el mismo
+    to_representation de DRF para Decimal y fechas), así que la salida es
+    idéntica sin instanciar modelos ni introspección por objeto:
+
+    - campos del modelo y PrimaryKeyRelatedField: su columna;
+    - serializers anidados a uno (category_detail): columnas con JOIN;
+    - StringRelatedField: la columna indicada en `strings` para ese modelo;
+    - serializers anidados many=True (items): una query más por lote, en el
+      orden `many_ordering`.
+
+    Cualquier otro campo (SerializerMethodField, source con puntos, ...) da
+    ImproperlyConfigured al compilar en vez de una salida distinta.
+    """
+
+    def __init__(self, serializer_class, strings=None, many_ordering=('id',)):
+        self.serializer_class = serializer_class
+        self.strings = strings or {}
+        self.many_ordering = many_ordering
+        self._compiled = None
+
+    def compile(self):
+        if self._compiled is None:
+            serializer = self.serializer_class()
+            model = serializer.Meta.model
+            columns, getters, many = [], [], []
+            self._compile_fields(serializer, model, '', columns, getters, many)
+            pk = model._meta.pk.attname
+            if pk not in columns:
+                columns.append(pk)
+            self._compiled = (columns, getters, many, pk)
+        return self._compiled
+
+    def _compile_fields(self, serializer, model, prefix, columns, getters, many):
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            where = f'{serializer.__class__.__name__}.{name}'
+            if field.source == '*' or '.' in field.source:
+                raise ImproperlyConfigured(f"{where}: only direct sources can be compiled.")
+            if isinstance(field, serializers.ListSerializer):
+                getters.append((name, self._compile_many(field, model, prefix, many, where)))
+                continue
+            model_field = model._meta.get_field(field.source)
+            if isinstance(field, serializers.ModelSerializer):
+                getters.append((name, self._compile_nested(field, model_field, prefix, columns, many, where)))
+            elif isinstance(field, serializers.StringRelatedField):
+                string_column = self.strings.get(model_field.related_model)
+                if string_column is None:
+                    raise ImproperlyConfigured(f"{where}: no string column for {model_field.related_model.__name__}.")
+                getters.append((name, self._column(columns, f'{prefix}{field.source}__{string_column}', None)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and not field.pk_field:
+                getters.append((name, self._column(columns, prefix + model_field.attname, None)))
+            elif isinstance(field, serializers.RelatedField) or model_field.is_relation:
+                raise ImproperlyConfigured(f"{where}: {field.__class__.__name__} can't be compiled.")
+            elif isinstance(field, serializers.ModelField):
+                raise ImproperlyConfigured(f"{where}: ModelField can't be compiled.")
+            elif type(field) in PASSTHROUGH:
+                getters.append((name, self._column(columns, prefix + model_field.attname, None)))
+            else:
+                getters.append((name, self._column(columns, prefix + model_field.attname, field.to_representation)))
+
+    @staticmethod
+    def _column(columns, column, convert):
+        columns.append(column)
+        if convert is None:
+            return lambda row, related: row[column]
+
+        def get(row, related):
+            # Como Serializer.to_representation: None se devuelve sin convertir
+            value = row[column]
+            return None if value is None else convert(value)
+        return get
+
+    def _compile_nested(self, field, model_field, prefix, columns, many, where):
+        if not model_field.many_to_one and not model_field.one_to_one:
+            raise ImproperlyConfigured(f"{where}: only to-one relations can be nested.")
+        nested = []
+        self._compile_fields(field, model_field.related_model, f'{prefix}{field.source}__', columns, nested, many)
+        null_column = prefix + model_field.attname if model_field.null else None
+        if null_column is not None:
+            columns.append(null_column)
+
+        def get(row, related):
+            if null_column is not None and row[null_column] is None:
+                return None
+            return {name: getter(row, related) for name, getter in nested}
+        return get
+
+    def _compile_many(self, field, model, prefix, many, where):
+        rel = model._meta.get_field(field.source)
+        if prefix or not isinstance(field.child, serializers.ModelSerializer) or not rel.one_to_many:
+            raise ImproperlyConfigured(f"{where}: only reverse foreign keys of the root model can be nested many=True.")
+        child_columns, child_getters, nested_many = [], [], []
+        self._compile_fields(field.child, rel.related_model, '', child_columns, child_getters, nested_many)
+        if nested_many:
+            raise ImproperlyConfigured(f"{where}: many=True can't be nested twice.")
+        name = field.field_name
+        pk_column = model._meta.pk.attname
+        many.append((name, rel.related_model, rel.field.attname, child_columns))
+
+        def get(row, related):
+            return [
+                {child_name: getter(child, related) for child_name, getter in child_getters}
+                for child in related[name].get(row[pk_column], ())
+            ]
+        return get
+
+    def values(self, queryset):
+        """`queryset` (ya filtrado) como filas de .values() con las columnas del serializer."""
+        columns, _, _, _ = self.compile()
+        return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+    def represent(self, rows):
+        """Lo mismo que serializer_class(instances, many=True).data para esas filas."""
+        _, getters, many, pk = self.compile()
+        rows = list(rows)
+        related = {}
+        if many:
+            ids = [row[pk] for row in rows]
+            for name, model, fk, columns in many:
+                groups = related[name] = {}
+                if not ids:
+                    continue
+                children = model._default_manager.filter(**{f'{fk}__in': ids}).order_by(*self.many_ordering)
+                for child in children.values(fk, *columns):
+                    groups.setdefault(child[fk], []).append(child)
+        return [{name: getter(row, related) for name, getter in getters} for row in rows]
+
+
+MENU_ITEM_VALUES = ValuesSerializer(MenuItemSerializer)
+ORDER_VALUES = ValuesSerializer(OrderSerializer, strings={User: 'username'})
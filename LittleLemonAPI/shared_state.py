@@ -0,0 +1,51 @@
+"""
+Estado compartido entre workers de gunicorn del mismo host, en un fichero
+SQLite (SHARED_STATE_DB) fuera de la BD principal.
+
+Cada hilo abre su propia conexión (y la reabre tras un fork). El fichero va
+en modo WAL para que las lecturas no bloqueen y transaction() usa
+BEGIN IMMEDIATE, así que un read-modify-write es atómico entre procesos.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_local = threading.local()
+
+
+def connection():
+    path = settings.SHARED_STATE_DB
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != path or _local.pid != os.getpid():
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # isolation_level=None: las transacciones las abre transaction() explícitamente
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _local.conn, _local.path, _local.pid = conn, path, os.getpid()
+        _local.tables = set()
+    return conn
+
+
+def ensure_table(name, ddl):
+    """Crea la tabla (y lo que incluya `ddl`) una vez por conexión."""
+    conn = connection()
+    if name not in _local.tables:
+        conn.executescript(ddl)
+        _local.tables.add(name)
+    return conn
+
+
+@contextmanager
+def transaction():
+    conn = connection()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
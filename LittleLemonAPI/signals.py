@@ -1,10 +1,68 @@
-from django.db.models.signals import post_migrate
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, m2m_changed, post_save, post_delete, pre_delete
 from django.contrib.auth.models import Group, User
 from django.dispatch import receiver
 from django.db import connection
-from .models import Category, MenuItem
+from .models import Category, MenuItem, Order
+from .roles import invalidate_user_roles
+from . import menu_cache, menu_snapshot, metrics, order_events, rollups, search
 import os
 
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    metrics.install(connection)
+
+
+@receiver([post_save, post_delete], sender=MenuItem)
+@receiver([post_save, post_delete], sender=Category)
+def menu_changed(sender, **kwargs):
+    menu_snapshot.schedule_rebuild()
+    menu_cache.bump_generation()
+
+
+@receiver(post_save, sender=MenuItem)
+def index_menu_item(sender, instance, using, **kwargs):
+    search.index_menu_items(instance, using=using)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, using, **kwargs):
+    search.unindex_menu_items(instance.pk, using=using)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        rollups.order_created(instance)
+    elif hasattr(instance, '_loaded_status'):
+        old_status = instance._loaded_status
+        if old_status and old_status != instance.status:
+            rollups.status_changed(instance, old_status)
+        order_events.order_changed(instance, old_status, instance._loaded_delivery_crew_id)
+    instance._loaded_status = instance.status
+    instance._loaded_delivery_crew_id = instance.delivery_crew_id
+
+
+@receiver(pre_delete, sender=Order)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    rollups.order_deleted(instance)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_roles_on_group_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cubre ManagerGroupView/DeliveryCrewGroupView (group.user_set) y el admin (user.groups)
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_user_roles(instance.pk)
+    elif action == 'pre_clear':
+        invalidate_user_roles(*instance.user_set.values_list('pk', flat=True))
+    elif pk_set:
+        invalidate_user_roles(*pk_set)
+
 @receiver(post_migrate)
 def create_initial_data(sender, **kwargs):
     # Avoid execution if tables don't exist yet
@@ -0,0 +1,220 @@
+"""
+Log de queries lentas con EXPLAIN.
+
+El execute wrapper de metrics.py (instalado en cada conexión) mide todas las
+queries; las que tardan SLOW_QUERY_THRESHOLD_MS o más llegan a record():
+
+- se normalizan (literales, placeholders y listas IN/VALUES → ?) y se
+  agrupan por fingerprint (hash de la query normalizada);
+- se cuentan llamadas, tiempo total y máximo y las vistas que las originan
+  (`OrderViewSet.list`, ...; fuera de una request, OUTSIDE_REQUEST);
+- con probabilidad SLOW_QUERY_EXPLAIN_SAMPLE se guarda el EXPLAIN (sin
+  ANALYZE: no se vuelve a ejecutar) de un SELECT, como mucho una vez por
+  fingerprint y hora en cada proceso.
+
+Como los histogramas de metrics.py, cada proceso acumula en memoria y cada
+METRICS_FLUSH_INTERVAL segundos lo suma en el SQLite de shared_state, donde
+solo quedan los SLOW_QUERY_TOP_N fingerprints con más tiempo total. Se
+consultan con `manage.py slow_queries` o GET /api/slow-queries/.
+"""
+import atexit
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+
+from . import shared_state
+
+logger = logging.getLogger(__name__)
+
+OUTSIDE_REQUEST = '(outside request)'
+MAX_VIEWS = 10
+EXPLAIN_EVERY = 3600
+
+TABLE = 'slow_queries'
+DDL = (
+    'CREATE TABLE IF NOT EXISTS slow_queries ('
+    'fingerprint TEXT PRIMARY KEY, query TEXT NOT NULL, calls INTEGER NOT NULL, '
+    'total_time REAL NOT NULL, max_time REAL NOT NULL, views TEXT NOT NULL, '
+    'last_seen REAL NOT NULL, plan TEXT, explained_at REAL) WITHOUT ROWID'
+)
+FIELDS = ('fingerprint', 'query', 'calls', 'total_time', 'max_time', 'views', 'last_seen', 'plan', 'explained_at')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+def normalize(sql):
+    """La misma query con otros valores o listas de otro largo queda igual."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(...)', sql)
+    sql = _ROWS_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def active():
+    """True mientras se ejecuta un EXPLAIN propio (el wrapper no debe medirlo)."""
+    return getattr(_local, 'explaining', False)
+
+
+@contextmanager
+def _explaining():
+    _local.explaining = True
+    try:
+        yield
+    finally:
+        _local.explaining = False
+
+
+def explain(connection, sql, params):
+    """Plan de la query como texto, o None si no se pudo obtener."""
+    with _explaining():
+        try:
+            # Dentro de una transacción va en un savepoint: un error no la deja abortada (PostgreSQL)
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+                    rows = cursor.fetchall()
+        except Exception:
+            logger.debug("EXPLAIN failed for %s", sql, exc_info=True)
+            return None
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+class _SlowQueryLog:
+    """Queries lentas del proceso pendientes de sumar en shared_state."""
+
+    def __init__(self):
+        self.pending = {}
+        self.explained = {}
+        self.lock = threading.Lock()
+        self.last_flush = time.monotonic()
+
+    def record(self, sql, params, many, elapsed, connection, view):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        view = view or OUTSIDE_REQUEST
+        logger.warning("Slow query (%.0f ms, %s) [%s]: %s", elapsed * 1000, view, key, normalized[:500])
+
+        plan = None
+        now = time.time()
+        if (
+            not many
+            and normalized[:6].upper() == 'SELECT'
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE
+            and now - self.explained.get(key, 0) >= EXPLAIN_EVERY
+        ):
+            self.explained[key] = now
+            plan = explain(connection, sql, params)
+
+        with self.lock:
+            entry = self.pending.setdefault(key, {
+                'query': normalized, 'calls': 0, 'total_time': 0.0, 'max_time': 0.0,
+                'views': [], 'last_seen': now, 'plan': None, 'explained_at': None,
+            })
+            entry['calls'] += 1
+            entry['total_time'] += elapsed
+            entry['max_time'] = max(entry['max_time'], elapsed)
+            entry['last_seen'] = now
+            if view not in entry['views']:
+                entry['views'].append(view)
+            if plan is not None:
+                entry['plan'], entry['explained_at'] = plan, now
+        if self.due():
+            self.flush()
+
+    def due(self):
+        return time.monotonic() - self.last_flush >= settings.METRICS_FLUSH_INTERVAL
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            shared_state.ensure_table(TABLE, DDL)
+            with shared_state.transaction() as conn:
+                placeholders = ', '.join('?' * len(pending))
+                stored = {
+                    row[0]: dict(zip(FIELDS, row))
+                    for row in conn.execute(
+                        f'SELECT {", ".join(FIELDS)} FROM slow_queries WHERE fingerprint IN ({placeholders})',
+                        list(pending),
+                    )
+                }
+                rows = []
+                for key, entry in pending.items():
+                    old = stored.get(key)
+                    if old is not None:
+                        views = json.loads(old['views'])
+                        entry['views'] = (views + [view for view in entry['views'] if view not in views])[:MAX_VIEWS]
+                        entry['calls'] += old['calls']
+                        entry['total_time'] += old['total_time']
+                        entry['max_time'] = max(entry['max_time'], old['max_time'])
+                        if entry['plan'] is None:
+                            entry['plan'], entry['explained_at'] = old['plan'], old['explained_at']
+                    rows.append((key, entry['query'], entry['calls'], entry['total_time'], entry['max_time'],
+                                 json.dumps(entry['views'][:MAX_VIEWS]), entry['last_seen'], entry['plan'],
+                                 entry['explained_at']))
+                conn.executemany(f'INSERT OR REPLACE INTO slow_queries ({", ".join(FIELDS)}) VALUES ({", ".join("?" * len(FIELDS))})', rows)
+                conn.execute(
+                    'DELETE FROM slow_queries WHERE fingerprint NOT IN '
+                    '(SELECT fingerprint FROM slow_queries ORDER BY total_time DESC LIMIT ?)',
+                    (settings.SLOW_QUERY_TOP_N,),
+                )
+        except Exception:
+            # Se llama desde el wrapper de la BD: nunca debe romper la query
+            logger.exception("Couldn't flush the slow query log")
+
+
+_log = _SlowQueryLog()
+atexit.register(_log.flush)
+
+
+def record(sql, params, many, elapsed, connection, view=None):
+    _log.record(sql, params, many, elapsed, connection, view)
+
+
+def top(limit=None):
+    """Los fingerprints con más tiempo total, de todos los procesos del host."""
+    _log.flush()
+    shared_state.ensure_table(TABLE, DDL)
+    rows = shared_state.connection().execute(
+        f'SELECT {", ".join(FIELDS)} FROM slow_queries ORDER BY total_time DESC LIMIT ?',
+        (limit or settings.SLOW_QUERY_TOP_N,),
+    )
+    result = []
+    for row in rows:
+        entry = dict(zip(FIELDS, row))
+        entry['views'] = json.loads(entry['views'])
+        entry['mean_time'] = entry['total_time'] / entry['calls']
+        result.append(entry)
+    return result
+
+
+def reset():
+    with _log.lock:
+        _log.pending.clear()
+    shared_state.ensure_table(TABLE, DDL)
+    with shared_state.transaction() as conn:
+        conn.execute('DELETE FROM slow_queries')
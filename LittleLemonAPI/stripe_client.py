@@ -0,0 +1,55 @@
+"""
+Clientes de Stripe con pool de conexiones (httpx) y timeouts explícitos.
+
+- get_client(): para vistas síncronas. Un StripeClient por proceso, con el
+  api_key fijado una vez (en vez de asignar stripe.api_key en cada request).
+- get_async_client(): para las vistas async. El pool de httpx.AsyncClient
+  queda ligado al event loop donde se usa, así que hay uno por loop: bajo
+  uvicorn es uno por worker; bajo WSGI (un loop por request) no se reutiliza.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+import stripe
+from django.conf import settings
+
+_lock = threading.Lock()
+_sync_client = None
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _timeout():
+    return httpx.Timeout(
+        settings.STRIPE_READ_TIMEOUT,
+        connect=settings.STRIPE_CONNECT_TIMEOUT,
+        pool=settings.STRIPE_CONNECT_TIMEOUT,
+    )
+
+
+def _build(allow_sync_methods):
+    base_addresses = {'api': settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else None
+    return stripe.StripeClient(
+        settings.STRIPE_SECRET_KEY,
+        base_addresses=base_addresses,
+        max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+        http_client=stripe.HTTPXClient(timeout=_timeout(), allow_sync_methods=allow_sync_methods),
+    )
+
+
+def get_client():
+    global _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_client = _build(allow_sync_methods=True)
+    return _sync_client
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = _build(allow_sync_methods=False)
+    return client
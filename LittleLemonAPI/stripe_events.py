@@ -0,0 +1,112 @@
+"""
+Procesamiento de eventos de Stripe registrados por el webhook.
+
+El webhook solo verifica la firma, guarda el evento (una fila por event id) y
+responde 200. `manage.py process_stripe_events` recorre los pendientes por
+lotes: cada evento se procesa y se marca como procesado en la misma
+transacción, así que sus efectos se aplican exactamente una vez. Si falla,
+se reintenta con backoff exponencial hasta STRIPE_EVENT_MAX_ATTEMPTS.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cart_store import get_cart_store
+from .models import Order, StripeEvent
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handles(event_type):
+    def register(func):
+        HANDLERS[event_type] = func
+        return func
+    return register
+
+
+@handles('checkout.session.completed')
+def checkout_session_completed(event):
+    session = event.payload['data']['object']
+    customer_email = session.get('customer_email')
+    if not customer_email:
+        return
+    user = User.objects.filter(email=customer_email).order_by('id').first()
+    if user is None:
+        logger.warning("Stripe event %s: no user with email %s", event.event_id, customer_email)
+        return
+    order = Order.objects.create_from_cart(user)
+    if order is None:
+        # Carrito vacío, no se crea orden
+        logger.warning("Stripe event %s: cart of user %s is empty", event.event_id, user.pk)
+        return
+    get_cart_store().discard(user)
+
+
+def record_event(event):
+    """Guarda el evento verificado; los reenvíos de Stripe con el mismo id se ignoran."""
+    # for_json: los campos decimales de Stripe (fx_rate, ...) quedan como strings y no como Decimal,
+    # que el JSONField no puede guardar
+    StripeEvent.objects.get_or_create(
+        event_id=event['id'],
+        defaults={'type': event['type'], 'payload': event.to_dict(for_json=True)},
+    )
+
+
+def backoff(attempts):
+    seconds = settings.STRIPE_EVENT_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.STRIPE_EVENT_RETRY_MAX_SECONDS))
+
+
+def process_event(event_pk):
+    """Procesa un evento si sigue pendiente. Devuelve True si se procesó."""
+    try:
+        with transaction.atomic():
+            event = (
+                StripeEvent.objects.select_for_update(skip_locked=True)
+                .filter(pk=event_pk, status=StripeEvent.STATUS_PENDING)
+                .first()
+            )
+            if event is None:
+                # Otro worker lo tiene bloqueado o ya lo procesó
+                return False
+            handler = HANDLERS.get(event.type)
+            if handler is not None:
+                handler(event)
+            event.status = StripeEvent.STATUS_PROCESSED
+            event.attempts += 1
+            event.processed_at = timezone.now()
+            event.last_error = ''
+            event.save(update_fields=['status', 'attempts', 'processed_at', 'last_error'])
+            return True
+    except Exception as exc:
+        logger.exception("Stripe event %s failed", event_pk)
+        _record_failure(event_pk, exc)
+        return False
+
+
+def _record_failure(event_pk, exc):
+    with transaction.atomic():
+        event = StripeEvent.objects.select_for_update().get(pk=event_pk)
+        event.attempts += 1
+        event.last_error = repr(exc)
+        if event.attempts >= settings.STRIPE_EVENT_MAX_ATTEMPTS:
+            event.status = StripeEvent.STATUS_FAILED
+        else:
+            event.next_attempt_at = timezone.now() + backoff(event.attempts)
+        event.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def process_pending(batch_size=50):
+    """Procesa un lote de eventos pendientes cuyo reintento ya venció. Devuelve cuántos se procesaron."""
+    pending = (
+        StripeEvent.objects.filter(status=StripeEvent.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+        .order_by('next_attempt_at', 'id')
+        .values_list('pk', flat=True)[:batch_size]
+    )
+    return sum(process_event(pk) for pk in list(pending))
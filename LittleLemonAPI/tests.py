@@ -1,3 +1,971 @@
-from django.test import TestCase
+import json
+import multiprocessing
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
+from django.db import connection
+from django.db.models import Max
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from . import checkout_sessions, dispatch, menu_cache, menu_snapshot, metrics, profiling, rollups
+from .cart_store import MAX_QUANTITY, CacheCartStore, get_cart_store
+from .loadtest import webhook_signature
+from .models import (
+    Cart, Category, CategoryDailySales, DailySales, MenuItem, MenuItemDailySales, Order, StripeEvent,
+)
+from .pagination import KeysetPagination, PageNumberOrKeysetPagination
+from .roles import DELIVERY_CREW
+from .throttles import CacheThrottleBackend, SQLiteThrottleBackend
+from .views import OrderViewSet
+
+
+class StripeWebhookTests(TestCase):
+    def post_event(self, event):
+        payload = json.dumps(event).encode()
+        return self.client.post(
+            reverse('stripe-webhook'),
+            payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=webhook_signature(payload, secret=settings.STRIPE_WEBHOOK_SECRET),
+        )
+
+    def test_records_event_with_decimal_string_fields(self):
+        """Stripe manda algunos decimales como strings (fx_rate): el evento se guarda igual."""
+        event = {
+            'id': 'evt_decimal',
+            'object': 'event',
+            'type': 'checkout.session.completed',
+            'data': {'object': {
+                'id': 'cs_test_decimal',
+                'object': 'checkout.session',
+                'status': 'complete',
+                'currency_conversion': {'amount_subtotal': 1000, 'fx_rate': '1.087654', 'source_currency': 'eur'},
+            }},
+        }
+        response = self.post_event(event)
+
+        self.assertEqual(response.status_code, 200)
+        stored = StripeEvent.objects.get(event_id='evt_decimal')
+        self.assertEqual(stored.payload['data']['object']['currency_conversion']['fx_rate'], '1.087654')
+
+    def test_redelivered_event_is_recorded_once(self):
+        event = {'id': 'evt_twice', 'object': 'event', 'type': 'payment_intent.created', 'data': {'object': {}}}
+        self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(StripeEvent.objects.filter(event_id='evt_twice').count(), 1)
+
+
+class MenuCacheKeyTests(TestCase):
+    def key(self, query):
+        return menu_cache.make_key(Request(APIRequestFactory().get('/api/menu-items/', query, SERVER_NAME='localhost')))
+
+    def test_case_sensitive_params_get_their_own_entry(self):
+        # ?ordering=Title no es un campo válido (DRF lo ignora): no puede compartir entrada con title
+        self.assertNotEqual(self.key({'ordering': 'Title'}), self.key({'ordering': 'title'}))
+        self.assertNotEqual(self.key({'cursor': 'eyJvIjpbImlkIl19'}), self.key({'cursor': 'EYJVIJPBIMLKIL19'}))
+        self.assertNotEqual(self.key({'Page': '2'}), self.key({'page': '2'}))
+
+    def test_case_insensitive_params_share_an_entry(self):
+        self.assertEqual(self.key({'category': 'Mains'}), self.key({'category': 'mains'}))
+        self.assertEqual(self.key({'search': 'Pasta'}), self.key({'search': 'pasta'}))
+        self.assertEqual(self.key({}), self.key({'page': '1'}))
+
+
+ORDER_TABLE = Order._meta.db_table
+ORDERS_PER_DAY = 150
+
+# Reparto de estados de la muestra (la mayoría del histórico está entregado)
+STATUS_WEIGHTS = [
+    (Order.STATUS_DELIVERED, 85),
+    (Order.STATUS_CANCELLED, 5),
+    (Order.STATUS_PENDING, 3),
+    (Order.STATUS_PREPARING, 3),
+    (Order.STATUS_DELIVERING, 4),
+]
+
+# (alcance, parámetros de /api/orders/); "cursor": "deep" = página a mitad del listado
+ORDER_LIST_CASES = [
+    ('customer', {}),
+    ('customer', {'cursor': 'deep'}),
+    ('crew', {}),
+    ('crew', {'status': Order.STATUS_DELIVERING}),
+    ('manager', {}),
+    ('manager', {'status': Order.STATUS_PENDING}),
+    ('manager', {'status': Order.STATUS_PREPARING}),
+    ('manager', {'status': Order.STATUS_DELIVERED}),
+    ('manager', {'cursor': 'deep'}),
+]
+
+
+def explain(sql):
+    """Plan de una query ya interpolada, como texto (una línea por nodo)."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return '\n'.join(row[-1] for row in cursor.fetchall())
+        cursor.execute(f'EXPLAIN {sql}')
+        return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+def order_access(plan):
+    """
+    Cómo lee el plan la tabla de órdenes: (índices usados, recorrido completo
+    sin índice, salta a una posición del índice en vez de recorrerlo, ordena aparte).
+    """
+    table = re.escape(ORDER_TABLE)
+    if connection.vendor == 'sqlite':
+        indexes = re.findall(rf'(?:SCAN|SEARCH) "?{table}\b"? USING (?:COVERING )?INDEX (\w+)', plan)
+        full_scan = bool(re.search(rf'SCAN "?{table}\b"?\s*$', plan, re.MULTILINE))
+        seek = bool(re.search(rf'SEARCH "?{table}\b', plan))
+        sort = 'USE TEMP B-TREE FOR' in plan
+    else:
+        indexes = re.findall(rf'Index (?:Only )?Scan(?: Backward)? using (\w+) on "?{table}\b', plan)
+        if re.search(rf'Bitmap Heap Scan on "?{table}\b', plan):
+            indexes += re.findall(r'Bitmap Index Scan on (\w+)', plan)
+        full_scan = bool(re.search(rf'Seq Scan on "?{table}\b', plan))
+        seek = 'Index Cond:' in plan
+        sort = bool(re.search(r'^\s*(?:->\s*)?(?:Incremental )?Sort\b', plan, re.MULTILINE))
+    return indexes, full_scan, seek, sort
+
+
+class OrderIndexTests(TestCase):
+    """
+    EXPLAIN de las queries de /api/orders/ (cliente, repartidor y manager, con
+    página, conteo y cursor) sobre una muestra con la forma de producción:
+    ninguna puede recorrer la tabla de órdenes entera y las páginas por cursor
+    tienen que saltar a su posición. Corre contra la BD configurada (SQLite o
+    PostgreSQL con DATABASE_URL).
+    """
+    ORDERS = 20_000
+    CUSTOMERS = 500
+    CREW = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        prefix = 'order-indexes'
+        manager = User.objects.create_superuser(f'{prefix}-manager')
+        customers = User.objects.bulk_create(User(username=f'{prefix}-customer-{i}') for i in range(cls.CUSTOMERS))
+        crew = User.objects.bulk_create(User(username=f'{prefix}-crew-{i}') for i in range(cls.CREW))
+        Group.objects.get_or_create(name=DELIVERY_CREW)[0].user_set.add(*crew)
+
+        pattern = [status for status, weight in STATUS_WEIGHTS for _ in range(weight)]
+        open_statuses = (Order.STATUS_PENDING, Order.STATUS_PREPARING)
+        last_id = Order.objects.aggregate(last=Max('id'))['last'] or 0
+        Order.objects.bulk_create(
+            (
+                Order(
+                    user=customers[(i * 7919) % cls.CUSTOMERS],
+                    delivery_crew=None if status in open_statuses else crew[(i // 7) % cls.CREW],
+                    status=status,
+                    total=10,
+                )
+                for i, status in enumerate(pattern[(i * 37) % len(pattern)] for i in range(cls.ORDERS))
+            ),
+            batch_size=5000,
+        )
+        # date es auto_now_add: se reparte después, ORDERS_PER_DAY órdenes por día hasta hoy
+        today = timezone.localdate()
+        for offset in range(0, cls.ORDERS, ORDERS_PER_DAY):
+            Order.objects.filter(id__gt=last_id + offset, id__lte=last_id + offset + ORDERS_PER_DAY).update(
+                date=today - timedelta(days=(cls.ORDERS - offset - 1) // ORDERS_PER_DAY)
+            )
+        # Estadísticas al día para que el planner elija como en producción
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE' if connection.vendor == 'sqlite' else f'ANALYZE "{ORDER_TABLE}"')
+        cls.users = {'customer': customers[0], 'crew': crew[0], 'manager': manager}
+
+    def view(self, user, params):
+        # localhost está en ALLOWED_HOSTS también con DEBUG: la paginación arma URLs absolutas
+        request = Request(APIRequestFactory().get('/api/orders/', params, SERVER_NAME='localhost'))
+        request.user = user
+        view = OrderViewSet(request=request, format_kwarg=None, action='list', kwargs={})
+        view.headers = {}
+        return request, view
+
+    def deep_cursor(self, user):
+        request, view = self.view(user, {'cursor': ''})
+        paginator = KeysetPagination()
+        paginator.ordering = paginator.get_ordering(request, None, view)
+        queryset = view.get_queryset().order_by(*paginator.ordering).values('date', 'id')
+        position = queryset[queryset.count() // 2]
+        return paginator.make_cursor(paginator.get_position(position))
+
+    def order_plans(self, scope, params):
+        """[(count|page, plan)] de las queries sobre la tabla de órdenes de ese listado."""
+        user = self.users[scope]
+        if params.get('cursor') == 'deep':
+            params = {**params, 'cursor': self.deep_cursor(user)}
+        request, view = self.view(user, params)
+        with CaptureQueriesContext(connection) as captured:
+            queryset = view.filter_queryset(view.get_queryset())
+            PageNumberOrKeysetPagination().paginate_queryset(queryset, request, view)
+
+        plans = []
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not re.search(rf'\bFROM "{re.escape(ORDER_TABLE)}"(?!\w)', sql):
+                continue
+            kind = 'count' if 'COUNT(' in sql.upper() else 'page'
+            if kind == 'count' and ' WHERE ' not in sql.upper():
+                # Contar toda la tabla la recorre entera con o sin índice
+                continue
+            plans.append((kind, explain(sql)))
+        return plans
+
+    def test_order_queries_use_indexes(self):
+        for scope, params in ORDER_LIST_CASES:
+            plans = self.order_plans(scope, params)
+            self.assertTrue(plans, f'no order queries for {scope} {params}')
+            for kind, plan in plans:
+                with self.subTest(scope=scope, params=params, query=kind):
+                    indexes, full_scan, seek, _ = order_access(plan)
+                    self.assertTrue(indexes and not full_scan, f'full scan:\n{plan}')
+                    if 'cursor' in params and kind == 'page':
+                        # Una página por cursor tiene que saltar a su posición, no recorrer lo anterior
+                        self.assertTrue(seek, f'no seek:\n{plan}')
+
+    @skipUnless(connection.vendor == 'postgresql', 'Plans of the PostgreSQL planner')
+    def test_postgres_pages_come_ordered_from_the_index(self):
+        # Bitmap Heap Scan + Sort leería todas las filas del filtro para devolver una página
+        for scope, params in ORDER_LIST_CASES:
+            if scope == 'crew':
+                # (delivery_crew, status) no tiene la fecha: las órdenes de un repartidor se ordenan aparte
+                continue
+            for kind, plan in self.order_plans(scope, params):
+                if kind != 'page':
+                    continue
+                with self.subTest(scope=scope, params=params):
+                    _, _, _, sort = order_access(plan)
+                    self.assertFalse(sort, f'sort:\n{plan}')
+
+
+class CheckoutSessionCoalescingTests(TestCase):
+    session_id = 'cs_test_coalescing'
+
+    def setUp(self):
+        self.cache = checkout_sessions._cache()
+        self.cache.delete_many([checkout_sessions._key(self.session_id), checkout_sessions._lock_key(self.session_id)])
+        self.addCleanup(self.cache.delete_many, [
+            checkout_sessions._key(self.session_id), checkout_sessions._lock_key(self.session_id),
+        ])
+        client = mock.patch.object(checkout_sessions, 'get_client').start()
+        self.addCleanup(mock.patch.stopall)
+        self.stripe_retrieve = client.return_value.v1.checkout.sessions.retrieve
+        self.stripe_retrieve.return_value.to_dict.return_value = {'id': self.session_id, 'status': 'open'}
+
+    def later(self, action):
+        timer = threading.Timer(0.2, action)
+        timer.start()
+        self.addCleanup(timer.join)
+
+    def test_waits_for_the_worker_holding_the_lock(self):
+        # Otro worker tomó el lock y guarda la sesión al rato
+        self.cache.add(checkout_sessions._lock_key(self.session_id), 1)
+        self.later(lambda: checkout_sessions.store({'id': self.session_id, 'status': 'complete'}))
+
+        session = checkout_sessions.retrieve(self.session_id)
+
+        self.assertEqual(session['status'], 'complete')
+        self.stripe_retrieve.assert_not_called()
+
+    def test_calls_stripe_if_the_lock_is_released_without_a_session(self):
+        # El otro worker falló: suelta el lock sin guardar nada
+        self.cache.add(checkout_sessions._lock_key(self.session_id), 1)
+        self.later(lambda: self.cache.delete(checkout_sessions._lock_key(self.session_id)))
+
+        session = checkout_sessions.retrieve(self.session_id)
+
+        self.assertEqual(session['status'], 'open')
+        self.stripe_retrieve.assert_called_once_with(self.session_id)
+
+    def test_releases_the_lock_after_calling_stripe(self):
+        checkout_sessions.retrieve(self.session_id)
+
+        self.stripe_retrieve.assert_called_once_with(self.session_id)
+        self.assertIsNone(self.cache.get(checkout_sessions._lock_key(self.session_id)))
+        self.assertEqual(self.cache.get(checkout_sessions._key(self.session_id))['status'], 'open')
+
+
+class MenuSnapshotTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / 'menu_snapshot.json'
+        settings_override = override_settings(MENU_SNAPSHOT_PATH=str(self.path), MENU_SNAPSHOT_CHECK_INTERVAL=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.category = Category.objects.create(slug='snapshot-mains', title='Snapshot mains')
+
+    def titles(self, reader):
+        content, _ = reader.read()
+        # Las migraciones ya cargan el menú de ejemplo: solo los platos de la categoría del test
+        return [
+            item['title']
+            for category in json.loads(content)['categories'] if category['id'] == self.category.id
+            for item in category['items']
+        ]
+
+    def test_rebuilds_a_file_left_by_a_previous_process(self):
+        MenuItem.objects.create(title='Pasta', price='9.50', category=self.category)
+        # Fichero y stamp de un deploy anterior, antes de crear el plato
+        self.path.write_bytes(b'{"count":0,"categories":[]}')
+        Path(f'{self.path}.stamp').write_text(menu_snapshot.content_stamp(self.path.read_bytes()))
+
+        self.assertEqual(self.titles(menu_snapshot.SnapshotReader()), ['Pasta'])
+
+    def test_picks_up_changes_that_skip_the_signals(self):
+        reader = menu_snapshot.SnapshotReader()
+        self.assertEqual(self.titles(reader), [])
+
+        # bulk_create no envía post_save
+        MenuItem.objects.bulk_create([MenuItem(title='Soup', price='4.00', category=self.category)])
+
+        self.assertEqual(self.titles(reader), ['Soup'])
+
+    def test_picks_up_updates_that_keep_the_row_count(self):
+        MenuItem.objects.create(title='Salad', price='6.00', category=self.category)
+        reader = menu_snapshot.SnapshotReader()
+        content, etag = reader.read()
+        self.assertIn(b'"6.00"', content)
+
+        # QuerySet.update tampoco envía post_save, y no cambia conteos ni ids
+        MenuItem.objects.filter(category=self.category).update(price='7.25')
+
+        new_content, new_etag = reader.read()
+        self.assertIn(b'"7.25"', new_content)
+        self.assertNotEqual(new_etag, etag)
+
+
+class CacheCartStoreConcurrencyTests(TestCase):
+    WORKERS = 8
+    ADDS = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user('cart-concurrency')
+        category = Category.objects.create(slug='cart-concurrency', title='Cart concurrency')
+        self.menuitem = MenuItem.objects.create(title='Burger', price=Decimal('12.00'), category=category)
+        self.store = CacheCartStore()
+        self.store.clear(self.user)
+        self.addCleanup(self.store.clear, self.user)
+
+        # Entre leer y escribir pasa algo de tiempo, como con un cache remoto
+        load = self.store._load
+
+        def slow_load(user):
+            data = load(user)
+            time.sleep(0.002)
+            return data
+        self.store._load = slow_load
+
+    def run_in_threads(self, action):
+        threads = [threading.Thread(target=action) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def test_concurrent_adds_keep_every_unit(self):
+        def add():
+            for _ in range(self.ADDS):
+                self.store.add(self.user, self.menuitem, 1)
+
+        self.run_in_threads(add)
+
+        [line] = self.store.lines(self.user)
+        self.assertEqual(line.quantity, self.WORKERS * self.ADDS)
+
+    def test_set_quantity_does_not_drop_concurrent_lines(self):
+        category = self.menuitem.category
+        others = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Side {i}', price=Decimal('2.00'), category=category) for i in range(self.WORKERS)
+        )
+        line = self.store.add(self.user, self.menuitem, 1)
+        pending = list(others)
+
+        def add_and_set():
+            self.store.add(self.user, pending.pop(), 1)
+            self.store.set_quantity(self.user, line, 3)
+
+        self.run_in_threads(add_and_set)
+
+        quantities = {line.menuitem.pk: line.quantity for line in self.store.lines(self.user)}
+        self.assertEqual(quantities, {self.menuitem.pk: 3, **{other.pk: 1 for other in others}})
+
+
+def _throttle_hits(args):
+    """Corre en un proceso aparte: peticiones permitidas de `hits` sobre la misma clave."""
+    key, hits, limit, period, now = args
+    backend = SQLiteThrottleBackend()
+    return sum(backend.hit(key, limit, period, now=now)[0] for _ in range(hits))
+
+
+@skipUnless('fork' in multiprocessing.get_all_start_methods(), 'Needs fork: the workers inherit the test settings')
+class SQLiteThrottleBackendProcessesTests(TestCase):
+    PROCESSES = 4
+    HITS = 100
+    LIMIT = 150
+    PERIOD = 60
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(SHARED_STATE_DB=str(Path(tmp.name) / 'shared_state.sqlite3'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Mitad de una ventana sin ventana anterior: el límite es exactamente LIMIT
+        self.now = 1_000_000 * self.PERIOD + self.PERIOD / 2
+
+    def hit_from_processes(self, key):
+        with multiprocessing.get_context('fork').Pool(self.PROCESSES) as pool:
+            return pool.map(_throttle_hits, [(key, self.HITS, self.LIMIT, self.PERIOD, self.now)] * self.PROCESSES)
+
+    def test_limit_is_shared_between_processes(self):
+        allowed = self.hit_from_processes('processes')
+
+        self.assertEqual(sum(allowed), self.LIMIT)
+        # Ningún proceso pudo pasar el límite por su cuenta
+        self.assertTrue(all(count < self.LIMIT for count in allowed), allowed)
+        self.assertEqual(SQLiteThrottleBackend().hit('processes', self.LIMIT, self.PERIOD, now=self.now), (False, self.PERIOD / 2))
+
+    def test_previous_window_counts_across_processes(self):
+        self.hit_from_processes('windows')
+
+        # Un cuarto de la ventana siguiente: la anterior (LIMIT peticiones) pesa 3/4
+        later = self.now + self.PERIOD - self.PERIOD / 4
+        allowed = sum(_throttle_hits(('windows', 1, self.LIMIT, self.PERIOD, later)) for _ in range(self.LIMIT))
+        self.assertEqual(allowed, self.LIMIT // 4)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(SHARED_STATE_DB=str(Path(tmp.name) / 'shared_state.sqlite3'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        staff = User.objects.create_user('profiling-staff', is_staff=True)
+        patcher = mock.patch.object(profiling, 'authorized_user', return_value=staff)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def profiled(self, path):
+        return RequestFactory().get(path, HTTP_X_PROFILE='1')
+
+    def test_overlapping_profiled_request_is_served_unprofiled(self):
+        responses = {}
+
+        def get_response(request):
+            if request.path == '/first/':
+                # Otra request perfilada llega a otro hilo del mismo worker mientras tanto
+                other = threading.Thread(target=lambda: responses.update(second=middleware(self.profiled('/second/'))))
+                other.start()
+                other.join()
+            return HttpResponse('ok')
+
+        middleware = profiling.ProfilingMiddleware(get_response)
+        first = middleware(self.profiled('/first/'))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertIn(profiling.ID_HEADER, first)
+        self.assertEqual(responses['second'].status_code, 200)
+        self.assertNotIn(profiling.ID_HEADER, responses['second'])
+        # Terminado el primero, el lock queda libre
+        self.assertIn(profiling.ID_HEADER, middleware(self.profiled('/third/')))
+
+    def test_busy_profiler_serves_the_request_unprofiled(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse('ok'))
+
+        with mock.patch.object(profiling.cProfile.Profile, 'enable', side_effect=ValueError('Another profiling tool is already active')):
+            response = middleware(self.profiled('/busy/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(profiling.ID_HEADER, response)
+        self.assertIn(profiling.ID_HEADER, middleware(self.profiled('/free/')))
+
+
+class CacheThrottleBackendTests(TestCase):
+    LIMIT = 5
+    PERIOD = 60
+
+    def setUp(self):
+        self.backend = CacheThrottleBackend()
+        self.now = 2_000_000 * self.PERIOD + self.PERIOD / 2
+        self.key = 'throttle-test'
+        self.addCleanup(self.backend.cache.delete_many, [
+            f'{self.key}:{int(self.now // self.PERIOD) * self.PERIOD}',
+        ])
+
+    def test_limits_within_a_window(self):
+        allowed = [self.backend.hit(self.key, self.LIMIT, self.PERIOD, now=self.now)[0] for _ in range(self.LIMIT + 2)]
+
+        self.assertEqual(allowed, [True] * self.LIMIT + [False, False])
+
+    def test_counter_evicted_between_add_and_incr(self):
+        cache = self.backend.cache
+        add = cache.add
+        calls = []
+
+        def add_then_evict(key, value, timeout=None):
+            added = add(key, value, timeout)
+            if not calls:
+                # El cache desaloja el contador recién creado antes del incr
+                cache.delete(key)
+            calls.append(key)
+            return added
+
+        with mock.patch.object(cache, 'add', side_effect=add_then_evict):
+            result = self.backend.hit(self.key, self.LIMIT, self.PERIOD, now=self.now)
+
+        self.assertEqual(result, (True, None))
+        self.assertEqual(len(calls), 2)
+
+
+class PerformanceMetricsTests(TestCase):
+    labels = 'view="MenuItemViewSet.list",method="GET"'
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_override = override_settings(
+            SHARED_STATE_DB=str(Path(tmp.name) / 'shared_state.sqlite3'), METRICS_TOKEN='metrics-test',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Lo que hayan acumulado otros tests en este proceso no va a este SQLite
+        with metrics._aggregator.lock:
+            metrics._aggregator.pending.clear()
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header_and_metrics_for_one_request(self):
+        response = self.client.get(reverse('menuitem-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=\d+\.\d;desc="\d+ queries", view;dur=\d+\.\d, render;dur=\d+\.\d, total;dur=\d+\.\d$',
+        )
+
+        scrape = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer metrics-test')
+        self.assertEqual(scrape.status_code, 200)
+        body = scrape.content.decode()
+        self.assertIn(f'littlelemon_responses_total{{{self.labels},status="200"}} 1\n', body)
+        for name in metrics.HISTOGRAMS:
+            self.assertIn(f'{name}_count{{{self.labels}}} 1\n', body)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_no_server_timing_header_when_disabled(self):
+        response = self.client.get(reverse('menuitem-list'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics_require_the_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('cart-batch')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(slug='cart-batch', title='Cart batch')
+        self.burger, self.fries, self.soda, self.mint = MenuItem.objects.bulk_create(
+            MenuItem(title=title, price=Decimal(price), category=category)
+            for title, price in (('Burger', '9.00'), ('Fries', '3.00'), ('Soda', '2.00'), ('Mint', '0.10'))
+        )
+        self.addCleanup(get_cart_store().clear, self.user)
+
+    def batch(self, *operations):
+        return self.client.post(reverse('cart-batch'), {'operations': list(operations)}, format='json')
+
+    def cart(self):
+        return {line.menuitem.pk: line.quantity for line in get_cart_store().lines(self.user)}
+
+    def test_applies_add_set_and_remove_in_order(self):
+        get_cart_store().add(self.user, self.burger, 1)
+        get_cart_store().add(self.user, self.soda, 4)
+
+        response = self.batch(
+            {'action': 'add', 'menuitem_id': self.burger.pk, 'quantity': 2},
+            {'action': 'add', 'menuitem_id': self.fries.pk, 'quantity': 1},
+            {'action': 'set', 'menuitem_id': self.fries.pk, 'quantity': 5},
+            {'action': 'remove', 'menuitem_id': self.soda.pk},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {line['menuitem']['id']: (line['quantity'], line['price']) for line in response.json()},
+            {self.burger.pk: (3, '27.00'), self.fries.pk: (5, '15.00')},
+        )
+        self.assertEqual(self.cart(), {self.burger.pk: 3, self.fries.pk: 5})
+
+    def test_unknown_menuitem_rolls_back_the_whole_batch(self):
+        get_cart_store().add(self.user, self.burger, 1)
+
+        response = self.batch(
+            {'action': 'add', 'menuitem_id': self.burger.pk, 'quantity': 2},
+            {'action': 'add', 'menuitem_id': 999_999, 'quantity': 1},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cart(), {self.burger.pk: 1})
+
+    def test_quantity_over_the_column_range_is_a_400(self):
+        response = self.batch({'action': 'set', 'menuitem_id': self.burger.pk, 'quantity': MAX_QUANTITY + 1})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cart(), {})
+
+    def test_adding_past_the_column_range_is_a_400(self):
+        # 0.10 por unidad: la cantidad se pasa antes que el precio de la línea
+        get_cart_store().add(self.user, self.mint, MAX_QUANTITY - 5)
+
+        response = self.batch(
+            {'action': 'set', 'menuitem_id': self.fries.pk, 'quantity': 2},
+            {'action': 'add', 'menuitem_id': self.mint.pk, 'quantity': 10},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('operations', response.json())
+        self.assertEqual(self.cart(), {self.mint.pk: MAX_QUANTITY - 5})
+
+    def test_line_price_past_the_column_range_is_a_400(self):
+        # 1200 x 9.00 = 10800.00: no entra en Cart.price (DecimalField(6, 2))
+        response = self.batch({'action': 'set', 'menuitem_id': self.burger.pk, 'quantity': 1200})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cart(), {})
+
+    def test_single_add_past_the_column_range_is_a_400(self):
+        get_cart_store().add(self.user, self.burger, 1100)
+
+        response = self.client.post(reverse('cart-list'), {'menuitem_id': self.burger.pk, 'quantity': 200}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.cart(), {self.burger.pk: 1100})
+
+
+@override_settings(CART_STORE='LittleLemonAPI.cart_store.CacheCartStore')
+class CacheCartBatchTests(CartBatchTests):
+    pass
+
+
+class CreateOrderFromCartTests(TestCase):
+    # Carrito (con precios), orden, líneas en bloque, borrado del carrito y
+    # 8 de rollups (ver rollups.py): igual con 1 línea que con 15
+    QUERIES = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('order-from-cart')
+        category = Category.objects.create(slug='order-from-cart', title='Order from cart')
+        cls.menuitems = MenuItem.objects.bulk_create(
+            MenuItem(title=f'Dish {i}', price=Decimal('2.50') + i, category=category) for i in range(15)
+        )
+
+    def fill_cart(self, size):
+        for quantity, menuitem in enumerate(self.menuitems[:size], start=1):
+            Cart.objects.create(user=self.user, menuitem=menuitem, quantity=quantity)
+        # El precio del menú cambia después de llenar el carrito: la orden toma el actual
+        MenuItem.objects.filter(pk=self.menuitems[0].pk).update(price=Decimal('4.00'))
+        return {menuitem.pk: quantity for quantity, menuitem in enumerate(self.menuitems[:size], start=1)}
+
+    def assert_order_from_cart(self, size):
+        quantities = self.fill_cart(size)
+        prices = dict(MenuItem.objects.filter(pk__in=quantities).values_list('pk', 'price'))
+
+        with self.assertNumQueries(self.QUERIES):
+            order = Order.objects.create_from_cart(self.user)
+
+        items = {item.menuitem_id: item for item in order.items.all()}
+        self.assertEqual({pk: item.quantity for pk, item in items.items()}, quantities)
+        self.assertEqual({pk: item.unit_price for pk, item in items.items()}, prices)
+        self.assertEqual({pk: item.price for pk, item in items.items()}, {pk: prices[pk] * quantities[pk] for pk in quantities})
+        self.assertEqual(items[self.menuitems[0].pk].unit_price, Decimal('4.00'))
+        order.refresh_from_db()
+        self.assertEqual(order.total, sum(prices[pk] * quantities[pk] for pk in quantities))
+        self.assertEqual(order.user, self.user)
+        self.assertFalse(Cart.objects.filter(user=self.user).exists())
+
+    def test_one_line_cart(self):
+        self.assert_order_from_cart(1)
+
+    def test_fifteen_line_cart_takes_the_same_queries(self):
+        self.assert_order_from_cart(15)
+
+    def test_empty_cart_creates_no_order(self):
+        self.assertIsNone(Order.objects.create_from_cart(self.user))
+        self.assertFalse(Order.objects.filter(user=self.user).exists())
+
+
+class SalesRollupTests(TestCase):
+    ROLLUPS = {DailySales: (), MenuItemDailySales: ('menuitem_id',), CategoryDailySales: ('category_id',)}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('rollups-customer')
+        cls.manager = User.objects.create_user('rollups-manager', is_staff=True)
+        mains = Category.objects.create(slug='rollups-mains', title='Rollups mains')
+        drinks = Category.objects.create(slug='rollups-drinks', title='Rollups drinks')
+        cls.menuitems = MenuItem.objects.bulk_create([
+            MenuItem(title='Steak', price=Decimal('18.00'), category=mains),
+            MenuItem(title='Risotto', price=Decimal('12.50'), category=mains),
+            MenuItem(title='Juice', price=Decimal('3.25'), category=drinks),
+        ])
+
+    def order(self, *quantities):
+        for menuitem, quantity in zip(self.menuitems, quantities):
+            if quantity:
+                Cart.objects.create(user=self.customer, menuitem=menuitem, quantity=quantity)
+        return Order.objects.create_from_cart(self.customer)
+
+    def set_status(self, order, status):
+        order = Order.objects.get(pk=order.pk)
+        order.status = status
+        order.save()
+
+    def rollup_rows(self):
+        """Filas de los rollups sin las que quedaron en cero al restar."""
+        return {
+            model.__name__: {
+                (row['date'], row['status'], *(row[key] for key in keys)): (row['orders'], row['quantity'], row['revenue'])
+                for row in model.objects.values('date', 'status', 'orders', 'quantity', 'revenue', *keys)
+                if row['orders'] or row['quantity'] or row['revenue']
+            }
+            for model, keys in self.ROLLUPS.items()
+        }
+
+    def reports(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        reports = {}
+        for group_by in ('day', 'status', 'menuitem', 'category'):
+            response = client.get(reverse('sales-report'), {'group_by': group_by})
+            self.assertEqual(response.status_code, 200)
+            reports[group_by] = response.json()
+        return reports
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        first = self.order(1, 2, 0)
+        second = self.order(0, 1, 4)
+        third = self.order(2, 0, 1)
+        fourth = self.order(1, 1, 1)
+        self.set_status(first, Order.STATUS_PREPARING)
+        self.set_status(first, Order.STATUS_DELIVERED)
+        self.set_status(second, Order.STATUS_CANCELLED)
+        self.set_status(fourth, Order.STATUS_DELIVERING)
+        Order.objects.get(pk=third.pk).delete()
+
+        incremental, reported = self.rollup_rows(), self.reports()
+        rollups.rebuild()
+
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertEqual(reported, self.reports())
+        statuses = {row['status']: (row['orders'], row['quantity']) for row in reported['status']['results']}
+        self.assertEqual(statuses, {
+            Order.STATUS_DELIVERED: (1, 3),
+            Order.STATUS_CANCELLED: (1, 5),
+            Order.STATUS_DELIVERING: (1, 3),
+        })
+        self.assertEqual(
+            reported['day']['totals'],
+            {'orders': 3, 'quantity': 11, 'revenue': f"{sum(o.total for o in Order.objects.all()):.2f}"},
+        )
+
+
+class DispatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('dispatch-customer')
+        cls.manager = User.objects.create_user('dispatch-manager', is_staff=True)
+        cls.crew = User.objects.bulk_create(User(username=f'dispatch-crew-{i}') for i in range(3))
+        cls.retired = User.objects.create_user('dispatch-retired', is_active=False)
+        # Solo este equipo: las migraciones ya cargan repartidores de ejemplo
+        Group.objects.get_or_create(name=DELIVERY_CREW)[0].user_set.set([*cls.crew, cls.retired])
+
+    def orders(self, count, status=Order.STATUS_PREPARING, crew=None):
+        return [
+            Order.objects.create(user=self.customer, status=status, delivery_crew=crew, total=Decimal('10.00'))
+            for _ in range(count)
+        ]
+
+    def loads(self):
+        return dispatch.crew_loads([crew.pk for crew in self.crew])
+
+    def test_assigns_each_order_to_the_least_loaded_crew_member(self):
+        first, second, third = self.crew
+        self.orders(2, Order.STATUS_DELIVERING, first)
+        self.orders(1, Order.STATUS_PENDING, third)
+        # Las entregadas no cuentan como carga
+        self.orders(5, Order.STATUS_DELIVERED, second)
+        waiting = self.orders(6)
+
+        assignments = dispatch.dispatch_pending()
+
+        self.assertEqual(list(assignments), [order.pk for order in waiting])
+        self.assertEqual(assignments[waiting[0].pk], second.pk)
+        self.assertEqual(self.loads(), {first.pk: 3, second.pk: 3, third.pk: 3})
+        self.assertNotIn(self.retired.pk, assignments.values())
+        self.assertEqual(
+            dict(Order.objects.filter(pk__in=assignments).values_list('pk', 'delivery_crew')), assignments,
+        )
+
+    def test_skips_orders_that_already_have_crew(self):
+        first, second, _ = self.crew
+        assigned = self.orders(1, crew=first)[0]
+        waiting = self.orders(2)
+
+        assignments = dispatch.dispatch_pending()
+
+        self.assertEqual(set(assignments), {order.pk for order in waiting})
+        assigned.refresh_from_db()
+        self.assertEqual(assigned.delivery_crew, first)
+        # Una segunda pasada no encuentra nada que asignar
+        self.assertEqual(dispatch.dispatch_pending(), {})
+
+    def test_order_taken_by_a_concurrent_pass_is_not_reassigned(self):
+        first, second, _ = self.crew
+        order = self.orders(1)[0]
+        crew_loads = dispatch.crew_loads
+
+        def loads_then_concurrent_pass(crew_ids):
+            # Otra pasada asigna la orden entre la lectura y el UPDATE de esta
+            Order.objects.filter(pk=order.pk).update(delivery_crew=second)
+            # Esta pasada se la daría a otro repartidor
+            return {**crew_loads(crew_ids), first.pk: -1}
+
+        with mock.patch.object(dispatch, 'crew_loads', side_effect=loads_then_concurrent_pass):
+            dispatch.dispatch_pending()
+
+        order.refresh_from_db()
+        self.assertEqual(order.delivery_crew, second)
+
+    def test_bulk_assign_rejects_users_outside_the_crew(self):
+        order = self.orders(1)[0]
+        client = APIClient()
+        client.force_authenticate(self.manager)
+
+        response = client.post(reverse('order-bulk-assign'), {'assignments': [
+            {'order': order.pk, 'delivery_crew': self.crew[0].pk},
+            {'order': order.pk + 1000, 'delivery_crew': self.customer.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = client.post(reverse('order-bulk-assign'), {'assignments': [
+            {'order': order.pk, 'delivery_crew': self.customer.pk},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.customer.pk), str(response.json()))
+        order.refresh_from_db()
+        self.assertIsNone(order.delivery_crew)
+
+        response = client.post(reverse('order-bulk-assign'), {'assignments': [
+            {'order': order.pk, 'delivery_crew': self.crew[1].pk},
+        ]}, format='json')
+        self.assertEqual(response.json(), {'updated': 1})
+        order.refresh_from_db()
+        self.assertEqual(order.delivery_crew, self.crew[1])
+
+
+@override_settings(MENU_CACHE_MAX_BYTES=0)
+class LeanReadSerializerTests(TestCase):
+    """El camino de ValuesReadMixin responde lo mismo, byte a byte, que el de DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('lean-customer')
+        cls.manager = User.objects.create_user('lean-manager', is_superuser=True)
+        cls.crew = User.objects.create_user('lean-crew')
+        category = Category.objects.create(slug='lean-soups', title='Lean soups')
+        # Con .create(): las signals los indexan para ?search=
+        cls.menuitems = [
+            MenuItem.objects.create(title='Tomato soup', description='Ñoquis aparte', price=Decimal('6.50'),
+                                    featured=True, category=category),
+            MenuItem.objects.create(title='Onion soup', description=None, price=Decimal('7.00'), category=category),
+        ]
+        cls.orders = []
+        for i in range(12):
+            Cart.objects.create(user=cls.customer, menuitem=cls.menuitems[0], quantity=i + 1)
+            if i % 2:
+                Cart.objects.create(user=cls.customer, menuitem=cls.menuitems[1], quantity=2)
+            cls.orders.append(Order.objects.create_from_cart(cls.customer))
+        Order.objects.filter(pk__in=[order.pk for order in cls.orders[::3]]).update(
+            delivery_crew=cls.crew, status=Order.STATUS_DELIVERING,
+        )
+
+    def setUp(self):
+        # Los contadores de los throttles viven en el cache por defecto; los ids de
+        # usuario se reutilizan entre tests, así que tampoco se dejan para el siguiente
+        caches['default'].clear()
+        self.addCleanup(caches['default'].clear)
+
+    def assertSameResponse(self, client, url, params=None):
+        responses = []
+        for lean in (False, True):
+            with override_settings(LEAN_READ_SERIALIZERS=lean):
+                responses.append(client.get(url, params or {}))
+        drf, values = responses
+        self.assertEqual(drf.status_code, 200)
+        self.assertEqual(values.status_code, 200)
+        self.assertEqual(drf.content, values.content)
+        return values.json()
+
+    def assertSameCursorPages(self, client, url, params):
+        data = self.assertSameResponse(client, url, {**params, 'cursor': ''})
+        pages = 1
+        while data['next']:
+            data = self.assertSameResponse(client, data['next'])
+            pages += 1
+        self.assertGreater(pages, 1)
+
+    def test_menu_items(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        url = reverse('menuitem-list')
+        data = self.assertSameResponse(client, url)
+        self.assertTrue(data['results'])
+        self.assertSameResponse(client, url, {'page': 2})
+        self.assertSameResponse(client, url, {'ordering': '-price'})
+        self.assertSameResponse(client, url, {'category': 'lean-soups'})
+        data = self.assertSameResponse(client, url, {'search': 'soup'})
+        self.assertLessEqual({item.pk for item in self.menuitems}, {item['id'] for item in data['results']})
+        for menuitem in self.menuitems:
+            self.assertSameResponse(client, reverse('menuitem-detail', args=[menuitem.pk]))
+        self.assertSameCursorPages(client, url, {})
+        self.assertSameCursorPages(client, url, {'ordering': '-price'})
+
+    def test_orders(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        url = reverse('order-list')
+        data = self.assertSameResponse(client, url)
+        self.assertEqual(data['count'], len(self.orders))
+        self.assertSameResponse(client, url, {'page': 2})
+        self.assertSameResponse(client, url, {'status': Order.STATUS_DELIVERING})
+        self.assertSameResponse(client, url, {'ordering': 'status'})
+        self.assertSameCursorPages(client, url, {})
+        for order in self.orders[:2]:
+            self.assertSameResponse(client, f'{url}{order.pk}/')
+
+    def test_customer_orders(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        url = reverse('order-list')
+        self.assertSameResponse(client, url)
+        self.assertSameCursorPages(client, url, {})
+        self.assertSameResponse(client, f'{url}{self.orders[0].pk}/')
@@ -1,10 +1,170 @@
-from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
+"""
+Throttles con contador de ventana deslizante compartido entre workers.
 
-class MenuUserThrottle(UserRateThrottle):
+Los throttles de DRF guardan en el cache la lista de timestamps de cada
+cliente y la reescriben entera en cada request; con LocMemCache además cada
+worker cuenta por separado. Aquí cada clave ocupa un contador fijo: las
+peticiones de la ventana actual y de la anterior, y la estimación es
+previous * (parte de la ventana anterior que aún cuenta) + current.
+
+El backend lo elige THROTTLE_BACKEND:
+- CacheThrottleBackend (por defecto): add/incr del cache de Django
+  (atómicos en Redis o Memcached, compartidos entre workers y hosts). Con
+  LocMemCache cada worker cuenta por separado, como los throttles de DRF.
+- SQLiteThrottleBackend: una fila por clave en el SQLite de shared_state,
+  actualizada en una transacción BEGIN IMMEDIATE. Compartido solo entre los
+  workers del mismo host y serializa sus requests: para tests o un host
+  sin cache compartido.
+
+Las tasas se leen en cada request de DEFAULT_THROTTLE_RATES por `scope`.
+"""
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import AnonRateThrottle, UserRateThrottle
+
+from . import shared_state
+
+PRUNE_INTERVAL = 60
+
+
+def _estimate(current, previous, elapsed, period):
+    return previous * (period - elapsed) / period + current
+
+
+def _wait(current, previous, limit, elapsed, period):
+    """Segundos hasta que la estimación baje del límite."""
+    if current >= limit or not previous:
+        return period - elapsed
+    return max(period * (1 - (limit - current) / previous) - elapsed, 0)
+
+
+class SQLiteThrottleBackend:
+    TABLE = 'throttle'
+    DDL = (
+        'CREATE TABLE IF NOT EXISTS throttle ('
+        'key TEXT PRIMARY KEY, window INTEGER NOT NULL, current INTEGER NOT NULL, '
+        'previous INTEGER NOT NULL, expires INTEGER NOT NULL) WITHOUT ROWID'
+    )
+
+    def __init__(self):
+        self._last_prune = 0
+
+    def hit(self, key, limit, period, now=None):
+        """Cuenta una petición si cabe en el límite. Devuelve (permitida, espera)."""
+        now = time.time() if now is None else now
+        window = int(now // period) * period
+        elapsed = now - window
+        shared_state.ensure_table(self.TABLE, self.DDL)
+        with shared_state.transaction() as conn:
+            row = conn.execute('SELECT window, current, previous FROM throttle WHERE key = ?', (key,)).fetchone()
+            current = previous = 0
+            if row and row[0] == window:
+                current, previous = row[1], row[2]
+            elif row and row[0] == window - period:
+                # La ventana actual pasa a ser la anterior
+                previous = row[1]
+
+            if _estimate(current, previous, elapsed, period) + 1 > limit:
+                return False, _wait(current, previous, limit, elapsed, period)
+
+            conn.execute(
+                'INSERT INTO throttle (key, window, current, previous, expires) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET window = excluded.window, current = excluded.current, '
+                'previous = excluded.previous, expires = excluded.expires',
+                (key, window, current + 1, previous, window + 2 * period),
+            )
+            if now - self._last_prune > PRUNE_INTERVAL:
+                # Claves sin actividad en dos ventanas: ya no influyen en nada
+                conn.execute('DELETE FROM throttle WHERE expires < ?', (now,))
+                self._last_prune = now
+        return True, None
+
+
+class CacheThrottleBackend:
+    def __init__(self):
+        self.cache = caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def hit(self, key, limit, period, now=None):
+        now = time.time() if now is None else now
+        window = int(now // period) * period
+        elapsed = now - window
+        current_key = f'{key}:{window}'
+        # El contador de una ventana solo hace falta durante esa ventana y la siguiente
+        self.cache.add(current_key, 0, timeout=2 * period)
+        current = self._incr(current_key, 2 * period)
+        previous = self.cache.get(f'{key}:{window - period}', 0)
+        if _estimate(current, previous, elapsed, period) > limit:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                # Desalojada mientras tanto: ya no hay nada que devolver
+                pass
+            return False, _wait(current - 1, previous, limit, elapsed, period)
+        return True, None
+
+    def _incr(self, key, timeout):
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # La clave caducó o se desalojó entre add e incr
+            if self.cache.add(key, 1, timeout=timeout):
+                return 1
+            return self.cache.incr(key)
+
+
+@lru_cache(maxsize=None)
+def _load_backend(path):
+    return import_string(path)()
+
+
+def get_backend():
+    return _load_backend(settings.THROTTLE_BACKEND)
+
+
+class SharedRateThrottleMixin:
+    """Sustituye el historial en cache de SimpleRateThrottle por el backend compartido."""
+
+    def get_rate(self):
+        # En cada request, no al importar (THROTTLE_RATES de DRF queda fijo al cargar)
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[self.scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{self.scope}' scope")
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        allowed, self._wait = get_backend().hit(self.key, self.num_requests, self.duration)
+        return allowed
+
+    def wait(self):
+        return self._wait
+
+
+class SharedAnonRateThrottle(SharedRateThrottleMixin, AnonRateThrottle):
+    scope = "anon"
+
+
+class SharedUserRateThrottle(SharedRateThrottleMixin, UserRateThrottle):
+    scope = "user"
+
+
+class MenuUserThrottle(SharedUserRateThrottle):
     scope = "menu_user"
 
-class MenuAnonThrottle(AnonRateThrottle):
+
+class MenuAnonThrottle(SharedAnonRateThrottle):
     scope = "menu_anon"
 
-class HealthzThrottle(AnonRateThrottle):
-    scope = "healthz"
\ No newline at end of file
+
+class HealthzThrottle(SharedAnonRateThrottle):
+    scope = "healthz"
@@ -1,13 +1,19 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     MenuItemViewSet,
+    MenuSnapshotView,
     OrderViewSet,
+    OrderExportView,
+    OrderEventStreamView,
     CartViewSet,
     ManagerGroupView,
     DeliveryCrewGroupView,
     CreateOrderView,
     AssignDeliveryCrewView,
+    DispatchOrdersView,
+    BulkAssignDeliveryCrewView,
     OrderDetailView,
     CategoryListView,
     CategoryDetailView,
@@ -15,18 +21,40 @@ from .views import (
     CreateCheckoutSessionView,
     stripe_webhook,
     RetrieveCheckoutSessionView,
+    AsyncCreateCheckoutSessionView,
+    AsyncRetrieveCheckoutSessionView,
+    SalesReportView,
+    ProfileListView,
+    ProfileDetailView,
+    ProfileDownloadView,
+    SlowQueryListView,
 )
 
+# Bajo ASGI las vistas de checkout no bloquean un worker mientras esperan a Stripe
+if settings.ASYNC_CHECKOUT:
+    create_checkout_session_view = AsyncCreateCheckoutSessionView.as_view()
+    retrieve_checkout_session_view = AsyncRetrieveCheckoutSessionView.as_view()
+else:
+    create_checkout_session_view = CreateCheckoutSessionView.as_view()
+    retrieve_checkout_session_view = RetrieveCheckoutSessionView.as_view()
+
 router = DefaultRouter()
 router.register(r'menu-items', MenuItemViewSet, basename='menuitem')
 router.register(r'orders', OrderViewSet, basename='order')
 router.register(r'cart', CartViewSet, basename='cart')
 
 urlpatterns = [
+    # Antes del router para que "snapshot"/"create"/"export"/"events"/"dispatch"/"bulk-assign" no se tomen como {pk}
+    path('menu-items/snapshot/', MenuSnapshotView.as_view(), name='menu-snapshot'),
+    path('orders/create/', CreateOrderView.as_view(), name='create-order'),
+    path('orders/export/', OrderExportView.as_view(), name='order-export'),
+    path('orders/events/', OrderEventStreamView.as_view(), name='order-events'),
+    path('orders/dispatch/', DispatchOrdersView.as_view(), name='order-dispatch'),
+    path('orders/bulk-assign/', BulkAssignDeliveryCrewView.as_view(), name='order-bulk-assign'),
+
     path('', include(router.urls)),
 
     # Orders
-    path('orders/create/', CreateOrderView.as_view(), name='create-order'),
     path('orders/<int:pk>/', OrderDetailView.as_view(), name='order-detail'),
     path('orders/<int:pk>/assign-delivery-crew/', AssignDeliveryCrewView.as_view(), name='assign-delivery-crew'),
 
@@ -46,8 +74,19 @@ urlpatterns = [
     path('groups/delivery-crew/users/<int:user_id>/', DeliveryCrewGroupView.as_view(), name='delivery-crew-group-user-remove'),
 
     # Stripe checkout
-    path('checkout/create-session/', CreateCheckoutSessionView.as_view(), name='create-checkout-session'),
+    path('checkout/create-session/', create_checkout_session_view, name='create-checkout-session'),
     path('webhook/stripe/', stripe_webhook, name='stripe-webhook'),
-    path('checkout/session/<str:session_id>/', RetrieveCheckoutSessionView.as_view(), name='retrieve-checkout-session'),
+    path('checkout/session/<str:session_id>/', retrieve_checkout_session_view, name='retrieve-checkout-session'),
+
+    # Reports
+    path('reports/', SalesReportView.as_view(), name='sales-report'),
+
+    # Request profiles (staff)
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<int:pk>/', ProfileDetailView.as_view(), name='profile-detail'),
+    path('profiles/<int:pk>/download/', ProfileDownloadView.as_view(), name='profile-download'),
+
+    # Slow query log (staff)
+    path('slow-queries/', SlowQueryListView.as_view(), name='slow-queries'),
 
     ]
\ No newline at end of file
@@ -1,14 +1,14 @@
 import stripe
-from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from .. import checkout_sessions
+
 class RetrieveCheckoutSessionView(APIView):
     def get(self, request, session_id):
         try:
-            stripe.api_key = settings.STRIPE_SECRET_KEY
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = checkout_sessions.retrieve(session_id)
             return Response(session, status=status.HTTP_200_OK)
         except stripe.error.StripeError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -1,17 +1,27 @@
 from .menu_items import MenuItemViewSet
+from .menu_snapshot import MenuSnapshotView
+from .order_export import OrderExportView
+from .order_stream import OrderEventStreamView
 from .cart import CartViewSet
 from .orders import (
     OrderViewSet,
     CreateOrderView,
     AssignDeliveryCrewView,
+    DispatchOrdersView,
+    BulkAssignDeliveryCrewView,
     OrderDetailView
 )
 from .user import CurrentUserView
 from .health import HealthCheckView
+from .metrics import prometheus_metrics
+from .profiles import ProfileListView, ProfileDetailView, ProfileDownloadView
+from .slow_queries import SlowQueryListView
 from .categories import CategoryListView, CategoryDetailView
 from .delivery import DeliveryCrewGroupView
 from .manager import ManagerGroupView
 from .RegisterUser import RegisterUserView
 from .stripe_checkout import CreateCheckoutSessionView
 from .webhookStripe import stripe_webhook
-from .RetrieveCheckoutSessionView import RetrieveCheckoutSessionView
\ No newline at end of file
+from .RetrieveCheckoutSessionView import RetrieveCheckoutSessionView
+from .async_checkout import AsyncCreateCheckoutSessionView, AsyncRetrieveCheckoutSessionView
+from .reports import SalesReportView
\ No newline at end of file
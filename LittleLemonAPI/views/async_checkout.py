@@ -0,0 +1,72 @@
+"""
+Variantes async de los endpoints de checkout, para correr bajo ASGI
+(ASYNC_CHECKOUT=True en urls.py).
+
+Mientras esperan a Stripe no ocupan un hilo: un solo worker de uvicorn
+atiende muchos checkouts concurrentes. Autenticación, permisos y throttling
+son los de la vista DRF síncrona equivalente (ver async_drf.py); las
+lecturas del carrito usan la API async del ORM.
+"""
+import stripe
+from asgiref.sync import sync_to_async
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.response import Response
+
+from .. import checkout_sessions
+from ..cart_store import get_cart_store
+from ..models import Cart
+from ..stripe_client import get_async_client
+from .async_drf import respond, run_initial
+from .RetrieveCheckoutSessionView import RetrieveCheckoutSessionView
+from .stripe_checkout import CreateCheckoutSessionView, build_line_items, checkout_session_params
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCreateCheckoutSessionView(View):
+    async def post(self, request):
+        view, request, error = await sync_to_async(run_initial)(CreateCheckoutSessionView, request)
+        if error is not None:
+            return error
+        user = request.user
+        try:
+            # Con JWT_STATELESS_AUTH el email no viene en el token: carga el User
+            email = await sync_to_async(getattr)(user, 'email')
+            # El worker de webhooks crea la orden desde la tabla Cart
+            await sync_to_async(get_cart_store().persist)(user)
+            cart_items = [
+                item async for item in
+                Cart.objects.select_related('menuitem').filter(user_id=user.pk).order_by('id')
+            ]
+
+            if not cart_items:
+                return await respond(view, request, Response({'error': 'El carrito está vacío'}, status=400))
+
+            if not email:
+                return await respond(view, request, Response(
+                    {'error': 'El usuario no tiene un correo electrónico registrado.'}, status=400
+                ))
+
+            checkout_session = await get_async_client().v1.checkout.sessions.create_async(
+                params=checkout_session_params(email, build_line_items(cart_items))
+            )
+            return await respond(view, request, Response({'id': checkout_session.id}))
+
+        except Exception as e:
+            return await respond(view, request, Response({'error': str(e)}, status=400))
+
+
+class AsyncRetrieveCheckoutSessionView(View):
+    async def get(self, request, session_id):
+        view, request, error = await sync_to_async(run_initial)(
+            RetrieveCheckoutSessionView, request, session_id=session_id
+        )
+        if error is not None:
+            return error
+        try:
+            session = await checkout_sessions.aretrieve(session_id)
+            return await respond(view, request, Response(session, status=status.HTTP_200_OK))
+        except stripe.error.StripeError as e:
+            return await respond(view, request, Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST))
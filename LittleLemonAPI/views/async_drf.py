@@ -0,0 +1,30 @@
+"""
+Utilidades para vistas async (ASGI) que reutilizan la autenticación, los
+permisos y el throttling de una vista DRF síncrona (APIView.initial),
+ejecutados con sync_to_async.
+"""
+from asgiref.sync import sync_to_async
+
+
+def finalize(view, request, response):
+    response = view.finalize_response(request, response)
+    return response.render()
+
+
+async def respond(view, request, response):
+    # El renderer del browsable API puede consultar la BD: se renderiza fuera del loop
+    return await sync_to_async(finalize)(view, request, response)
+
+
+def run_initial(view_class, request, **kwargs):
+    """Corre APIView.initial de `view_class`. Devuelve (vista, request DRF, respuesta de error o None)."""
+    view = view_class()
+    view.args, view.kwargs = (), kwargs
+    request = view.initialize_request(request, **kwargs)
+    view.request = request
+    view.headers = view.default_response_headers
+    try:
+        view.initial(request, **kwargs)
+    except Exception as exc:
+        return view, request, finalize(view, request, view.handle_exception(exc))
+    return view, request, None
@@ -3,9 +3,14 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
+from django.core.exceptions import ValidationError
+from django.http import Http404
+
 from ..models import  Cart
+from ..cart_store import get_cart_store
 from ..serializers import (
-    CartSerializer
+    CartSerializer,
+    CartBatchSerializer,
 )
 
 class CartViewSet(viewsets.ModelViewSet):
@@ -16,7 +21,16 @@ class CartViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        # Queryset con el store de BD, lista de líneas con el de cache (ver cart_store.py)
+        return get_cart_store().lines(self.request.user)
+
+    def get_object(self):
+        try:
+            line = get_cart_store().get(self.request.user, self.kwargs['pk'])
+        except (Cart.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, line)
+        return line
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -24,7 +38,18 @@ class CartViewSet(viewsets.ModelViewSet):
     def perform_update(self, serializer):
         serializer.save()
 
+    def perform_destroy(self, instance):
+        get_cart_store().remove(self.request.user, instance)
+
     @action(detail=False, methods=['delete'], url_path='clear')
     def clear(self, request):
-        self.get_queryset().delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        get_cart_store().clear(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """Aplica varias operaciones en una transacción y devuelve el carrito completo."""
+        serializer = CartBatchSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.save()
+        return Response(CartSerializer(lines, many=True).data)
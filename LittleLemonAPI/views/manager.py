@@ -10,7 +10,7 @@ class ManagerGroupView(APIView):
     group_name = 'Manager'
 
     def get_permissions(self):
-        return [IsAuthenticated(), (IsManagerOrAdmin() | IsAdmin())]
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
 
     def get(self, request):
         group = get_object_or_404(Group, name=self.group_name)
@@ -1,24 +1,34 @@
+from django.conf import settings
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from ..models import MenuItem
-from ..serializers import MenuItemSerializer
+from ..serializers import MenuItemSerializer, MENU_ITEM_VALUES
 from ..permissions import IsAdmin, IsManagerOrAdmin
 from ..filters import MenuItemFilter
+from ..search import MenuItemSearchFilter
 from ..throttles import MenuUserThrottle, MenuAnonThrottle
+from ..pagination import PageNumberOrKeysetPagination
+from .. import menu_cache
+from .mixins import ValuesReadMixin
 
-class MenuItemViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.all().order_by('id')
+class MenuItemViewSet(ValuesReadMixin, viewsets.ModelViewSet):
+    queryset = MenuItem.objects.select_related('category').order_by('id')
     serializer_class = MenuItemSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    values_serializer = MENU_ITEM_VALUES
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, MenuItemSearchFilter]
     filterset_class = MenuItemFilter  
     ordering_fields = ['title', 'price']
     search_fields = ['title', 'description']  
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('id',)
 
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             permission_classes = [AllowAny]
-        elif self.action in ['create', 'update', 'partial_update', 'destroy']:
+        elif self.action in ['create', 'update', 'partial_update', 'destroy', 'cache_stats']:
             permission_classes = [IsAuthenticated, IsManagerOrAdmin | IsAdmin]
         else:
             permission_classes = [IsAuthenticated]
@@ -28,3 +38,20 @@ class MenuItemViewSet(viewsets.ModelViewSet):
         if self.action in ['list', 'retrieve']:
             return [MenuUserThrottle()] if self.request.user.is_authenticated else [MenuAnonThrottle()]
         return super().get_throttles()
+
+    def list(self, request, *args, **kwargs):
+        if not settings.MENU_CACHE_MAX_BYTES:
+            return super().list(request, *args, **kwargs)
+        key = menu_cache.make_key(request)
+        # Generación leída antes de ir a la BD (ver ResultCache.set)
+        generation = menu_cache.current_generation()
+        data = menu_cache.results.get(key, generation)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            menu_cache.results.set(key, data, generation)
+        return Response(data)
+
+    @action(detail=False, methods=['get'], url_path='cache-stats')
+    def cache_stats(self, request):
+        """Contadores del cache de listados de este worker."""
+        return Response(menu_cache.results.stats())
@@ -0,0 +1,22 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+from ..menu_snapshot import reader
+from ..throttles import MenuAnonThrottle
+
+
+class MenuSnapshotView(APIView):
+    """
+    GET /api/menu-items/snapshot/ -> público
+    Menú completo agrupado por categoría, servido desde el snapshot en memoria.
+    """
+    permission_classes = [AllowAny]
+    # Sin autenticación: el contenido es público y así no hay ninguna query por request
+    authentication_classes = []
+    throttle_classes = [MenuAnonThrottle]
+
+    def get(self, request):
+        content, etag = reader.read()
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponseNotModified(headers={'ETag': etag})
+        return HttpResponse(content, content_type='application/json', headers={'ETag': etag})
@@ -0,0 +1,27 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import require_GET
+
+from .. import metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@require_GET
+def prometheus_metrics(request):
+    """
+    Histogramas por vista (ver metrics.py) en formato de texto de Prometheus.
+    Con METRICS_TOKEN exige `Authorization: Bearer <token>`; sin token solo
+    responde con DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        if not settings.DEBUG:
+            raise Http404
+    elif not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        response = HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(metrics.render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,32 @@
+from django.conf import settings
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+
+
+class ValuesReadMixin:
+    """
+    list/retrieve con `values_serializer` (un ValuesSerializer) sobre filas de
+    .values() en vez de instancias + serializer_class. Mismos filtros,
+    paginación y respuesta; la escritura sigue con serializer_class.
+    Con LEAN_READ_SERIALIZERS=False se usa el camino de DRF.
+    """
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.LEAN_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        queryset = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.represent(page))
+        return Response(self.values_serializer.represent(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.LEAN_READ_SERIALIZERS:
+            return super().retrieve(request, *args, **kwargs)
+        # Como get_object(), pero la fila de .values() en vez de la instancia
+        queryset = self.values_serializer.values(self.filter_queryset(self.get_queryset()))
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        self.check_object_permissions(request, row)
+        return Response(self.values_serializer.represent([row])[0])
@@ -0,0 +1,114 @@
+import csv
+import json
+from itertools import groupby
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+
+from ..filters import OrderFilter
+from ..models import Order
+from ..permissions import IsAdmin, IsManagerOrAdmin
+
+# Filas por fetch del cursor (server-side en PostgreSQL)
+EXPORT_CHUNK_SIZE = 2000
+
+ORDER_FIELDS = ('id', 'date', 'status', 'total', 'user__username', 'delivery_crew__username')
+ITEM_FIELDS = ('items__menuitem_id', 'items__menuitem__title', 'items__quantity', 'items__unit_price', 'items__price')
+
+CSV_HEADER = (
+    'order_id', 'date', 'status', 'total', 'user', 'delivery_crew',
+    'menuitem_id', 'menuitem', 'quantity', 'unit_price', 'price',
+)
+
+
+class Echo:
+    """Buffer de solo escritura para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def _text(value):
+    # Decimal y date como texto (igual que en la API); None queda vacío/null
+    return value if value is None or isinstance(value, (int, str)) else str(value)
+
+
+class OrderExportView(generics.GenericAPIView):
+    """
+    GET /api/orders/export/?output=csv|ndjson
+
+    Exporta órdenes con sus líneas en streaming, sin paginar ni pasar por
+    OrderSerializer. Una sola query (LEFT JOIN con OrderItem y MenuItem)
+    leída por bloques con iterator(), así que la memoria no depende del
+    número de filas. Acepta los mismos filtros que /api/orders/
+    (status, delivery_crew, user, date_from, date_to).
+
+    - csv: una fila por línea de orden (las órdenes sin líneas salen con las
+      columnas de línea vacías).
+    - ndjson: un objeto por orden con sus líneas en `items`.
+
+    `?format=` lo reserva DRF para elegir renderer, por eso el parámetro es `output`.
+    """
+    queryset = Order.objects.all()
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
+
+    def get_permissions(self):
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
+
+    def get(self, request):
+        output = request.query_params.get('output', 'csv')
+        if output not in ('csv', 'ndjson'):
+            raise ValidationError({'output': "Choose csv or ndjson."})
+
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .order_by('id', 'items__id')
+            .values_list(*ORDER_FIELDS, *ITEM_FIELDS)
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        if output == 'csv':
+            content, content_type = self._csv(rows), 'text/csv; charset=utf-8'
+        else:
+            content, content_type = self._ndjson(rows), 'application/x-ndjson'
+
+        response = StreamingHttpResponse(content, content_type=content_type)
+        filename = f"orders-{timezone.localdate():%Y%m%d}.{output}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def _csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(CSV_HEADER)
+        for row in rows:
+            yield writer.writerow([_text(value) for value in row])
+
+    def _ndjson(self, rows):
+        order_width = len(ORDER_FIELDS)
+        # Las filas vienen ordenadas por orden: se agrupan de a una orden por vez
+        for order, lines in groupby(rows, key=lambda row: row[:order_width]):
+            order_id, date, status, total, user, delivery_crew = order
+            items = [
+                {
+                    'menuitem_id': menuitem_id,
+                    'menuitem': title,
+                    'quantity': quantity,
+                    'unit_price': _text(unit_price),
+                    'price': _text(price),
+                }
+                for menuitem_id, title, quantity, unit_price, price in (line[order_width:] for line in lines)
+                if menuitem_id is not None
+            ]
+            yield json.dumps({
+                'id': order_id,
+                'date': _text(date),
+                'status': status,
+                'total': _text(total),
+                'user': user,
+                'delivery_crew': delivery_crew,
+                'items': items,
+            }, ensure_ascii=False) + '\n'
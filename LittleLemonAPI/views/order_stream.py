@@ -0,0 +1,83 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.views import APIView
+
+from ..order_events import format_event, get_broker, order_scope, replay
+from .async_drf import run_initial
+
+RETRY_MS = 3000
+
+
+class _OrderStreamAuth(APIView):
+    """Solo aporta autenticación, permisos y throttling por defecto de DRF."""
+
+
+class OrderEventStreamView(View):
+    """
+    GET /api/orders/events/  (text/event-stream, solo bajo ASGI)
+
+    Emite un evento `order` por cada cambio de estado o de repartidor de las
+    órdenes que el usuario puede ver en /api/orders/. Con el header
+    Last-Event-ID (o ?last_event_id=) se reenvía lo ocurrido desde ese id.
+    Cada ORDER_EVENTS_HEARTBEAT segundos sin eventos se envía un comentario
+    para mantener la conexión abierta.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # Bajo WSGI cada conexión abierta ocuparía un worker entero
+            return JsonResponse({'detail': 'The order event stream requires ASGI.'}, status=501)
+
+        view, drf_request, error = await sync_to_async(run_initial)(_OrderStreamAuth, request)
+        if error is not None:
+            return error
+        scope, user_id = await sync_to_async(order_scope)(drf_request.user)
+
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        broker = get_broker()
+        subscription = await broker.subscribe(scope, user_id)
+        # Suscrito antes de leer el historial: entre ambos no se pierde nada
+        missed = []
+        if last_event_id is not None:
+            missed = await sync_to_async(replay)(scope, user_id, last_event_id)
+
+        response = StreamingHttpResponse(
+            self.stream(broker, subscription, missed), content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, broker, subscription, missed):
+        try:
+            yield f'retry: {RETRY_MS}\n\n'
+            sent = 0
+            for event in missed:
+                sent = event.pk
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.ORDER_EVENTS_HEARTBEAT
+                    )
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                if event is None:
+                    break
+                if event.pk <= sent:
+                    continue
+                sent = event.pk
+                yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
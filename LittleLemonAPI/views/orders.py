@@ -6,24 +6,47 @@ from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
 from django.db import transaction
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
-from ..models import  Order, Cart
+from ..models import  Order, OrderItem
 from ..serializers import (
     OrderSerializer,
-    CreateOrderSerializer
+    CreateOrderSerializer,
+    BulkAssignSerializer,
+    ORDER_VALUES,
 )
 from ..permissions import IsAdmin, IsManagerOrAdmin, IsCustomer
+from ..roles import is_delivery_crew
+from ..pagination import PageNumberOrKeysetPagination
+from ..filters import OrderFilter
+from ..dispatch import bulk_assign, crew_loads, dispatch_pending
+from ..order_events import SCOPE_ALL, SCOPE_CREW, order_scope
+from .mixins import ValuesReadMixin
 
-class OrderViewSet(viewsets.ModelViewSet):
+
+def with_order_details(queryset):
+    """
+    Carga todo lo que necesita OrderSerializer en un número fijo de queries
+    (órdenes con user/delivery_crew + líneas con menú y categoría),
+    sin importar el tamaño de página ni el número de líneas.
+    """
+    return queryset.select_related('user', 'delivery_crew').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('menuitem__category').order_by('id'))
+    )
+
+class OrderViewSet(ValuesReadMixin, viewsets.ModelViewSet):
     serializer_class = OrderSerializer
+    values_serializer = ORDER_VALUES
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['status', 'delivery_crew', 'user']
+    filterset_class = OrderFilter
     ordering_fields = ['date', 'status']
+    pagination_class = PageNumberOrKeysetPagination
+    keyset_ordering = ('-date', '-id')
 
     def get_permissions(self):
         if self.action == 'destroy':
             self.permission_classes = [IsAuthenticated, (IsManagerOrAdmin | IsAdmin)]
-        elif self.action in ['update', 'partial_update'] and self.request.user.groups.filter(name='Delivery crew').exists():
+        elif self.action in ['update', 'partial_update'] and is_delivery_crew(self.request.user):
             data_keys = set(self.request.data.keys())
             if data_keys - {'status'}:
                 raise PermissionDenied("Delivery crew can only update order status")
@@ -33,51 +56,104 @@ class OrderViewSet(viewsets.ModelViewSet):
         return super().get_permissions()
 
     def get_queryset(self):
-        user = self.request.user
-        if user.is_superuser or user.groups.filter(name='Manager').exists():
-            return Order.objects.all()
-        if user.groups.filter(name='Delivery crew').exists():
-            return Order.objects.filter(delivery_crew=user)
-        return Order.objects.filter(user=user)
+        # El stream de eventos (order_events.py) usa el mismo alcance
+        scope, user_id = order_scope(self.request.user)
+        if scope == SCOPE_ALL:
+            queryset = Order.objects.all()
+        elif scope == SCOPE_CREW:
+            queryset = Order.objects.filter(delivery_crew_id=user_id)
+        else:
+            queryset = Order.objects.filter(user_id=user_id)
+        # Borrar no serializa nada: no hace falta traer relaciones ni líneas
+        if self.action == 'destroy':
+            return queryset
+        return with_order_details(queryset)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        # UpdateModelMixin vacía el prefetch y la respuesta volvería a hacer N+1;
+        # las líneas no cambian al actualizar la orden, así que se reutilizan.
+        return Response(serializer.data)
 
 
 class CreateOrderView(generics.CreateAPIView):
     serializer_class = CreateOrderSerializer
 
     def get_permissions(self):
-        return [IsAuthenticated(), (IsCustomer() | IsAdmin())]
+        return [IsAuthenticated(), (IsCustomer | IsAdmin)()]
 
     @transaction.atomic
     def post(self, request, *args, **kwargs):
-        user = request.user
-        cart_items = Cart.objects.filter(user=user)
-        if not cart_items.exists():
-            raise ValidationError("Your cart is empty.")
-        serializer = self.get_serializer(data=request.data, context={'request': request})
+        serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
-        cart_items.delete()
+        order = with_order_details(Order.objects.filter(pk=order.pk)).get()
         return Response(OrderSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
 class AssignDeliveryCrewView(APIView):
     def get_permissions(self):
-        return [IsAuthenticated(), (IsManagerOrAdmin() | IsAdmin())]
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
 
     def put(self, request, pk):
         order = get_object_or_404(Order, pk=pk)
         crew_id = request.data.get('delivery_crew')
         crew = get_object_or_404(User, pk=crew_id)
-        if not crew.groups.filter(name='Delivery crew').exists():
+        if not is_delivery_crew(crew):
             raise ValidationError("User is not in the Delivery crew group.")
         order.delivery_crew = crew
         order.save()
         return Response({'detail': 'Delivery crew assigned successfully.'}, status=status.HTTP_200_OK)
 
 
-class OrderDetailView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Order.objects.all()
+class DispatchOrdersView(APIView):
+    """
+    POST /api/orders/dispatch/  {"batch_size": 100}
+
+    Una pasada del reparto automático (ver dispatch.py): asigna las órdenes en
+    'preparing' sin repartidor al miembro del equipo con menos órdenes abiertas.
+    """
+    MAX_BATCH_SIZE = 1000
+
+    def get_permissions(self):
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
+
+    def post(self, request):
+        try:
+            batch_size = int(request.data.get('batch_size', 100))
+        except (TypeError, ValueError):
+            raise ValidationError({'batch_size': 'A valid integer is required.'})
+        if not 1 <= batch_size <= self.MAX_BATCH_SIZE:
+            raise ValidationError({'batch_size': f'Must be between 1 and {self.MAX_BATCH_SIZE}.'})
+
+        assignments = dispatch_pending(batch_size)
+        return Response({
+            'assigned': [{'order': order, 'delivery_crew': crew} for order, crew in assignments.items()],
+            'loads': crew_loads(set(assignments.values())),
+        })
+
+
+class BulkAssignDeliveryCrewView(APIView):
+    """POST /api/orders/bulk-assign/  {"assignments": [{"order": 1, "delivery_crew": 5}, ...]}"""
+
+    def get_permissions(self):
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
+
+    def post(self, request):
+        serializer = BulkAssignSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = bulk_assign(serializer.validated_data['assignments'])
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+
+class OrderDetailView(ValuesReadMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = with_order_details(Order.objects.all())
     serializer_class = OrderSerializer
+    values_serializer = ORDER_VALUES
 
     def get_permissions(self):
         if self.request.user.is_authenticated:
@@ -0,0 +1,84 @@
+import marshal
+from datetime import datetime, timezone
+
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .. import profiling
+from ..permissions import IsAdmin
+
+MAX_FUNCTIONS = 200
+
+
+def _summary(request, profile):
+    return {
+        'id': profile['id'],
+        'created_at': datetime.fromtimestamp(profile['created_at'], tz=timezone.utc).isoformat(),
+        'user_id': profile['user_id'],
+        'method': profile['method'],
+        'path': profile['path'],
+        'view': profile['view'],
+        'status': profile['status'],
+        'duration_ms': round(profile['duration'] * 1000, 2),
+        'url': request.build_absolute_uri(reverse('profile-detail', args=[profile['id']])),
+        'download': request.build_absolute_uri(reverse('profile-download', args=[profile['id']])),
+    }
+
+
+def _get_or_404(profile_id):
+    found = profiling.get_profile(profile_id)
+    if found is None:
+        raise Http404
+    return found
+
+
+class ProfileListView(APIView):
+    """GET /api/profiles/: perfiles guardados (ver profiling.py), el más reciente primero."""
+
+    def get_permissions(self):
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get(self, request):
+        return Response([_summary(request, profile) for profile in profiling.list_profiles()])
+
+
+class ProfileDetailView(APIView):
+    """GET /api/profiles/<id>/?sort=cumulative|tottime|ncalls&limit=30: funciones más costosas."""
+
+    def get_permissions(self):
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get(self, request, pk):
+        sort = request.query_params.get('sort', 'cumulative')
+        if sort not in profiling.SORT_KEYS:
+            raise ValidationError({'sort': f"Use one of: {', '.join(profiling.SORT_KEYS)}."})
+        try:
+            limit = int(request.query_params.get('limit', 30))
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if not 1 <= limit <= MAX_FUNCTIONS:
+            raise ValidationError({'limit': f'Must be between 1 and {MAX_FUNCTIONS}.'})
+
+        profile, stats = _get_or_404(pk)
+        return Response({
+            **_summary(request, profile),
+            'total_calls': sum(nc for _, nc, _, _, _ in stats.values()),
+            'functions': profiling.top_functions(stats, sort, limit),
+        })
+
+
+class ProfileDownloadView(APIView):
+    """GET /api/profiles/<id>/download/: el perfil en formato pstats (.prof)."""
+
+    def get_permissions(self):
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get(self, request, pk):
+        _, stats = _get_or_404(pk)
+        response = HttpResponse(marshal.dumps(stats), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="profile-{pk}.prof"'
+        return response
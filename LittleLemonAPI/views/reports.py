@@ -0,0 +1,89 @@
+from datetime import date, timedelta
+
+from django.db.models import F, Sum
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..models import CategoryDailySales, DailySales, MenuItemDailySales, Order
+from ..permissions import IsAdmin, IsManagerOrAdmin
+
+DEFAULT_RANGE_DAYS = 30
+MAX_RANGE_DAYS = 366
+
+# group_by -> (rollup, campos de agrupación, campos extra, orden)
+GROUPINGS = {
+    'day': (DailySales, ('date',), {}, ['date']),
+    'status': (DailySales, ('status',), {}, ['status']),
+    'menuitem': (MenuItemDailySales, ('menuitem',), {'title': F('menuitem__title')}, ['-revenue', 'menuitem']),
+    'category': (CategoryDailySales, ('category',), {'title': F('category__title')}, ['-revenue', 'category']),
+}
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: "Use YYYY-MM-DD."})
+
+
+class SalesReportView(APIView):
+    """
+    GET /api/reports/?start=YYYY-MM-DD&end=YYYY-MM-DD&group_by=day|status|menuitem|category&status=a,b
+
+    Responde desde los rollups de ventas (ver rollups.py), sin recorrer
+    Order/OrderItem. Por defecto: últimos 30 días agrupados por día, todos
+    los estados.
+    """
+
+    def get_permissions(self):
+        return [IsAuthenticated(), (IsManagerOrAdmin | IsAdmin)()]
+
+    def get(self, request):
+        params = request.query_params
+        end = _parse_date(params['end'], 'end') if params.get('end') else date.today()
+        start = _parse_date(params['start'], 'start') if params.get('start') else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+        if start > end:
+            raise ValidationError({'start': "Must be on or before end."})
+        if (end - start).days >= MAX_RANGE_DAYS:
+            raise ValidationError({'start': f"Range can't exceed {MAX_RANGE_DAYS} days."})
+
+        group_by = params.get('group_by', 'day')
+        if group_by not in GROUPINGS:
+            raise ValidationError({'group_by': f"Choose one of: {', '.join(GROUPINGS)}."})
+        model, fields, extra, ordering = GROUPINGS[group_by]
+
+        queryset = model.objects.filter(date__range=(start, end))
+        statuses = [status for status in params.get('status', '').split(',') if status]
+        if statuses:
+            valid = {choice for choice, _ in Order.STATUS_CHOICES}
+            if set(statuses) - valid:
+                raise ValidationError({'status': f"Choose from: {', '.join(sorted(valid))}."})
+            queryset = queryset.filter(status__in=statuses)
+
+        rows = list(
+            queryset.values(*fields, **extra)
+            .annotate(orders=Sum('orders'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+            .filter(orders__gt=0)
+            .order_by(*ordering)
+        )
+        for row in rows:
+            row['revenue'] = f"{row['revenue']:.2f}"
+
+        totals = DailySales.objects.filter(date__range=(start, end))
+        if statuses:
+            totals = totals.filter(status__in=statuses)
+        totals = totals.aggregate(orders=Sum('orders'), quantity=Sum('quantity'), revenue=Sum('revenue'))
+
+        return Response({
+            'start': start,
+            'end': end,
+            'group_by': group_by,
+            'totals': {
+                'orders': totals['orders'] or 0,
+                'quantity': totals['quantity'] or 0,
+                'revenue': f"{totals['revenue'] or 0:.2f}",
+            },
+            'results': rows,
+        })
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .. import slow_queries
+from ..permissions import IsAdmin
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat() if value is not None else None
+
+
+class SlowQueryListView(APIView):
+    """
+    GET /api/slow-queries/?limit=N: fingerprints de queries lentas con más
+    tiempo total (ver slow_queries.py). DELETE vacía el log.
+    """
+
+    def get_permissions(self):
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', 0)) or None
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+        if limit is not None and limit < 1:
+            raise ValidationError({'limit': 'Must be a positive integer.'})
+        return Response([
+            {
+                'fingerprint': entry['fingerprint'],
+                'query': entry['query'],
+                'calls': entry['calls'],
+                'total_ms': round(entry['total_time'] * 1000, 2),
+                'mean_ms': round(entry['mean_time'] * 1000, 2),
+                'max_ms': round(entry['max_time'] * 1000, 2),
+                'views': entry['views'],
+                'last_seen': _timestamp(entry['last_seen']),
+                'plan': entry['plan'],
+                'explained_at': _timestamp(entry['explained_at']),
+            }
+            for entry in slow_queries.top(limit)
+        ])
+
+    def delete(self, request):
+        slow_queries.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -1,6 +1,7 @@
 from pathlib import Path
 from datetime import timedelta
 import os
+import tempfile
 
 from decouple import config, Csv
 import dj_database_url
@@ -30,6 +31,22 @@ STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY")
 STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY")
 STRIPE_WEBHOOK_SECRET = config("STRIPE_WEBHOOK_SECRET")
 
+# Reintentos del procesamiento de eventos del webhook (manage.py process_stripe_events)
+STRIPE_EVENT_MAX_ATTEMPTS: int = config("STRIPE_EVENT_MAX_ATTEMPTS", default=8, cast=int)
+STRIPE_EVENT_RETRY_BASE_SECONDS: int = config("STRIPE_EVENT_RETRY_BASE_SECONDS", default=30, cast=int)
+STRIPE_EVENT_RETRY_MAX_SECONDS: int = config("STRIPE_EVENT_RETRY_MAX_SECONDS", default=3600, cast=int)
+
+# Cliente HTTP de Stripe (ver LittleLemonAPI/stripe_client.py). STRIPE_API_BASE
+# apunta a otro servidor (p. ej. el falso de `manage.py loadtest_checkout`).
+STRIPE_API_BASE: str = config("STRIPE_API_BASE", default="")
+STRIPE_CONNECT_TIMEOUT: float = config("STRIPE_CONNECT_TIMEOUT", default=5, cast=float)
+STRIPE_READ_TIMEOUT: float = config("STRIPE_READ_TIMEOUT", default=20, cast=float)
+STRIPE_MAX_NETWORK_RETRIES: int = config("STRIPE_MAX_NETWORK_RETRIES", default=1, cast=int)
+
+# Vistas async para el checkout: solo tiene sentido bajo un servidor ASGI
+# (gunicorn -k uvicorn.workers.UvicornWorker littlelemon.asgi:application)
+ASYNC_CHECKOUT: bool = config("ASYNC_CHECKOUT", default=False, cast=bool)
+
 # URL del frontend (local o producción)
 FRONTEND_URL = "http://localhost:5173" if DEBUG else "https://lemon-front.netlify.app"
 
@@ -54,6 +71,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero: mide la request completa (ver LittleLemonAPI/metrics.py)
+    "LittleLemonAPI.metrics.PerformanceMiddleware",
+    # Perfilado bajo demanda para staff (ver LittleLemonAPI/profiling.py)
+    "LittleLemonAPI.profiling.ProfilingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -93,6 +114,96 @@ DATABASES = {
     )
 }
 
+# ────────────────────────────────────────────────────────────────────────────────
+# Cache
+# ────────────────────────────────────────────────────────────────────────────────
+# LocMemCache es por proceso; en producción con varios workers de gunicorn
+# conviene apuntar CACHE_BACKEND/CACHE_LOCATION a un cache compartido.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default="littlelemon"),
+    }
+}
+
+# Segundos que se cachean los grupos de un usuario (0 = solo por request)
+ROLE_CACHE_TIMEOUT: int = config("ROLE_CACHE_TIMEOUT", default=0, cast=int)
+
+# Directorio para estado compartido entre workers de gunicorn (mismo host)
+SHARED_STATE_DIR: str = config(
+    "SHARED_STATE_DIR", default=os.path.join(tempfile.gettempdir(), "littlelemon")
+)
+
+# SQLite para contadores compartidos entre workers (ver LittleLemonAPI/shared_state.py)
+SHARED_STATE_DB: str = config(
+    "SHARED_STATE_DB", default=os.path.join(SHARED_STATE_DIR, "shared_state.sqlite3")
+)
+
+# Backend de los throttles (ver LittleLemonAPI/throttles.py). Los contadores van
+# al cache THROTTLE_CACHE_ALIAS: tiene que ser compartido (Redis/Memcached) para
+# que el límite sea por cliente y no por worker. SQLiteThrottleBackend (un fichero
+# por host) sirve para tests o un solo host sin cache compartido.
+THROTTLE_BACKEND: str = config(
+    "THROTTLE_BACKEND", default="LittleLemonAPI.throttles.CacheThrottleBackend"
+)
+THROTTLE_CACHE_ALIAS: str = config("THROTTLE_CACHE_ALIAS", default="default")
+
+# Snapshot JSON del menú compartido entre workers (ver LittleLemonAPI/menu_snapshot.py)
+# y cada cuántos segundos se compara con la BD por cambios que no pasan por las signals
+MENU_SNAPSHOT_PATH: str = config(
+    "MENU_SNAPSHOT_PATH", default=os.path.join(SHARED_STATE_DIR, "menu_snapshot.json")
+)
+MENU_SNAPSHOT_CHECK_INTERVAL: float = config("MENU_SNAPSHOT_CHECK_INTERVAL", default=30.0, cast=float)
+
+# Cache LRU por worker de los listados de /api/menu-items/ (0 = desactivado)
+MENU_CACHE_MAX_BYTES: int = config("MENU_CACHE_MAX_BYTES", default=8 * 1024 * 1024, cast=int)
+
+# list/retrieve de menú y órdenes desde filas de .values() con los serializers
+# compilados de LittleLemonAPI/serializers/values_serializers.py
+LEAN_READ_SERIALIZERS: bool = config("LEAN_READ_SERIALIZERS", default=True, cast=bool)
+
+# Dónde vive el carrito (ver LittleLemonAPI/cart_store.py). Con CacheCartStore
+# el carrito solo se escribe en la BD al crear la orden o iniciar el checkout.
+CART_STORE: str = config("CART_STORE", default="LittleLemonAPI.cart_store.DatabaseCartStore")
+CART_CACHE_ALIAS: str = config("CART_CACHE_ALIAS", default="default")
+CART_CACHE_TIMEOUT: int = config("CART_CACHE_TIMEOUT", default=7 * 24 * 3600, cast=int)
+
+# Cache de Checkout Sessions de Stripe (ver LittleLemonAPI/checkout_sessions.py):
+# segundos para sesiones abiertas y para sesiones complete/expired
+CHECKOUT_SESSION_CACHE_ALIAS: str = config("CHECKOUT_SESSION_CACHE_ALIAS", default="default")
+CHECKOUT_SESSION_TTL_OPEN: int = config("CHECKOUT_SESSION_TTL_OPEN", default=5, cast=int)
+CHECKOUT_SESSION_TTL_FINAL: int = config("CHECKOUT_SESSION_TTL_FINAL", default=24 * 3600, cast=int)
+
+# Stream SSE de cambios de órdenes (ver LittleLemonAPI/order_events.py): segundos
+# entre consultas del poller, entre heartbeats y días que se guardan los eventos
+ORDER_EVENTS_POLL_INTERVAL: float = config("ORDER_EVENTS_POLL_INTERVAL", default=1.0, cast=float)
+ORDER_EVENTS_HEARTBEAT: int = config("ORDER_EVENTS_HEARTBEAT", default=15, cast=int)
+ORDER_EVENTS_RETENTION_DAYS: int = config("ORDER_EVENTS_RETENTION_DAYS", default=2, cast=int)
+
+# Instrumentación por request (ver LittleLemonAPI/metrics.py): cabecera
+# Server-Timing (expone tiempos y queries de cada vista a cualquier cliente,
+# por eso solo con DEBUG salvo que se active), segundos entre volcados de los
+# histogramas al SQLite de shared_state y token Bearer que exige /metrics
+# (sin token solo con DEBUG)
+PERFORMANCE_METRICS: bool = config("PERFORMANCE_METRICS", default=True, cast=bool)
+SERVER_TIMING: bool = config("SERVER_TIMING", default=DEBUG, cast=bool)
+METRICS_FLUSH_INTERVAL: float = config("METRICS_FLUSH_INTERVAL", default=5.0, cast=float)
+METRICS_TOKEN: str = config("METRICS_TOKEN", default="")
+
+# Perfilado de una request con X-Profile: 1 o ?profile=1 para staff
+# (ver LittleLemonAPI/profiling.py) y cuántos perfiles se conservan
+PROFILING_ENABLED: bool = config("PROFILING_ENABLED", default=True, cast=bool)
+PROFILE_BUFFER_SIZE: int = config("PROFILE_BUFFER_SIZE", default=50, cast=int)
+
+# Log de queries lentas (ver LittleLemonAPI/slow_queries.py): umbral, fracción
+# de las lentas a las que se les guarda el EXPLAIN y fingerprints conservados
+SLOW_QUERY_LOG: bool = config("SLOW_QUERY_LOG", default=True, cast=bool)
+SLOW_QUERY_THRESHOLD_MS: float = config("SLOW_QUERY_THRESHOLD_MS", default=100.0, cast=float)
+SLOW_QUERY_EXPLAIN_SAMPLE: float = config("SLOW_QUERY_EXPLAIN_SAMPLE", default=0.1, cast=float)
+SLOW_QUERY_TOP_N: int = config("SLOW_QUERY_TOP_N", default=50, cast=int)
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Password policies
 # ────────────────────────────────────────────────────────────────────────────────
@@ -135,9 +246,28 @@ else:
 # ────────────────────────────────────────────────────────────────────────────────
 # DRF + JWT
 # ────────────────────────────────────────────────────────────────────────────────
+# Modo opcional: el access token lleva flags y roles, y el request.user se
+# construye desde los claims sin consultar la BD (ver LittleLemonAPI/authentication.py)
+JWT_STATELESS_AUTH: bool = config("JWT_STATELESS_AUTH", default=False, cast=bool)
+
+# JSON de la API con orjson (LittleLemonAPI/renderers.py y parsers.py): mismos
+# bytes que los de DRF, y sin orjson instalado se comportan igual que ellos
+FAST_JSON: bool = config("FAST_JSON", default=True, cast=bool)
+
 REST_FRAMEWORK = {
+    "DEFAULT_RENDERER_CLASSES": [
+        "LittleLemonAPI.renderers.ORJSONRenderer" if FAST_JSON else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "LittleLemonAPI.parsers.ORJSONParser" if FAST_JSON else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "LittleLemonAPI.authentication.StatelessJWTAuthentication"
+        if JWT_STATELESS_AUTH
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -150,8 +280,8 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
     ],
     "DEFAULT_THROTTLE_CLASSES": [
-        "rest_framework.throttling.AnonRateThrottle",
-        "rest_framework.throttling.UserRateThrottle",
+        "LittleLemonAPI.throttles.SharedAnonRateThrottle",
+        "LittleLemonAPI.throttles.SharedUserRateThrottle",
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "10/min",
@@ -176,6 +306,8 @@ SIMPLE_JWT = {
     "AUTH_HEADER_NAME": "HTTP_AUTHORIZATION",
     "USER_ID_CLAIM": "user_id",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    "TOKEN_OBTAIN_SERIALIZER": "LittleLemonAPI.serializers.MyTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "LittleLemonAPI.serializers.RoleTokenRefreshSerializer",
 }
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -5,7 +5,7 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from LittleLemonAPI.views import CurrentUserView
+from LittleLemonAPI.views import CurrentUserView, prometheus_metrics
 
 
 urlpatterns = [
@@ -17,4 +17,5 @@ urlpatterns = [
 
     path('api/', include('LittleLemonAPI.urls')),  
     path('healthz/', HealthCheckView.as_view(), name='health_check'),
+    path('metrics', prometheus_metrics, name='metrics'),  # ruta por defecto de Prometheus
 ]
\ No newline at end of file